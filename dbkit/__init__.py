@@ -0,0 +1,50 @@
+"""
+SQLite helpers shared by the decorator and context-manager projects.
+
+    from dbkit import with_db_connection, cache_query, DatabaseConnection
+
+Nothing here touches a database or imports asyncio/aiosqlite at import
+time: `import dbkit` only loads this file, and each name below pulls in
+its submodule the first time it is used. Check with
+
+    python -m dbkit.importtime
+"""
+import importlib
+
+# public name -> submodule defining it
+_EXPORTS = {
+    "with_db_connection": "decorators",
+    "transactional": "decorators",
+    "batched_transactional": "decorators",
+    "retry_on_failure": "decorators",
+    "cache_query": "decorators",
+    "log_queries": "decorators",
+    "DatabaseConnection": "context",
+    "ExecuteQuery": "context",
+    "SQLitePool": "connection_pool",
+    "PoolTimeout": "connection_pool",
+    "AsyncSQLitePool": "async_pool",
+    "LRUCache": "query_cache",
+    "DiskCache": "disk_cache",
+    "TieredCache": "disk_cache",
+    "GroupCommitter": "group_commit",
+    "Instrumentation": "instrumentation",
+    "RetryBudget": "retry_policy",
+    "SlowQueryDetector": "query_plans",
+    "profile_queries": "query_plans",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
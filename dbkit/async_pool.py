@@ -0,0 +1,159 @@
+import asyncio
+import contextlib
+import inspect
+import os
+import time
+import weakref
+
+from .connection_pool import PoolTimeout
+
+class AsyncSQLitePool:
+    """
+    Pool of aiosqlite connections to one database file, for coroutines.
+
+    Same idea as connection_pool.SQLitePool: at most `size` connections,
+    kept open between calls; acquire() waits up to `timeout` seconds for
+    a free one without blocking the event loop. `setup` hooks (the same
+    connection_pool.pragma hooks) run once per new connection. Released
+    connections are rolled back if a transaction is still open.
+
+    asyncio queues belong to one event loop, so a pool serves the loop it
+    was created in; get_async_pool() keeps one pool per loop.
+    aiosqlite is imported on first connect, so importing this module does
+    not require it.
+    """
+    def __init__(self, database, size=5, timeout=30.0, setup=(), **connect_kwargs):
+        self.database = database
+        self.size = size
+        self.timeout = timeout
+        self.setup = tuple(setup)
+        self.connect_kwargs = connect_kwargs
+        self._idle = asyncio.LifoQueue()
+        self._all = []
+        self._slots = 0
+        self._closed = False
+        self.created = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_time = 0.0  # seconds spent waiting for a free connection
+        self.timeouts = 0
+        self.in_use = 0
+
+    async def _connect(self):
+        import aiosqlite
+
+        conn = aiosqlite.connect(self.database, **self.connect_kwargs)
+        # aiosqlite runs each connection on its own non-daemon thread; idle
+        # pooled connections must not keep the interpreter from exiting
+        thread = getattr(conn, "_thread", None)
+        if thread is not None:
+            thread.daemon = True
+        await conn
+        for hook in self.setup:
+            result = hook(conn)
+            if inspect.isawaitable(result):
+                await result
+        self._all.append(conn)
+        self.created += 1
+        return conn
+
+    async def acquire(self, timeout=None):
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        self.checkouts += 1
+        self.in_use += 1
+        try:
+            return await self._checkout(self.timeout if timeout is None else timeout)
+        except BaseException:
+            self.in_use -= 1
+            raise
+
+    async def _checkout(self, timeout):
+        try:
+            return self._idle.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+        if self._slots < self.size:
+            self._slots += 1
+            try:
+                return await self._connect()
+            except BaseException:
+                self._slots -= 1
+                raise
+        self.waits += 1
+        started = time.perf_counter()
+        try:
+            return await asyncio.wait_for(self._idle.get(), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise PoolTimeout(f"No connection to {self.database} free "
+                              f"after {timeout}s") from None
+        finally:
+            self.wait_time += time.perf_counter() - started
+
+    async def release(self, conn):
+        self.in_use -= 1
+        if self._closed:
+            await conn.close()
+            return
+        try:
+            if conn.in_transaction:
+                await conn.rollback()
+        except Exception:
+            # A broken connection is dropped and its slot freed
+            self._all.remove(conn)
+            self._slots -= 1
+            await conn.close()
+            raise
+        self._idle.put_nowait(conn)
+
+    @contextlib.asynccontextmanager
+    async def connection(self, timeout=None):
+        conn = await self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            await self.release(conn)
+
+    def stats(self):
+        return {
+            "database": self.database,
+            "size": self.size,
+            "connections": len(self._all),
+            "in_use": self.in_use,
+            "idle": self._idle.qsize(),
+            "created": self.created,
+            "checkouts": self.checkouts,
+            "waits": self.waits,
+            "wait_time": self.wait_time,
+            "timeouts": self.timeouts,
+        }
+
+    async def close(self):
+        self._closed = True
+        conns, self._all = self._all, []
+        for conn in conns:
+            await conn.close()
+
+# loop -> {database path: pool}, and per-database pool options
+_pools = weakref.WeakKeyDictionary()
+_options = {}
+
+def configure(database, **options):
+    """Set the AsyncSQLitePool options (size, timeout, setup, ...) for database"""
+    _options[os.path.abspath(database)] = options
+
+def get_async_pool(database):
+    """The running loop's pool for database, created on first use"""
+    path = os.path.abspath(database)
+    pools = _pools.setdefault(asyncio.get_running_loop(), {})
+    pool = pools.get(path)
+    if pool is None:
+        pool = pools[path] = AsyncSQLitePool(path, **_options.get(path, {}))
+    return pool
+
+async def close_pools():
+    """Close every pool of the running loop (e.g. at the end of asyncio.run)"""
+    pools = _pools.pop(asyncio.get_running_loop(), {})
+    for pool in pools.values():
+        await pool.close()
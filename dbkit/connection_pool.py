@@ -0,0 +1,251 @@
+import contextlib
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+class PoolTimeout(Exception):
+    """No pooled connection became free within the timeout"""
+
+def pragma(name, value):
+    """Setup hook running PRAGMA name = value on every new connection"""
+    def setup(conn):
+        # Returned so async pools can await it on aiosqlite connections
+        return conn.execute(f"PRAGMA {name} = {value}")
+    setup.__name__ = f"pragma_{name}"
+    return setup
+
+# Typical setup for a read-heavy users.db shared by many threads
+WAL = pragma("journal_mode", "WAL")
+SYNCHRONOUS_NORMAL = pragma("synchronous", "NORMAL")
+
+def mmap_size(size):
+    return pragma("mmap_size", int(size))
+
+class SQLitePool:
+    """
+    Pool of sqlite3 connections to one database file.
+
+    Opening a connection means opening the file and parsing the schema,
+    and closing it throws away its prepared-statement cache. Pooled
+    connections keep both warm across calls.
+
+    - per_thread=True: every thread gets its own connection, created on
+      first use and reused for all later calls from that thread (nested
+      decorated calls in one thread then share it, transaction included;
+      only the outermost release rolls back). Connections of threads that
+      have exited are closed when the next thread connects
+    - otherwise: a bounded pool of at most `size` connections shared by
+      all threads; acquire() waits up to `timeout` seconds for a free one
+      (or its own timeout argument) and raises PoolTimeout after that
+
+    `setup` hooks (e.g. WAL, mmap_size(256 << 20)) run once per new
+    connection. Released connections are rolled back if a transaction is
+    still open, so uncommitted work never leaks into the next call.
+    """
+    def __init__(self, database, size=5, per_thread=False, timeout=30.0,
+                 setup=(), **connect_kwargs):
+        self.database = database
+        self.size = size
+        self.per_thread = per_thread
+        self.timeout = timeout
+        self.setup = tuple(setup)
+        self.connect_kwargs = connect_kwargs
+        self.pid = os.getpid()
+
+        self._idle = queue.LifoQueue()
+        self._local = threading.local()
+        self._all = []     # every open connection, for close()
+        self._owners = {}  # per-thread mode: thread -> its connection
+        self._slots = 0    # shared mode: connections created or being created
+        self._lock = threading.Lock()
+        self._closed = False
+        self.created = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_time = 0.0  # seconds spent waiting for a free connection
+        self.timeouts = 0
+        self.in_use = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.database, check_same_thread=False,
+                               **self.connect_kwargs)
+        for hook in self.setup:
+            hook(conn)
+        with self._lock:
+            self._all.append(conn)
+            self.created += 1
+        return conn
+
+    def acquire(self, timeout=None):
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+        try:
+            return self._checkout(self.timeout if timeout is None else timeout)
+        except BaseException:
+            with self._lock:
+                self.in_use -= 1
+            raise
+
+    def _checkout(self, timeout):
+        if self.per_thread:
+            conn = getattr(self._local, "conn", None)
+            if conn is None:
+                self._close_dead_threads()
+                conn = self._local.conn = self._connect()
+                with self._lock:
+                    self._owners[threading.current_thread()] = conn
+            # Nested checkouts in this thread share conn; count them so
+            # only the outermost release resets it
+            self._local.depth = getattr(self._local, "depth", 0) + 1
+            return conn
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_create = self._slots < self.size
+            if can_create:
+                # Reserve the slot before connecting outside the lock
+                self._slots += 1
+        if can_create:
+            try:
+                return self._connect()
+            except BaseException:
+                with self._lock:
+                    self._slots -= 1
+                raise
+        started = time.perf_counter()
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            with self._lock:
+                self.timeouts += 1
+            raise PoolTimeout(f"No connection to {self.database} free "
+                              f"after {timeout}s") from None
+        finally:
+            with self._lock:
+                self.waits += 1
+                self.wait_time += time.perf_counter() - started
+
+    def _close_dead_threads(self):
+        with self._lock:
+            dead = [thread for thread in self._owners if not thread.is_alive()]
+            conns = [self._owners.pop(thread) for thread in dead]
+            for conn in conns:
+                self._all.remove(conn)
+        for conn in conns:
+            conn.close()
+
+    def release(self, conn):
+        with self._lock:
+            self.in_use -= 1
+        if self.per_thread:
+            self._local.depth = getattr(self._local, "depth", 1) - 1
+            if self._local.depth > 0:
+                # A nested call: the outer caller's transaction is still going
+                return
+        if conn.in_transaction:
+            conn.rollback()
+        if self._closed:
+            conn.close()
+        elif not self.per_thread:
+            self._idle.put(conn)
+
+    @contextlib.contextmanager
+    def connection(self, timeout=None):
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "database": self.database,
+                "per_thread": self.per_thread,
+                "size": self.size,
+                "connections": len(self._all),
+                "in_use": self.in_use,
+                "idle": self._idle.qsize(),
+                "created": self.created,
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "wait_time": self.wait_time,
+                "timeouts": self.timeouts,
+            }
+
+    def close(self):
+        self._closed = True
+        with self._lock:
+            conns = list(self._all)
+            self._all.clear()
+            self._owners.clear()
+        for conn in conns:
+            conn.close()
+
+# Process-wide pools, one per database file
+_pools = {}
+_options = {}
+_registry_lock = threading.Lock()
+
+def configure(database, **options):
+    """Set the SQLitePool options (size, per_thread, setup, ...) for database"""
+    path = os.path.abspath(database)
+    with _registry_lock:
+        _options[path] = options
+        pool = _pools.pop(path, None)
+    if pool is not None:
+        pool.close()
+
+def get_pool(database):
+    """The shared pool for database, created on first use (and after fork)"""
+    path = os.path.abspath(database)
+    with _registry_lock:
+        pool = _pools.get(path)
+        if pool is None or pool.pid != os.getpid():
+            pool = _pools[path] = SQLitePool(path, **_options.get(path, {}))
+        return pool
+
+def benchmark(calls=5000, database="pool_bench.db"):
+    """Per-call latency of connect/close around every call vs pooled checkout"""
+    conn = sqlite3.connect(database)
+    conn.execute("CREATE TABLE IF NOT EXISTS users "
+                 "(id INTEGER PRIMARY KEY, name TEXT, email TEXT, age INT)")
+    conn.execute("INSERT OR IGNORE INTO users VALUES (1, 'a', 'a@example.com', 30)")
+    conn.commit()
+    conn.close()
+
+    def get_user(conn):
+        return conn.execute("SELECT * FROM users WHERE id = ?", (1,)).fetchone()
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        conn = sqlite3.connect(database)
+        try:
+            get_user(conn)
+        finally:
+            conn.close()
+    direct = (time.perf_counter() - start) / calls
+
+    results = {"connect per call": direct}
+    for label, options in (("shared pool", {}), ("per-thread pool", {"per_thread": True})):
+        pool = SQLitePool(database, **options)
+        start = time.perf_counter()
+        for _ in range(calls):
+            with pool.connection() as conn:
+                get_user(conn)
+        results[label] = (time.perf_counter() - start) / calls
+        pool.close()
+
+    for label, seconds in results.items():
+        print(f"{label:<17} {seconds * 1e6:6.1f} us/call")
+    return results
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,176 @@
+"""
+Context managers for users.db: DatabaseConnection hands out a connection,
+ExecuteQuery runs one query and hands out its rows.
+
+Both open a fresh connection by default. With pooled=True they check a
+warm one out of the shared connection_pool instead and give it back on
+exit, which skips opening the file and parsing the schema every time.
+Events go to the "connections" logger (debug level) instead of stdout.
+"""
+import contextvars
+import logging
+import sqlite3
+
+from . import connection_pool
+
+logger = logging.getLogger("connections")
+
+# (DatabaseConnection, conn, pool it goes back to or None) for every open
+# block of the current thread / asyncio task, innermost last
+_checkouts = contextvars.ContextVar("checkouts", default=())
+
+
+class DatabaseConnection:
+    """
+    A custom context manager to handle opening and closing database connections.
+    Implements __enter__ and __exit__ so we can use it with the 'with' statement,
+    and __aenter__ and __aexit__ for 'async with' (an aiosqlite connection).
+
+    :param pooled: Check a connection out of the shared pool for db_name
+        (connection_pool.get_pool, or async_pool.get_async_pool under
+        'async with') and return it on exit instead of connect/close.
+        Size the pools with connection_pool.configure(db_name, size=...,
+        timeout=...) and async_pool.configure(...)
+    :param pool: A specific SQLitePool / AsyncSQLitePool to use (implies pooled)
+    :param timeout: Seconds to wait for a free pooled connection before
+        raising PoolTimeout (default: the pool's own timeout)
+
+    A pooled connection comes back rolled back if a transaction is still
+    open, like a closed one would: commit inside the block to keep changes.
+    The pool is looked up on every enter (unless one was passed), so one
+    instance works with both 'with' and 'async with', in any event loop.
+    Checkouts are kept per thread and per asyncio task (a context
+    variable), so threads and tasks can share one instance.
+    """
+    def __init__(self, db_name, pooled=False, pool=None, timeout=None):
+        self.db_name = db_name
+        self.pooled = pooled or pool is not None
+        self.pool = pool
+        self.timeout = timeout
+
+    def _push(self, conn, pool):
+        _checkouts.set(_checkouts.get() + ((self, conn, pool),))
+
+    def _pop(self):
+        """The innermost checkout this instance made in this thread / task"""
+        checkouts = _checkouts.get()
+        for i in range(len(checkouts) - 1, -1, -1):
+            if checkouts[i][0] is self:
+                _checkouts.set(checkouts[:i] + checkouts[i + 1:])
+                return checkouts[i][1:]
+        return None, None
+
+    def _sync_pool(self):
+        # Looked up on every enter, so configure() and forks are picked up
+        if self.pool is None:
+            return connection_pool.get_pool(self.db_name)
+        if not isinstance(self.pool, connection_pool.SQLitePool):
+            raise TypeError(f"{type(self.pool).__name__} needs 'async with'")
+        return self.pool
+
+    def _async_pool(self):
+        if self.pool is None:
+            from . import async_pool
+            return async_pool.get_async_pool(self.db_name)  # the running loop's pool
+        if isinstance(self.pool, connection_pool.SQLitePool):
+            raise TypeError("SQLitePool connections need a plain 'with'")
+        return self.pool
+
+    def __enter__(self):
+        # This is called when entering the 'with' block
+        if self.pooled:
+            pool = self._sync_pool()
+            conn = pool.acquire(self.timeout)
+            logger.debug("Checked out a connection to %s", self.db_name)
+        else:
+            pool = None
+            conn = sqlite3.connect(self.db_name)
+            logger.debug("Connected to database: %s", self.db_name)
+        self._push(conn, pool)
+        return conn  # this value will be assigned to the variable after 'as'
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # This is called when exiting the 'with' block
+        conn, pool = self._pop()
+        if conn is not None:
+            if pool is not None:
+                pool.release(conn)  # rolls back an open transaction
+                logger.debug("Returned the connection to %s", self.db_name)
+            else:
+                conn.close()
+                logger.debug("Database connection closed.")
+
+        # If an exception occurred inside the with block, we could handle it here
+        if exc_type:
+            logger.debug("An error occurred: %s", exc_val)
+        # Returning False means any exception will still propagate
+        return False
+
+    async def __aenter__(self):
+        if self.pooled:
+            pool = self._async_pool()
+            conn = await pool.acquire(self.timeout)
+            logger.debug("Checked out an async connection to %s", self.db_name)
+        else:
+            import aiosqlite
+            pool = None
+            conn = await aiosqlite.connect(self.db_name)
+            logger.debug("Connected to database: %s", self.db_name)
+        self._push(conn, pool)
+        return conn
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        conn, pool = self._pop()
+        if conn is not None:
+            if pool is not None:
+                await pool.release(conn)
+                logger.debug("Returned the async connection to %s", self.db_name)
+            else:
+                await conn.close()
+                logger.debug("Database connection closed.")
+        if exc_type:
+            logger.debug("An error occurred: %s", exc_val)
+        return False
+
+    def stats(self):
+        """Metrics of the pool in use (see SQLitePool.stats), None if not pooled"""
+        if not self.pooled:
+            return None
+        if self.pool is None:
+            return connection_pool.get_pool(self.db_name).stats()
+        return self.pool.stats()
+
+
+class ExecuteQuery:
+    """
+    A reusable context manager that:
+    - Opens a database connection (or checks one out, with pooled=True)
+    - Executes a given query with optional parameters
+    - Returns the results inside the with block
+    """
+    def __init__(self, db_name, query, params=None, pooled=False, timeout=None):
+        self.query = query
+        self.params = params or ()
+        self.connection = DatabaseConnection(db_name, pooled=pooled, timeout=timeout)
+        self.results = None
+
+    def __enter__(self):
+        # Step 1: Open the database connection
+        conn = self.connection.__enter__()
+
+        # Step 2: Execute the query
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self.query, self.params)
+            self.results = cursor.fetchall()
+        except BaseException as e:
+            self.connection.__exit__(type(e), e, e.__traceback__)
+            raise
+
+        # Step 3: Return results directly, so user gets data in 'as' variable
+        return self.results
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # Step 4: Always close (or return) the connection
+        # Return False so exceptions are not suppressed
+        return self.connection.__exit__(exc_type, exc_val, exc_tb)
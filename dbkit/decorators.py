@@ -0,0 +1,321 @@
+"""
+The database decorators, in one place: with_db_connection,
+transactional, batched_transactional, retry_on_failure, cache_query and
+log_queries. Each one wraps both plain and `async def` functions.
+
+Importing this module does no I/O and does not load asyncio or
+aiosqlite; the async machinery is imported the first time a coroutine
+function is decorated.
+"""
+import functools
+import logging
+import os
+import time
+
+from . import connection_pool
+from . import instrumentation
+from . import invalidation
+from . import retry_policy
+from .compat import iscoroutinefunction
+from .query_cache import LRUCache, MISSING, make_key
+from .single_flight import AsyncSingleFlight, SingleFlight
+
+logger = logging.getLogger("retry")
+cache_logger = logging.getLogger("query_cache")
+tx_logger = logging.getLogger("transactions")
+
+# Database used when a decorator is not given one
+DATABASE = "users.db"
+
+# Bounded LRU/TTL cache behind @cache_query. With QUERY_CACHE_FILE set, a
+# shared on-disk tier sits behind it, so all worker processes share one
+# cache and start warm after a restart (the file is opened on first use).
+# Writes in other processes only clear the disk tier, so memory entries
+# are then kept for MEMORY_TTL seconds at most. Coroutine callers reach
+# the disk tier through asyncio.to_thread, never on the event loop
+query_cache = LRUCache(max_entries=1024, max_bytes=64 * 1024 * 1024, ttl=300)
+MEMORY_TTL = 5
+if os.environ.get("QUERY_CACHE_FILE"):
+    from .disk_cache import DiskCache, TieredCache
+    query_cache = TieredCache(query_cache, DiskCache(os.environ["QUERY_CACHE_FILE"], ttl=300),
+                              warm_start=query_cache.max_entries, memory_ttl=MEMORY_TTL)
+
+
+def with_db_connection(func=None, *, database=None):
+    """
+    Decorator that checks a database connection out of the pool for
+    `database` (default DATABASE), passes it to the function as first
+    argument, and returns it to the pool afterward (even on errors).
+    Tune the pool with connection_pool.configure(database, ...).
+    Coroutine functions get an aiosqlite connection from async_pool instead.
+    """
+    if func is None:
+        return functools.partial(with_db_connection, database=database)
+    name = DATABASE if database is None else database
+
+    if iscoroutinefunction(func):
+        from . import async_pool
+
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            async with async_pool.get_async_pool(name).connection() as conn:
+                return await func(conn, *args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # A warm connection: schema and statement cache already loaded
+        with connection_pool.get_pool(name).connection() as conn:
+            return func(conn, *args, **kwargs)
+    return wrapper
+
+
+def transactional(func):
+    """
+    Decorator that wraps a function call in a database transaction.
+    After a successful commit, cached reads of the tables it wrote are invalidated.
+    Works the same on coroutine functions taking an aiosqlite connection.
+    """
+    if iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(conn, *args, **kwargs):
+            try:
+                async with invalidation.track_writes(conn) as writes:
+                    result = await func(conn, *args, **kwargs)
+                await conn.commit()
+                await invalidation.atables_written(writes.tables)
+                return result
+            except Exception as e:
+                await conn.rollback()
+                tx_logger.warning("Transaction rolled back due to: %s", e)
+                raise
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(conn, *args, **kwargs):
+        try:
+            with invalidation.track_writes(conn) as writes:
+                result = func(conn, *args, **kwargs)  # Run the function
+            conn.commit()  # ✅ Commit changes if successful
+            invalidation.tables_written(writes.tables)
+            return result
+        except Exception as e:
+            conn.rollback()  # ❌ Rollback if something went wrong
+            tx_logger.warning("Transaction rolled back due to: %s", e)
+            raise  # Re-raise the error so we know something failed
+    return wrapper
+
+
+def batched_transactional(func=None, *, database=None, **options):
+    """
+    Alternative to @with_db_connection + @transactional for small writes.
+    Calls are queued to a shared group_commit.GroupCommitter and committed
+    together with other callers' writes in one transaction, flushed after
+    max_batch writes or max_delay seconds (options of the first decorator
+    for a database win). Each call still returns its own result or raises
+    its own error, once the shared commit is done.
+    wrapper.submit(...) queues a write without waiting and returns a Future.
+    """
+    if func is None:
+        return functools.partial(batched_transactional, database=database, **options)
+    from . import group_commit
+
+    committer = group_commit.get_committer(DATABASE if database is None else database,
+                                           **options)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return committer.call(func, *args, **kwargs)
+
+    wrapper.submit = functools.partial(committer.submit, func)
+    wrapper.committer = committer
+    return wrapper
+
+
+def retry_on_failure(retries=3, delay=2, *, multiplier=2.0, max_delay=30.0,
+                     jitter=True, retry_on=retry_policy.is_transient,
+                     deadline=None, budget=None):
+    """
+    Decorator that retries the function call if it raises a transient error.
+    :param retries: Number of attempts before giving up
+    :param delay: Seconds to wait after the first failure; each later wait
+        is `multiplier` times longer, capped at `max_delay`, and drawn at
+        random below that bound when `jitter` is on
+    :param retry_on: Predicate, exception class or tuple of classes saying
+        which errors are worth retrying (default: SQLite busy/locked)
+    :param deadline: Overall seconds after which no new attempt starts
+    :param budget: RetryBudget shared with other callers (default: the
+        process-wide retry_policy.default_budget)
+    Works on coroutine functions too, waiting with asyncio.sleep.
+    """
+    backoff = retry_policy.Backoff(delay, multiplier, max_delay, jitter)
+    is_retryable = retry_policy.as_predicate(retry_on)
+    shared = retry_policy.default_budget if budget is None else budget
+
+    def next_delay(err, attempt, started):
+        """Seconds to wait before the next attempt, or None to give up"""
+        if attempt >= retries or not is_retryable(err):
+            return None
+        wait = backoff(attempt)
+        if deadline is not None and time.monotonic() - started + wait > deadline:
+            logger.warning("Giving up on %s: deadline of %ss reached", err, deadline)
+            return None
+        if not shared.withdraw():
+            logger.warning("Giving up on %s: retry budget exhausted", err)
+            return None
+        logger.warning("Attempt %d failed: %s; retrying in %.3fs", attempt, err, wait)
+        return wait
+
+    def decorator(func):
+        if iscoroutinefunction(func):
+            import asyncio
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                shared.deposit()
+                started = time.monotonic()
+                attempt = 0
+                while True:
+                    try:
+                        return await func(*args, **kwargs)
+                    except Exception as err:
+                        attempt += 1
+                        wait = next_delay(err, attempt, started)
+                        if wait is None:
+                            raise  # re-raise last exception
+                    await asyncio.sleep(wait)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            shared.deposit()
+            started = time.monotonic()
+            attempt = 0
+            while True:
+                try:
+                    return func(*args, **kwargs)  # Try to execute function
+                except Exception as err:
+                    attempt += 1
+                    wait = next_delay(err, attempt, started)
+                    if wait is None:
+                        raise  # re-raise last exception
+                time.sleep(wait)
+        return wrapper
+    return decorator
+
+
+def cache_query(func=None, *, cache=None, ttl=None):
+    """
+    Decorator that caches results based on the SQL query and its parameters.
+    If the same query is called again with the same arguments, it returns the
+    cached result instead of hitting the database.
+    Use as @cache_query, or @cache_query(cache=..., ttl=...) to pick the cache
+    and a per-entry TTL in seconds.
+    Concurrent misses on the same key run the query once and share the
+    result (single flight). Coroutine functions (e.g. taking an aiosqlite
+    connection) get an async wrapper with the same behaviour.
+    """
+    if func is None:
+        return functools.partial(cache_query, cache=cache, ttl=ttl)
+    store = query_cache if cache is None else cache
+    # Committed writes (see transactional) drop the entries for their tables
+    invalidation.register(store)
+
+    if iscoroutinefunction(func):
+        import asyncio
+
+        flights = AsyncSingleFlight()
+        # A disk tier can wait seconds on its file lock: keep it off the loop
+        tiered = invalidation.has_disk_tier(store)
+
+        @functools.wraps(func)
+        async def async_wrapper(conn, *args, **kwargs):
+            key = make_key(func, args, kwargs)
+            if tiered:
+                result = store.get_local(key, MISSING)
+                if result is MISSING:
+                    result = await asyncio.to_thread(store.get, key, MISSING)
+            else:
+                result = store.get(key, MISSING)
+            if result is not MISSING:
+                return result
+
+            started = invalidation.generation()
+            read_at = time.time()
+
+            async def load():
+                async with invalidation.track_reads(conn) as reads:
+                    result = await func(conn, *args, **kwargs)
+                fresh = functools.partial(invalidation.store_if_fresh, store, key, result,
+                                          reads.tables, started, ttl, read_at,
+                                          conn.in_transaction)
+                if tiered:
+                    await asyncio.to_thread(fresh)
+                else:
+                    fresh()
+                return result
+
+            # Concurrent misses on the same key share one execution. It runs
+            # on this caller's conn: if we are cancelled, do() waits for load
+            # to finish before with_db_connection can return conn to the pool
+            result, _ = await flights.do((key, started), load)
+            return result
+
+        async_wrapper.cache = store
+        async_wrapper.flights = flights
+        return async_wrapper
+
+    flights = SingleFlight()
+
+    @functools.wraps(func)
+    def wrapper(conn, *args, **kwargs):
+        # The connection is not part of the key, everything else is
+        key = make_key(func, args, kwargs)
+        result = store.get(key, MISSING)
+        if result is not MISSING:
+            cache_logger.debug("Using cached result for query: %s", kwargs.get('query'))
+            return result
+
+        # If not cached, execute function, recording the tables it reads
+        started = invalidation.generation()
+        read_at = time.time()
+
+        def load():
+            with invalidation.track_reads(conn) as reads:
+                result = func(conn, *args, **kwargs)
+            # Skipped if a write to these tables committed while we were
+            # reading, or if we read inside a transaction that may roll back
+            if invalidation.store_if_fresh(store, key, result, reads.tables, started,
+                                           ttl, read_at, conn.in_transaction):
+                cache_logger.debug("Stored result for query: %s", kwargs.get('query'))
+            return result
+
+        # Threads missing on the same key at once wait for one execution
+        # and share its result (or exception) instead of all querying.
+        # Keyed by generation too: callers arriving after a committed write
+        # start a fresh execution rather than join one that may be stale.
+        result, shared = flights.do((key, started), load)
+        if shared:
+            cache_logger.debug("Shared in-flight result for query: %s", kwargs.get('query'))
+        return result
+
+    wrapper.cache = store
+    wrapper.flights = flights
+    return wrapper
+
+
+def log_queries(func=None, *, metrics=None):
+    """
+    Decorator that records every SQL query it sees instead of printing it.
+
+    Latency, row count and errors are aggregated in memory per query
+    fingerprint (literals replaced by ?), which costs far less than a
+    synchronous print() per call. A sample of full query texts, with their
+    timestamp, goes to the "queries" logger from a background thread; set
+    the rate with metrics=instrumentation.Instrumentation(sample_rate=...).
+    Dump the stats with log_queries.metrics.export_json().
+    """
+    return instrumentation.instrument_queries(func, metrics=metrics)
+
+
+log_queries.metrics = instrumentation.instrumentation
@@ -0,0 +1,414 @@
+import hashlib
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+
+from . import connection_pool
+from . import invalidation
+from .query_cache import LRUCache, MISSING
+
+logger = logging.getLogger("query_cache")
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS entries (
+        key BLOB PRIMARY KEY,
+        original BLOB,
+        value BLOB NOT NULL,
+        size INTEGER NOT NULL,
+        expires_at REAL,
+        accessed_at REAL NOT NULL
+    ) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)",
+    """CREATE TABLE IF NOT EXISTS entry_tags (
+        tag TEXT NOT NULL,
+        key BLOB NOT NULL,
+        PRIMARY KEY (tag, key)
+    ) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS entry_tags_key ON entry_tags (key)",
+    "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+    # When each tag was last invalidated, by any process (see put(since=...))
+    """CREATE TABLE IF NOT EXISTS tag_writes (
+        tag TEXT PRIMARY KEY,
+        written_at REAL NOT NULL
+    ) WITHOUT ROWID""",
+    "INSERT OR IGNORE INTO meta VALUES ('bytes', 0)",
+)
+
+# Values at least this large are zlib-compressed; the first byte says which
+COMPRESS_MIN = 1024
+RAW, ZLIB = b"r", b"z"
+
+def dumps(value):
+    """Pickle (compact binary for lists of row tuples), zlib when it pays"""
+    data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    if len(data) >= COMPRESS_MIN:
+        packed = zlib.compress(data, 1)
+        if len(packed) < len(data):
+            return ZLIB + packed
+    return RAW + data
+
+def loads(blob):
+    data = blob[1:]
+    if blob[:1] == ZLIB:
+        data = zlib.decompress(data)
+    return pickle.loads(data)
+
+def disk_key(key):
+    """
+    Stable key for the file: a digest of the key's repr. make_key() keys
+    are tuples of the function's module/name and its arguments, whose repr
+    is the same in every worker process (unlike hash(), which is salted).
+    """
+    return hashlib.blake2b(repr(key).encode(), digest_size=16).digest()
+
+class DiskCache:
+    """
+    Cache stored in a local SQLite file, shared by every process that
+    opens the same path (e.g. all gunicorn workers) and kept across
+    restarts.
+
+    Values are pickled (zlib-compressed when large) - only point it at a
+    file your own processes write. The total stored size is bounded by
+    max_bytes: once over it, the least recently accessed entries are
+    evicted down to 90% of it. To keep reads from turning into writes,
+    an entry's access time is only refreshed if older than touch_interval
+    seconds. The file is opened lazily on first use, and errors reading or
+    writing it are logged and treated as misses, so a broken cache file
+    never fails a query.
+
+    invalidate_tags() records when each tag was dropped, in the file, so
+    put(since=t) can refuse a value read at time t if any process has
+    invalidated one of its tags since then.
+    """
+    def __init__(self, path, max_bytes=256 * 1024 * 1024, ttl=None, touch_interval=60.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.touch_interval = touch_interval
+        self._pool = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def _connection(self):
+        with self._lock:
+            if self._pool is None or self._pool.pid != os.getpid():
+                self._pool = connection_pool.SQLitePool(
+                    self.path, size=4, isolation_level=None,
+                    setup=(connection_pool.WAL, connection_pool.SYNCHRONOUS_NORMAL,
+                           connection_pool.pragma("busy_timeout", 5000)))
+                with self._pool.connection() as conn:
+                    for statement in SCHEMA:
+                        conn.execute(statement)
+            return self._pool.connection()
+
+    def _failed(self, action, err):
+        self.errors += 1
+        logger.warning("Disk cache %s failed on %s: %s", action, self.path, err)
+
+    def get(self, key, default=None):
+        return self.get_entry(key, (default, None, ()))[0]
+
+    def get_entry(self, key, default=(None, None, ())):
+        """(value, expires_at, tags) for key, or default on a miss"""
+        dkey = disk_key(key)
+        now = time.time()
+        try:
+            with self._connection() as conn:
+                row = conn.execute(
+                    "SELECT value, expires_at, accessed_at FROM entries WHERE key = ?",
+                    (dkey,)).fetchone()
+                if row is None or (row[1] is not None and row[1] <= now):
+                    self.misses += 1
+                    return default
+                if now - row[2] > self.touch_interval:
+                    conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?",
+                                 (now, dkey))
+                tags = [tag for (tag,) in conn.execute(
+                    "SELECT tag FROM entry_tags WHERE key = ?", (dkey,))]
+            value = loads(row[0])
+        except (sqlite3.Error, pickle.UnpicklingError, zlib.error, EOFError) as err:
+            self._failed("read", err)
+            return default
+        self.hits += 1
+        return value, row[1], tags
+
+    def put(self, key, value, ttl=None, tags=(), since=None):
+        """
+        Store value; with since (a time.time() taken before the value was
+        read) it is skipped if one of tags was invalidated after since.
+        Returns whether it was stored.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        try:
+            blob = dumps(value)
+        except (pickle.PicklingError, TypeError, AttributeError) as err:
+            self._failed("serialize", err)
+            return False
+        if len(blob) > self.max_bytes:
+            return False
+        dkey = disk_key(key)
+        try:
+            # Kept so warm starts can fill the memory tier under the real key
+            original = pickle.dumps(key, pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            original = None
+
+        tags = list(tags)
+
+        def store(conn):
+            if since is not None and tags:
+                marks = ",".join("?" * len(tags))
+                if conn.execute(f"SELECT 1 FROM tag_writes WHERE tag IN ({marks}) "
+                                f"AND written_at >= ? LIMIT 1", (*tags, since)).fetchone():
+                    return False
+            self._delete(conn, [dkey])
+            conn.execute("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                         (dkey, original, blob, len(blob), expires_at, now))
+            conn.executemany("INSERT OR IGNORE INTO entry_tags VALUES (?, ?)",
+                             [(tag, dkey) for tag in tags])
+            conn.execute("UPDATE meta SET value = value + ? WHERE name = 'bytes'",
+                         (len(blob),))
+            self._evict(conn)
+            return True
+
+        return bool(self._write("write", store))
+
+    def _delete(self, conn, dkeys):
+        """Remove entries and their tags, keeping the byte total in step"""
+        freed = 0
+        for dkey in dkeys:
+            row = conn.execute("DELETE FROM entries WHERE key = ? RETURNING size",
+                               (dkey,)).fetchone()
+            if row is not None:
+                freed += row[0]
+                conn.execute("DELETE FROM entry_tags WHERE key = ?", (dkey,))
+        if freed:
+            conn.execute("UPDATE meta SET value = value - ? WHERE name = 'bytes'", (freed,))
+        return freed
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT value FROM meta WHERE name = 'bytes'").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = total - int(self.max_bytes * 0.9)
+        victims, freed = [], 0
+        for dkey, size in conn.execute(
+                "SELECT key, size FROM entries ORDER BY accessed_at"):
+            victims.append(dkey)
+            freed += size
+            if freed >= target:
+                break
+        self._delete(conn, victims)
+        self.evictions += len(victims)
+
+    def _write(self, action, work):
+        """Run work(conn) in a write transaction; None if the file failed"""
+        try:
+            with self._connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    result = work(conn)
+                    conn.execute("COMMIT")
+                    return result
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+        except sqlite3.Error as err:
+            self._failed(action, err)
+            return None
+
+    def invalidate(self, key):
+        return bool(self._write("invalidate", lambda conn: self._delete(conn, [disk_key(key)])))
+
+    def invalidate_tags(self, tags):
+        """Drop every entry tagged with any of tags; returns how many"""
+        tags = list(tags)
+        if not tags:
+            return 0
+
+        now = time.time()
+
+        def drop(conn):
+            conn.executemany("INSERT OR REPLACE INTO tag_writes VALUES (?, ?)",
+                             [(tag, now) for tag in tags])
+            marks = ",".join("?" * len(tags))
+            dkeys = [dkey for (dkey,) in conn.execute(
+                f"SELECT DISTINCT key FROM entry_tags WHERE tag IN ({marks})", tags)]
+            self._delete(conn, dkeys)
+            return len(dkeys)
+
+        return self._write("invalidate", drop) or 0
+
+    def recent(self, limit):
+        """Up to limit live (key, value, expires_at, tags), most recently used first"""
+        now = time.time()
+        try:
+            with self._connection() as conn:
+                rows = conn.execute(
+                    "SELECT key, original, value, expires_at FROM entries "
+                    "WHERE original IS NOT NULL "
+                    "AND (expires_at IS NULL OR expires_at > ?) "
+                    "ORDER BY accessed_at DESC LIMIT ?", (now, limit)).fetchall()
+                return [(pickle.loads(original), loads(value), expires_at,
+                         [tag for (tag,) in conn.execute(
+                             "SELECT tag FROM entry_tags WHERE key = ?", (dkey,))])
+                        for dkey, original, value, expires_at in rows]
+        except (sqlite3.Error, pickle.UnpicklingError, zlib.error, EOFError) as err:
+            self._failed("read", err)
+            return []
+
+    def clear(self):
+        def drop_all(conn):
+            conn.execute("DELETE FROM entries")
+            conn.execute("DELETE FROM entry_tags")
+            conn.execute("DELETE FROM tag_writes")
+            conn.execute("UPDATE meta SET value = 0 WHERE name = 'bytes'")
+
+        self._write("clear", drop_all)
+
+    def stats(self):
+        try:
+            with self._connection() as conn:
+                entries = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+                total = conn.execute(
+                    "SELECT value FROM meta WHERE name = 'bytes'").fetchone()[0]
+        except sqlite3.Error:
+            entries = total = None
+        return {
+            "path": self.path,
+            "entries": entries,
+            "bytes": total,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "errors": self.errors,
+        }
+
+class TieredCache:
+    """
+    The in-process LRUCache in front of a shared DiskCache.
+
+    get() tries memory first, then disk; disk hits are copied into memory
+    with their remaining TTL and tags, unless a write to one of those
+    tables committed here while the disk was read. put() and invalidate_tags() go to
+    both tiers, so a committed write in this process clears both. Another
+    process's memory tier only notices such a write once its own entry
+    expires, so memory entries are kept at most memory_ttl seconds: keep
+    it short when several processes write.
+
+    With warm_start=N the N most recently used disk entries are loaded
+    into memory on first use, so a freshly started worker is not cold.
+    """
+    def __init__(self, memory, disk, warm_start=0, memory_ttl=None):
+        self.memory = memory
+        self.disk = disk
+        self.warm_start = warm_start
+        self.memory_ttl = memory_ttl
+        self._warmed = not warm_start
+
+    def _memory_ttl(self, ttl):
+        """ttl for the memory tier (None: its default), capped at memory_ttl"""
+        if self.memory_ttl is None:
+            return ttl
+        if ttl is None:
+            ttl = self.memory.ttl
+        return self.memory_ttl if ttl is None else min(ttl, self.memory_ttl)
+
+    def warm(self, limit=None):
+        """Copy the most recently used disk entries into memory; returns how many"""
+        self._warmed = True
+        now = time.time()
+        entries = self.disk.recent(self.warm_start if limit is None else limit)
+        for key, value, expires_at, tags in reversed(entries):
+            ttl = expires_at - now if expires_at is not None else None
+            self.memory.put(key, value, ttl=self._memory_ttl(ttl), tags=tags)
+        return len(entries)
+
+    def get(self, key, default=None):
+        if not self._warmed:
+            self.warm()
+        value = self.memory.get(key, MISSING)
+        if value is not MISSING:
+            return value
+        since = invalidation.generation()
+        value, expires_at, tags = self.disk.get_entry(key, (MISSING, None, ()))
+        if value is MISSING:
+            return default
+        ttl = expires_at - time.time() if expires_at is not None else None
+        invalidation.store_if_fresh(self.memory, key, value, set(tags), since,
+                                    ttl=self._memory_ttl(ttl))
+        return value
+
+    def get_local(self, key, default=None):
+        """Look in the memory tier only"""
+        return self.memory.get(key, default)
+
+    def put(self, key, value, ttl=None, tags=()):
+        self.put_local(key, value, ttl=ttl, tags=tags)
+        self.put_shared(key, value, ttl=ttl, tags=tags)
+
+    def put_local(self, key, value, ttl=None, tags=()):
+        """Store in the memory tier only (see invalidation.store_if_fresh)"""
+        self.memory.put(key, value, ttl=self._memory_ttl(ttl), tags=tags)
+
+    def put_shared(self, key, value, ttl=None, tags=(), since=None):
+        """Store in the disk tier only; see DiskCache.put for since"""
+        return self.disk.put(key, value, ttl=ttl, tags=tags, since=since)
+
+    def invalidate(self, key):
+        on_disk = self.disk.invalidate(key)
+        return self.memory.invalidate(key) or on_disk
+
+    def invalidate_tags(self, tags):
+        tags = set(tags)
+        dropped = self.memory.invalidate_tags(tags)
+        self.disk.invalidate_tags(tags)
+        return dropped
+
+    def clear(self):
+        self.memory.clear()
+        self.disk.clear()
+
+    def __contains__(self, key):
+        return self.get(key, MISSING) is not MISSING
+
+    def __len__(self):
+        return len(self.memory)
+
+    def stats(self):
+        stats = self.memory.stats()
+        stats["disk"] = self.disk.stats()
+        return stats
+
+def benchmark(lookups=2000, path="disk_cache_bench.sqlite3"):
+    """Lookup cost of a memory hit, a disk hit and the on-disk size of a result"""
+    rows = [(i, f"user{i}", f"user{i}@example.com", 20 + i % 50) for i in range(100)]
+    disk = DiskCache(path)
+    disk.clear()
+    memory = LRUCache()
+    for i in range(100):
+        disk.put(("users", i), rows, tags=["users"])
+        memory.put(("users", i), rows)
+
+    results = {}
+    for label, cache in (("memory hit", memory), ("disk hit", disk)):
+        start = time.perf_counter()
+        for i in range(lookups):
+            cache.get(("users", i % 100))
+        results[label] = (time.perf_counter() - start) / lookups
+    for label, seconds in results.items():
+        print(f"{label:<10} {seconds * 1e6:7.1f} us/lookup")
+    print(f"100-row result: {len(pickle.dumps(rows))} B pickled, {len(dumps(rows))} B stored")
+    return results
+
+if __name__ == "__main__":
+    benchmark()
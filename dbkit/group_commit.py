@@ -0,0 +1,242 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from . import connection_pool
+from . import invalidation
+
+class GroupCommitter:
+    """
+    Coalesces small write transactions into one SQLite transaction.
+
+    A single writer thread owns one pooled connection. Callers submit
+    write functions (called as func(conn, *args, **kwargs), like under
+    @transactional) and get a Future back. The writer takes the first
+    queued job, keeps collecting until it has max_batch jobs or
+    max_delay seconds have passed, then runs them all inside one
+    BEGIN IMMEDIATE ... COMMIT, so the batch pays for one commit (one
+    fsync) instead of one each.
+
+    Every job runs inside its own SAVEPOINT: a job that raises is rolled
+    back to its savepoint and gets its exception, without affecting the
+    others. The remaining jobs' futures resolve only after the COMMIT
+    succeeds (or all get the commit error), so a caller never sees
+    success for a write that was not durable. Write functions must not
+    commit or roll back themselves; if one does (or SQLite ends the
+    transaction on its own, e.g. on SQLITE_FULL or an I/O error), every
+    job of the batch fails and the writer carries on with the next one.
+    """
+    def __init__(self, database, max_batch=64, max_delay=0.002):
+        self.database = database
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.pid = os.getpid()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self.batches = 0
+        self.writes = 0
+        self.failures = 0
+
+    def submit(self, func, *args, **kwargs):
+        """Queue func(conn, *args, **kwargs); returns a Future of its result"""
+        if self._closed:
+            raise RuntimeError("Group committer is closed")
+        if self._thread is not None and not self._thread.is_alive():
+            raise RuntimeError("Group commit writer thread has stopped")
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    thread = threading.Thread(
+                        target=self._run, name="group-commit", daemon=True)
+                    thread.start()
+                    self._thread = thread  # only ever seen started
+        future = Future()
+        self._queue.put((future, func, args, kwargs))
+        return future
+
+    def call(self, func, *args, **kwargs):
+        """Run func in the next batch and wait for its own result"""
+        future = self.submit(func, *args, **kwargs)
+        while True:
+            try:
+                return future.result(timeout=1.0)
+            except FutureTimeout:
+                # Never wait forever on a writer that is gone
+                if not self._thread.is_alive() and not future.done():
+                    raise RuntimeError("Group commit writer thread has stopped") from None
+
+    def _collect(self, first):
+        batch = [first]
+        flush_at = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                remaining = flush_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    job = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if job is None:
+                self._queue.put(None)  # stop after this batch
+                break
+            batch.append(job)
+        return batch
+
+    def _run(self):
+        try:
+            pool = connection_pool.get_pool(self.database)
+            with pool.connection() as conn:
+                while True:
+                    job = self._queue.get()
+                    if job is None:
+                        return
+                    self._commit(conn, self._collect(job))
+        finally:
+            # Whatever stopped us, nobody may be left waiting on the queue
+            while True:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is not None and job[0].set_running_or_notify_cancel():
+                    job[0].set_exception(RuntimeError("Group commit writer thread has stopped"))
+
+    def _commit(self, conn, batch):
+        # Drop jobs whose caller cancelled the future while it was queued
+        batch = [job for job in batch if job[0].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        done = []      # (future, result) of jobs that ran cleanly
+        tables = set()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for index, (future, func, args, kwargs) in enumerate(batch):
+                savepoint = f"job_{index}"
+                conn.execute(f"SAVEPOINT {savepoint}")
+                try:
+                    with invalidation.track_writes(conn) as writes:
+                        result = func(conn, *args, **kwargs)
+                except Exception as err:
+                    future.set_exception(err)
+                    self.failures += 1
+                    if not conn.in_transaction:
+                        # The error ended the whole transaction (SQLite rolls
+                        # back on e.g. FULL/IOERR), taking the earlier jobs with it
+                        raise sqlite3.OperationalError(
+                            f"Batch transaction rolled back by a failed write: {err}") from err
+                    conn.execute(f"ROLLBACK TO {savepoint}")
+                    conn.execute(f"RELEASE {savepoint}")
+                    continue
+                if not conn.in_transaction:
+                    raise sqlite3.OperationalError(
+                        "A write function committed or rolled back the batch transaction")
+                conn.execute(f"RELEASE {savepoint}")
+                tables |= writes.tables
+                done.append((future, result))
+            conn.commit()
+        except BaseException as err:
+            # Fail every job that has no outcome yet and leave the connection
+            # clean for the next batch; the writer thread keeps running
+            if conn.in_transaction:
+                try:
+                    conn.rollback()
+                except sqlite3.Error:
+                    pass
+            for future, _, _, _ in batch:
+                if not future.done():
+                    future.set_exception(err)
+                    self.failures += 1
+            return
+        invalidation.tables_written(tables)
+        self.batches += 1
+        self.writes += len(done)
+        for future, result in done:
+            future.set_result(result)
+
+    def stats(self):
+        return {
+            "database": self.database,
+            "batches": self.batches,
+            "writes": self.writes,
+            "failures": self.failures,
+            "mean_batch": self.writes / self.batches if self.batches else 0.0,
+            "queued": self._queue.qsize(),
+        }
+
+    def close(self, timeout=None):
+        """Flush queued writes and stop the writer thread"""
+        self._closed = True
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+# Process-wide committers, one per database file
+_committers = {}
+_registry_lock = threading.Lock()
+
+def get_committer(database, **options):
+    """The shared GroupCommitter for database, created on first use (and after fork)"""
+    path = os.path.abspath(database)
+    with _registry_lock:
+        committer = _committers.get(path)
+        if committer is None or committer.pid != os.getpid():
+            committer = _committers[path] = GroupCommitter(path, **options)
+        return committer
+
+def benchmark(threads=8, writes_per_thread=200, database="group_commit_bench.db"):
+    """Writes/s with one commit per call vs group commit, from concurrent threads"""
+    conn = sqlite3.connect(database)
+    conn.execute("DROP TABLE IF EXISTS users")
+    conn.execute("CREATE TABLE users "
+                 "(id INTEGER PRIMARY KEY, name TEXT, email TEXT, age INT)")
+    conn.executemany("INSERT INTO users VALUES (?, ?, ?, ?)",
+                     [(i, f"user{i}", f"user{i}@example.com", 30)
+                      for i in range(threads)])
+    conn.commit()
+    conn.close()
+
+    def update_email(conn, user_id, new_email):
+        conn.execute("UPDATE users SET email = ? WHERE id = ?", (new_email, user_id))
+
+    pool = connection_pool.SQLitePool(database, size=threads)
+
+    def commit_per_call(user_id, n):
+        with pool.connection() as conn:
+            update_email(conn, user_id, f"{n}@example.com")
+            conn.commit()
+
+    committer = GroupCommitter(database)
+
+    def grouped(user_id, n):
+        committer.call(update_email, user_id, f"{n}@example.com")
+
+    results = {}
+    for label, write in (("commit per call", commit_per_call), ("group commit", grouped)):
+        def worker(user_id):
+            for n in range(writes_per_thread):
+                write(user_id, n)
+        workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        start = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        results[label] = threads * writes_per_thread / (time.perf_counter() - start)
+    committer.close()
+    pool.close()
+
+    for label, rate in results.items():
+        print(f"{label:<16} {rate:8.0f} writes/s")
+    print(committer.stats())
+    return results
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,119 @@
+#!/usr/bin/python3
+"""
+Import-time benchmark of the dbkit modules (python -X importtime).
+
+Imports each target in a fresh interpreter, several times, and reports
+the best cumulative import time in microseconds together with the
+heaviest modules it pulled in. Keep the JSON of a run to track it:
+
+    python -m dbkit.importtime --output importtime.json
+    python -m dbkit.importtime --compare importtime.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_TARGETS = (
+    "dbkit",
+    "dbkit.decorators",
+    "dbkit.context",
+    "dbkit.connection_pool",
+    "dbkit.query_plans",
+)
+# Modules that must never be loaded by importing a target
+HEAVY_MODULES = ("asyncio", "aiosqlite", "inspect", "concurrent.futures")
+
+
+def parse(stderr):
+    """(name, self_us, cumulative_us) for each line of -X importtime output"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        entries.append((name.strip(), int(self_us), int(cumulative_us)))
+    return entries
+
+
+def measure(target):
+    """One fresh-interpreter import of target: (cumulative us, modules)"""
+    # Modules the interpreter loads at startup are not reported, so only
+    # what the target adds is counted
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+        env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1"))
+    entries = parse(completed.stderr)
+    top = target.split(".")[0]
+    total = sum(cumulative for name, _, cumulative in entries
+                if name == top or name == target)
+    return total, entries
+
+
+def run(targets, repeat):
+    results = []
+    for target in targets:
+        best = None
+        for _ in range(repeat):
+            total, entries = measure(target)
+            if best is None or total < best[0]:
+                best = (total, entries)
+        total, entries = best
+        loaded = {name for name, _, _ in entries}
+        heaviest = sorted(entries, key=lambda entry: entry[1], reverse=True)[:5]
+        result = {
+            "target": target,
+            "import_us": total,
+            "modules": len(entries),
+            "heavy_modules": sorted(loaded.intersection(HEAVY_MODULES)),
+            "heaviest": [{"module": name, "self_us": self_us}
+                         for name, self_us, _ in heaviest],
+        }
+        results.append(result)
+        print(f"{target:<24} {total / 1000:7.1f} ms  {len(entries):4d} modules  "
+              f"heavy: {', '.join(result['heavy_modules']) or '-'}")
+    return {"python": platform.python_version(), "results": results}
+
+
+def compare(current, baseline, tolerance=0.25):
+    """Print import-time changes against a previous run; returns the regressions"""
+    previous = {r["target"]: r for r in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        old = previous.get(result["target"])
+        if not old:
+            continue
+        ratio = result["import_us"] / old["import_us"]
+        flag = "REGRESSION" if ratio > 1 + tolerance or result["heavy_modules"] else ""
+        print(f"{result['target']:<24} {ratio:6.2f}x {flag}")
+        if flag:
+            regressions.append((result["target"], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("targets", nargs="*", default=list(DEFAULT_TARGETS))
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="imports per target; the fastest counts")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--compare", help="JSON from a previous run")
+    args = parser.parse_args()
+
+    report = run(args.targets, args.repeat)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            if compare(report, json.load(file)):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
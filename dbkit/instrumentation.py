@@ -0,0 +1,256 @@
+import functools
+import json
+import logging
+import queue
+import random
+import re
+import threading
+import time
+from datetime import datetime
+
+from .compat import iscoroutinefunction
+
+logger = logging.getLogger("queries")
+
+# Latency histogram buckets: exclusive upper bounds in microseconds (powers
+# of 2), plus one overflow bucket
+BUCKETS_US = tuple(2 ** i for i in range(4, 25))
+_OVERFLOW = len(BUCKETS_US)
+
+# One pass for both kinds of literal: quoted strings and bare numbers
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(\s*,\s*\?)*\s*\)")
+
+@functools.lru_cache(maxsize=4096)
+def fingerprint(query):
+    """
+    Normalize a query so that calls differing only in literals share
+    stats: literals become ?, IN lists collapse, whitespace is squashed.
+    "SELECT * FROM users WHERE id = 7" -> "SELECT * FROM users WHERE id = ?"
+    """
+    query = " ".join(_LITERAL.sub("?", query).split())
+    if "?," in query or "? ," in query:
+        query = _IN_LIST.sub("(?)", query)
+    return query
+
+class QueryStats:
+    """Counters and a latency histogram for one query fingerprint"""
+    __slots__ = ("calls", "errors", "rows", "total_us", "max_us", "buckets")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_us = 0.0
+        self.max_us = 0.0
+        self.buckets = [0] * (len(BUCKETS_US) + 1)
+
+    def record(self, elapsed_us, rows, failed):
+        self.calls += 1
+        self.errors += failed
+        self.rows += rows
+        self.total_us += elapsed_us
+        if elapsed_us > self.max_us:
+            self.max_us = elapsed_us
+        # int(x).bit_length() picks the power-of-2 bucket without a search
+        index = int(elapsed_us).bit_length() - 4
+        if index < 0:
+            index = 0
+        elif index > _OVERFLOW:
+            index = _OVERFLOW
+        self.buckets[index] += 1
+
+    def percentile(self, q):
+        """Upper bound (us) of the bucket holding the q-th latency"""
+        target = q * self.calls
+        seen = 0
+        for bound, count in zip(BUCKETS_US + (None,), self.buckets):
+            seen += count
+            if count and seen >= target:
+                return bound if bound is not None else self.max_us
+        return 0.0
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "rows": self.rows,
+            "mean_us": self.total_us / self.calls if self.calls else 0.0,
+            "max_us": self.max_us,
+            "p50_us": self.percentile(0.5),
+            "p95_us": self.percentile(0.95),
+            "p99_us": self.percentile(0.99),
+            "histogram_us": {
+                (str(bound) if bound is not None else "inf"): count
+                for bound, count in zip(BUCKETS_US + (None,), self.buckets)
+                if count
+            },
+        }
+
+class QueryLog:
+    """
+    Ships sampled query records to `sink` on a daemon thread, so the
+    calling thread only pays for a queue put (no formatting, no stdout).
+    """
+    def __init__(self, sink=None):
+        self.sink = sink or (lambda record: logger.info(json.dumps(record)))
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, record):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="query-log",
+                                                    daemon=True)
+                    self._thread.start()
+        self._queue.put(record)
+
+    def _run(self):
+        while True:
+            record = self._queue.get()
+            try:
+                self.sink(record)
+            except Exception:
+                logger.exception("Query log sink failed")
+            finally:
+                self._queue.task_done()
+
+    def flush(self, timeout=5.0):
+        """Wait until the records submitted so far have been handed to the sink"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.001)
+
+class Instrumentation:
+    """
+    In-memory query metrics keyed by fingerprint: calls, errors, rows and
+    a latency histogram. sample_rate is the fraction of calls whose full
+    query text (with timestamp and latency) goes to the background log.
+    """
+    def __init__(self, sample_rate=0.0, log=None):
+        self.sample_rate = sample_rate
+        self.log = log or QueryLog()
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, query, elapsed_us, rows, error=None):
+        key = fingerprint(query) if query else "<no query>"
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = QueryStats()
+            stats.record(elapsed_us, rows, error is not None)
+        if self.sample_rate and random.random() < self.sample_rate:
+            self.log.submit({
+                "timestamp": datetime.now().isoformat(),
+                "fingerprint": key,
+                "query": query,
+                "elapsed_us": round(elapsed_us, 1),
+                "rows": rows,
+                "error": repr(error) if error is not None else None,
+            })
+
+    def snapshot(self):
+        with self._lock:
+            return {key: stats.as_dict() for key, stats in self._stats.items()}
+
+    def export_json(self, path=None, **dump_options):
+        """Dump all stats as JSON; returns the JSON text (and writes path if given)"""
+        text = json.dumps(self.snapshot(), **dump_options)
+        if path is not None:
+            with open(path, "w") as file:
+                file.write(text)
+        return text
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+# Process-wide default used by the decorators
+instrumentation = Instrumentation()
+
+def count_rows(result):
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    rowcount = getattr(result, "rowcount", -1)
+    return rowcount if isinstance(rowcount, int) and rowcount > 0 else int(result is not None)
+
+def find_query(args, kwargs):
+    """The SQL passed as query=... or as the first string argument"""
+    query = kwargs.get("query")
+    if query is None:
+        query = next((arg for arg in args if isinstance(arg, str)), None)
+    return query
+
+def instrument_queries(func=None, *, metrics=None):
+    """
+    Decorator recording latency, row count and errors of each call under
+    the fingerprint of its query. Use bare or as
+    @instrument_queries(metrics=Instrumentation(sample_rate=0.01)).
+    On a coroutine function the latency covers the awaited call.
+    """
+    if func is None:
+        return functools.partial(instrument_queries, metrics=metrics)
+    target = instrumentation if metrics is None else metrics
+    clock = time.perf_counter
+
+    if iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            query = find_query(args, kwargs)
+            start = clock()
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as err:
+                target.record(query, (clock() - start) * 1e6, 0, err)
+                raise
+            target.record(query, (clock() - start) * 1e6, count_rows(result))
+            return result
+
+        async_wrapper.metrics = target
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        query = find_query(args, kwargs)
+        start = clock()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as err:
+            target.record(query, (clock() - start) * 1e6, 0, err)
+            raise
+        target.record(query, (clock() - start) * 1e6, count_rows(result))
+        return result
+
+    wrapper.metrics = target
+    return wrapper
+
+def benchmark(calls=20000):
+    """Per-call overhead of print() logging vs instrument_queries on a no-op query"""
+    import contextlib
+    import io
+
+    def run(query):
+        return [(1, "a")]
+
+    def printed(query):
+        print(f"[{datetime.now()}] Executing query: {query}")
+        return run(query)
+
+    instrumented = instrument_queries(run, metrics=Instrumentation(sample_rate=0.01))
+    results = {}
+    for label, func in (("bare", run), ("print", printed), ("instrumented", instrumented)):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            for i in range(calls):
+                func(f"SELECT * FROM users WHERE id = {i % 100}")
+            results[label] = (time.perf_counter() - start) / calls
+    for label, seconds in results.items():
+        print(f"{label:<13} {seconds * 1e9:7.0f} ns/call")
+    print(instrumented.metrics.export_json(indent=2))
+    return results
+
+if __name__ == "__main__":
+    benchmark()
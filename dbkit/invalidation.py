@@ -0,0 +1,167 @@
+import sqlite3
+import threading
+
+# sqlite3 authorizer actions that read from / write to a table (arg1 = table)
+READ_ACTIONS = {sqlite3.SQLITE_READ}
+WRITE_ACTIONS = {sqlite3.SQLITE_INSERT, sqlite3.SQLITE_UPDATE,
+                 sqlite3.SQLITE_DELETE, sqlite3.SQLITE_DROP_TABLE}
+
+_lock = threading.Lock()
+_generation = 0      # bumped on every committed write
+_last_written = {}   # table -> generation of its last committed write
+_caches = []         # caches holding table-tagged entries
+_active = {}         # connection -> its active trackers (outermost first)
+
+class TableTracker:
+    """
+    Records which tables the statements on a sqlite3 connection read or
+    write, using the connection's authorizer callback (SQLite reports the
+    exact tables, no SQL parsing needed). Use as a context manager around
+    the work. With an aiosqlite connection use `async with` (its
+    set_authorizer is a coroutine).
+
+    Trackers nest: a connection has one authorizer, which reports to every
+    tracker active on it, so a cached read inside a transaction does not
+    stop the transaction's writes from being recorded. The authorizer is
+    removed when the outermost tracker exits.
+    """
+    def __init__(self, conn, actions):
+        self.conn = conn
+        self.actions = actions
+        self.tables = set()
+
+    def _record(self, action, table):
+        if action in self.actions and table and not table.startswith("sqlite_"):
+            self.tables.add(table.lower())
+
+    def _push(self):
+        """Start tracking; returns the authorizer to install, or None if set"""
+        with _lock:
+            trackers = _active.setdefault(self.conn, [])
+            trackers.append(self)
+            if len(trackers) > 1:
+                return None
+
+        def authorize(action, arg1, arg2, db_name, trigger):
+            for tracker in tuple(trackers):
+                tracker._record(action, arg1)
+            return sqlite3.SQLITE_OK
+        return authorize
+
+    def _pop(self):
+        """Stop tracking; returns whether the authorizer should be removed"""
+        with _lock:
+            trackers = _active.get(self.conn, [])
+            if self in trackers:
+                trackers.remove(self)
+            if trackers:
+                return False
+            _active.pop(self.conn, None)
+            return True
+
+    def __enter__(self):
+        authorize = self._push()
+        if authorize is not None:
+            self.conn.set_authorizer(authorize)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._pop():
+            self.conn.set_authorizer(None)
+        return False
+
+    async def __aenter__(self):
+        authorize = self._push()
+        if authorize is not None:
+            await self.conn.set_authorizer(authorize)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self._pop():
+            await self.conn.set_authorizer(None)
+        return False
+
+def track_reads(conn):
+    return TableTracker(conn, READ_ACTIONS)
+
+def track_writes(conn):
+    return TableTracker(conn, WRITE_ACTIONS)
+
+def register(cache):
+    """Have cache.invalidate_tags() called whenever tables are written"""
+    with _lock:
+        if cache not in _caches:
+            _caches.append(cache)
+
+def generation():
+    """Snapshot to take before running a read (see store_if_fresh)"""
+    with _lock:
+        return _generation
+
+def _written_since(tables, since):
+    """Whether a committed write touched one of tables after generation since"""
+    return any(_last_written.get(table, 0) > since for table in tables)
+
+def store_if_fresh(cache, key, value, tables, since, ttl=None, read_at=None,
+                   in_transaction=False):
+    """
+    Cache a read of tables taken at generation `since`, unless one of them
+    was written after that. Reads made inside an open transaction are never
+    cached (pass conn.in_transaction as in_transaction): they may see writes
+    that are later rolled back. Checking and storing under the same lock that
+    tables_written() takes means a concurrent write either sees the entry
+    (and drops it) or makes us skip it. Returns whether it was stored.
+
+    A TieredCache only gets its memory tier filled under the lock. The
+    disk write can wait on the file lock for seconds, so it happens after
+    the lock is released. The disk tier then does its own check:
+    DiskCache.put(since=read_at) skips the entry if any process
+    invalidated one of these tables after read_at (the time.time() at
+    which the read started). This also covers writes committed by other
+    processes, which the generations here never see.
+    """
+    if in_transaction:
+        return False
+    put_shared = getattr(cache, "put_shared", None)
+    with _lock:
+        if _written_since(tables, since):
+            return False
+        if put_shared is None:
+            cache.put(key, value, ttl=ttl, tags=tables)
+            return True
+        cache.put_local(key, value, ttl=ttl, tags=tables)
+    put_shared(key, value, ttl=ttl, tags=tables, since=read_at)
+    return True
+
+def has_disk_tier(cache):
+    """Whether cache has a shared disk tier, whose calls can wait seconds on a file lock"""
+    return hasattr(cache, "put_shared")
+
+def _mark_written(tables):
+    global _generation
+    with _lock:
+        _generation += 1
+        for table in tables:
+            _last_written[table] = _generation
+        return list(_caches)
+
+def tables_written(tables):
+    """Call after a write commits: drops every cached read of those tables"""
+    tables = {table.lower() for table in tables}
+    if not tables:
+        return
+    for cache in _mark_written(tables):
+        cache.invalidate_tags(tables)
+    # Again once the caches are cleared: a read that started while a disk
+    # tier was still being cleared may have seen an old entry there
+    _mark_written(tables)
+
+async def atables_written(tables):
+    """tables_written() for coroutines, off the event loop if a disk tier is registered"""
+    with _lock:
+        blocking = any(has_disk_tier(cache) for cache in _caches)
+    if not blocking:
+        tables_written(tables)
+        return
+    import asyncio
+    await asyncio.to_thread(tables_written, tables)
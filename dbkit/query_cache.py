@@ -0,0 +1,188 @@
+import sys
+import threading
+import time
+import timeit
+from collections import OrderedDict
+
+MISSING = object()
+
+def estimate_size(value):
+    """
+    Rough memory footprint of a cached result: the container, its rows and
+    the values in each row (cursor results are lists of tuples).
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        for row in value:
+            size += sys.getsizeof(row)
+            if isinstance(row, (list, tuple)):
+                size += sum(sys.getsizeof(item) for item in row)
+    return size
+
+class LRUCache:
+    """
+    Bounded, thread-safe LRU cache with per-entry TTL.
+
+    Entries live in an OrderedDict ordered from least to most recently
+    used, so get/put/evict are all O(1). The cache is bounded by
+    max_entries and by max_bytes (measured with estimate_size); the least
+    recently used entries are evicted first. Expired entries are dropped
+    when they are next looked up. Entries can carry tags (e.g. the tables
+    a query read) so invalidate_tags() can drop all entries for a table.
+    """
+    def __init__(self, max_entries=1024, max_bytes=None, ttl=None, sizeof=estimate_size):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self._entries = OrderedDict()  # key -> (value, expires_at, size, tags)
+        self._tags = {}                # tag -> keys of the entries carrying it
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _remove(self, key):
+        """Drop key and its tag index entries (caller holds the lock)"""
+        _, _, size, tags = self._entries.pop(key)
+        self._bytes -= size
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key, MISSING)
+            if entry is MISSING:
+                self.misses += 1
+                return default
+            value, expires_at, _, _ = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, ttl=None, tags=()):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return  # would evict everything else and still not fit
+        tags = frozenset(tags)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires_at, size, tags)
+            self._bytes += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries or (
+                    self.max_bytes is not None and self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._remove(key)
+            return True
+
+    def invalidate_tags(self, tags):
+        """Drop every entry tagged with any of tags; returns how many"""
+        with self._lock:
+            keys = set()
+            for tag in tags:
+                keys.update(self._tags.get(tag, ()))
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._bytes = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and (
+                entry[1] is None or entry[1] > time.monotonic())
+
+    def __getitem__(self, key):
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.put(key, value)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+def make_key(func, args, kwargs):
+    """
+    Cache key from the function and every argument it was called with, so
+    the same query with different bound parameters is cached separately.
+    Unhashable arguments (e.g. a params list) are keyed by their repr.
+    """
+    key = (func.__module__, func.__qualname__, args, tuple(sorted(kwargs.items())))
+    try:
+        hash(key)
+    except TypeError:
+        key = (func.__module__, func.__qualname__, repr(args),
+               repr(sorted(kwargs.items())))
+    return key
+
+def benchmark(operations=200000, keys=1000):
+    """get/put cost of LRUCache against the plain dict it replaces"""
+    rows = [(i, f"user{i}", f"user{i}@example.com") for i in range(10)]
+    plain = {}
+    cache = LRUCache(max_entries=keys, max_bytes=64 * 1024 * 1024, ttl=60)
+
+    def use_dict():
+        for i in range(operations):
+            key = ("SELECT * FROM users WHERE id = ?", (i % keys,))
+            if key not in plain:
+                plain[key] = rows
+            plain[key]
+
+    def use_lru():
+        for i in range(operations):
+            key = ("SELECT * FROM users WHERE id = ?", (i % keys,))
+            if cache.get(key) is None:
+                cache.put(key, rows)
+
+    dict_time = timeit.timeit(use_dict, number=1) / operations
+    lru_time = timeit.timeit(use_lru, number=1) / operations
+    print(f"dict:     {dict_time * 1e9:.0f} ns/op (unbounded, no TTL)")
+    print(f"LRUCache: {lru_time * 1e9:.0f} ns/op {cache.stats()}")
+    return dict_time, lru_time
+
+if __name__ == "__main__":
+    benchmark()
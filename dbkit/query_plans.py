@@ -0,0 +1,246 @@
+import functools
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from .compat import iscoroutinefunction
+from .instrumentation import find_query, fingerprint
+
+logger = logging.getLogger("queries")
+
+# Problems flagged in EXPLAIN QUERY PLAN output
+FULL_SCAN = "full table scan"
+TEMP_BTREE = "temp b-tree"
+
+def plan_flags(details):
+    """
+    Problems visible in EXPLAIN QUERY PLAN detail lines: "SCAN users"
+    (a full scan, unlike "SEARCH users USING INDEX ..." or a scan of a
+    covering index) and "USE TEMP B-TREE FOR ORDER BY/GROUP BY/DISTINCT".
+    Returns {flag: [detail lines]}.
+    """
+    flags = {}
+    for detail in details:
+        text = detail.upper()
+        if text.startswith("SCAN ") and "INDEX" not in text:
+            flags.setdefault(FULL_SCAN, []).append(detail)
+        if "TEMP B-TREE" in text:
+            flags.setdefault(TEMP_BTREE, []).append(detail)
+    return flags
+
+def explain_args(query, params):
+    """Statement and parameters for EXPLAIN QUERY PLAN of query"""
+    if params is None:
+        # The plan does not depend on the values, only on their number
+        params = (None,) * query.count("?")
+    return "EXPLAIN QUERY PLAN " + query, params
+
+def explain(conn, query, params=None):
+    """Detail lines of the plan SQLite picks for query on a sqlite3 connection"""
+    return [row[3] for row in conn.execute(*explain_args(query, params))]
+
+async def aexplain(conn, query, params=None):
+    """explain() for an aiosqlite connection"""
+    async with conn.execute(*explain_args(query, params)) as cursor:
+        return [row[3] for row in await cursor.fetchall()]
+
+class QueryProfile:
+    """Timings and captured plan for one query fingerprint"""
+    __slots__ = ("calls", "slow_calls", "total_ms", "slow_ms", "max_ms",
+                 "plan", "flags", "sample")
+
+    def __init__(self):
+        self.calls = 0
+        self.slow_calls = 0
+        self.total_ms = 0.0
+        self.slow_ms = 0.0
+        self.max_ms = 0.0
+        self.plan = None     # detail lines, captured on the first slow call
+        self.flags = {}
+        self.sample = None   # full text of the first slow call
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "slow_calls": self.slow_calls,
+            "mean_ms": self.total_ms / self.calls if self.calls else 0.0,
+            "max_ms": self.max_ms,
+            "total_ms": self.total_ms,
+            "slow_ms": self.slow_ms,
+            "flags": sorted(self.flags),
+            "flagged": [line for lines in self.flags.values() for line in lines],
+            "plan": self.plan,
+            "sample": self.sample,
+        }
+
+class SlowQueryDetector:
+    """
+    Times queries per fingerprint and, the first time one of them takes
+    longer than threshold_ms, captures its EXPLAIN QUERY PLAN and flags
+    full table scans and temp B-trees. Later slow calls only add to the
+    counts (the plan of a fingerprint rarely changes; reset() re-arms).
+    """
+    def __init__(self, threshold_ms=100.0):
+        self.threshold_ms = threshold_ms
+        self._profiles = {}
+        self._lock = threading.Lock()
+
+    def record(self, query, elapsed_ms):
+        """Count a call; True if its plan should be captured now"""
+        key = fingerprint(query)
+        slow = elapsed_ms >= self.threshold_ms
+        with self._lock:
+            profile = self._profiles.get(key)
+            if profile is None:
+                profile = self._profiles[key] = QueryProfile()
+            profile.calls += 1
+            profile.total_ms += elapsed_ms
+            if elapsed_ms > profile.max_ms:
+                profile.max_ms = elapsed_ms
+            if not slow:
+                return False
+            profile.slow_calls += 1
+            profile.slow_ms += elapsed_ms
+            if profile.sample is not None:
+                return False
+            profile.sample = query  # claims the capture for this caller
+            return True
+
+    def add_plan(self, query, details):
+        flags = plan_flags(details)
+        with self._lock:
+            profile = self._profiles[fingerprint(query)]
+            profile.plan = details
+            profile.flags = flags
+        if flags:
+            logger.warning("Slow query %r: %s", fingerprint(query),
+                           "; ".join(line for lines in flags.values() for line in lines))
+
+    def report(self, limit=10, flagged_only=False):
+        """The worst offenders: fingerprints by time spent in slow calls"""
+        with self._lock:
+            rows = [dict(profile.as_dict(), fingerprint=key)
+                    for key, profile in self._profiles.items()
+                    if profile.slow_calls and (profile.flags or not flagged_only)]
+        rows.sort(key=lambda row: (row["slow_ms"], row["max_ms"]), reverse=True)
+        return rows[:limit]
+
+    def format_report(self, limit=10):
+        lines = []
+        for row in self.report(limit):
+            lines.append(f"{row['slow_ms']:9.1f} ms in {row['slow_calls']}/{row['calls']} "
+                         f"slow calls (max {row['max_ms']:.1f} ms): {row['fingerprint']}")
+            for detail in row["plan"] or ():
+                marker = "!" if detail in row["flagged"] else " "
+                lines.append(f"    {marker} {detail}")
+        return "\n".join(lines)
+
+    def export_json(self, limit=None, **dump_options):
+        return json.dumps(self.report(limit if limit is not None else len(self._profiles)),
+                          **dump_options)
+
+    def reset(self):
+        with self._lock:
+            self._profiles.clear()
+
+# Process-wide default used by profile_queries
+default_detector = SlowQueryDetector()
+
+def find_params(args, kwargs, query):
+    """Bound parameters passed as params=... or right after the query argument"""
+    if "params" in kwargs:
+        return kwargs["params"]
+    if query in args:
+        index = args.index(query) + 1
+        if index < len(args) and isinstance(args[index], (tuple, list, dict)):
+            return args[index]
+    return None
+
+def profile_queries(func=None, *, detector=None):
+    """
+    Decorator for functions called as func(conn, query, ...) - i.e. under
+    @with_db_connection - that times every call and captures the query
+    plan of slow ones (see SlowQueryDetector). Works on coroutine
+    functions with aiosqlite connections too. The report is available as
+    wrapper.detector.report().
+    """
+    if func is None:
+        return functools.partial(profile_queries, detector=detector)
+    target = default_detector if detector is None else detector
+    clock = time.perf_counter
+
+    def capture_wanted(args, kwargs, elapsed):
+        query = find_query(args[1:], kwargs)
+        if query is None or not args or not hasattr(args[0], "execute"):
+            return None
+        if target.record(query, elapsed * 1000.0):
+            return query
+        return None
+
+    if iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            start = clock()
+            result = await func(*args, **kwargs)
+            query = capture_wanted(args, kwargs, clock() - start)
+            if query is not None:
+                try:
+                    target.add_plan(query, await aexplain(
+                        args[0], query, find_params(args, kwargs, query)))
+                except sqlite3.Error as err:
+                    logger.warning("Could not explain %r: %s", query, err)
+            return result
+
+        async_wrapper.detector = target
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = clock()
+        result = func(*args, **kwargs)
+        query = capture_wanted(args, kwargs, clock() - start)
+        if query is not None:
+            try:
+                target.add_plan(query, explain(args[0], query,
+                                               find_params(args, kwargs, query)))
+            except sqlite3.Error as err:
+                logger.warning("Could not explain %r: %s", query, err)
+        return result
+
+    wrapper.detector = target
+    return wrapper
+
+def demo(rows=200000, database="query_plans_demo.db"):
+    """Report for email lookups on users without, then with, an index on email"""
+    conn = sqlite3.connect(database)
+    conn.execute("DROP TABLE IF EXISTS users")
+    conn.execute("CREATE TABLE users "
+                 "(id INTEGER PRIMARY KEY, name TEXT, email TEXT, age INT)")
+    conn.executemany("INSERT INTO users VALUES (?, ?, ?, ?)",
+                     ((i, f"user{i}", f"user{i}@example.com", 20 + i % 50)
+                      for i in range(rows)))
+    conn.commit()
+
+    slow = SlowQueryDetector(threshold_ms=1.0)
+
+    @profile_queries(detector=slow)
+    def fetch(conn, query, params=()):
+        return conn.execute(query, params).fetchall()
+
+    for label in ("no index", "index on email"):
+        if label == "index on email":
+            conn.execute("CREATE INDEX users_email ON users (email)")
+        slow.reset()
+        start = time.perf_counter()
+        for i in range(50):
+            fetch(conn, "SELECT * FROM users WHERE email = ?", (f"user{i * 997}@example.com",))
+            fetch(conn, "SELECT age, COUNT(*) FROM users GROUP BY age ORDER BY 2 DESC")
+        elapsed = time.perf_counter() - start
+        print(f"--- {label}: {elapsed * 1000:.0f} ms for 100 queries")
+        print(slow.format_report() or "(no slow queries)")
+    conn.close()
+
+if __name__ == "__main__":
+    demo()
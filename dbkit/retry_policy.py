@@ -0,0 +1,104 @@
+import random
+import sqlite3
+import threading
+import time
+
+from . import connection_pool
+
+# SQLite primary result codes meaning "someone else holds the lock, try later"
+SQLITE_BUSY = 5
+SQLITE_LOCKED = 6
+TRANSIENT_MESSAGES = ("database is locked", "database table is locked",
+                      "database is busy")
+
+def is_transient(exc):
+    """
+    True for errors worth retrying: SQLite busy/locked (by result code
+    where available, else by message) and pool checkout timeouts.
+    Syntax errors, missing tables, constraint violations etc. are not.
+    """
+    if isinstance(exc, connection_pool.PoolTimeout):
+        return True
+    if isinstance(exc, sqlite3.OperationalError):
+        code = getattr(exc, "sqlite_errorcode", None)
+        if code is not None and code & 0xFF in (SQLITE_BUSY, SQLITE_LOCKED):
+            return True
+        message = str(exc).lower()
+        return any(text in message for text in TRANSIENT_MESSAGES)
+    return False
+
+def as_predicate(retry_on):
+    """Accept a predicate, an exception class or a tuple of classes"""
+    if isinstance(retry_on, type) or isinstance(retry_on, tuple):
+        return lambda exc: isinstance(exc, retry_on)
+    return retry_on
+
+class Backoff:
+    """
+    Exponential backoff: attempt n waits up to delay * multiplier**n,
+    capped at max_delay. With jitter ("full jitter") the wait is drawn
+    uniformly from [0, that bound], so workers that failed together do
+    not all wake up and collide again at the same moment.
+    """
+    def __init__(self, delay=0.05, multiplier=2.0, max_delay=5.0, jitter=True, rng=None):
+        self.delay = delay
+        self.multiplier = multiplier
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.random = (rng or random.Random()).random
+
+    def __call__(self, attempt):
+        """Seconds to wait after the attempt-th failure (counting from 1)"""
+        bound = min(self.max_delay, self.delay * self.multiplier ** (attempt - 1))
+        return bound * self.random() if self.jitter else bound
+
+class RetryBudget:
+    """
+    Token bucket capping retries at a fraction of overall traffic.
+
+    Every first attempt deposits `ratio` tokens and every retry spends one,
+    so under overload retries add at most ratio * calls extra load instead
+    of multiplying it. `min_per_second` tokens are added over time so a
+    quiet process can still retry now and then. Shared by all decorated
+    functions unless they are given their own.
+    """
+    def __init__(self, ratio=0.2, min_per_second=10.0, max_tokens=100.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.rejected = 0
+
+    def _add(self, amount):
+        """Refill by elapsed time plus amount (caller holds the lock)"""
+        now = time.monotonic()
+        amount += (now - self._updated) * self.min_per_second
+        self._updated = now
+        self._tokens = min(self.max_tokens, self._tokens + amount)
+
+    def deposit(self):
+        with self._lock:
+            self._add(self.ratio)
+
+    def withdraw(self):
+        """Take one token for a retry; False if the budget is spent"""
+        with self._lock:
+            self._add(0.0)
+            if self._tokens < 1.0:
+                self.rejected += 1
+                return False
+            self._tokens -= 1.0
+            self.retries += 1
+            return True
+
+    def stats(self):
+        with self._lock:
+            self._add(0.0)
+            return {"tokens": self._tokens, "retries": self.retries,
+                    "rejected": self.rejected}
+
+# Budget used when a decorator is not given one
+default_budget = RetryBudget()
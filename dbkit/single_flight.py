@@ -0,0 +1,116 @@
+import threading
+import weakref
+
+class _Call:
+    """One in-flight execution that other callers can wait on"""
+    __slots__ = ("event", "owner", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.owner = threading.get_ident()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one execution.
+
+    The first caller for a key (the leader) runs fn; callers arriving
+    while it runs wait for it and get the same result, or the same
+    exception re-raised. Once the leader finishes the key is free again,
+    so later calls run fn anew (by then they normally hit the cache).
+    """
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.shared = 0
+
+    def do(self, key, fn):
+        """Returns (result, shared) where shared says another call produced it"""
+        me = threading.get_ident()
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+            elif call.owner == me:
+                # The leader calling back into the same key must not wait on itself
+                call = None
+            else:
+                leader = False
+            if call is None or leader:
+                self.executions += 1
+            else:
+                self.shared += 1
+        if call is None:
+            return fn(), False
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = fn()
+        except BaseException as err:
+            call.error = err
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.event.set()
+        return call.result, False
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+class AsyncSingleFlight:
+    """
+    SingleFlight for coroutines. The leader's coroutine runs as a task
+    that every caller (leader included) awaits through asyncio.shield, so
+    one caller being cancelled does not cancel the shared work for the
+    others. The task runs on the leader's resources (e.g. its pooled
+    connection), so a cancelled leader waits for the task to finish
+    before its cancellation propagates and it releases them.
+    Calls are tracked per event loop.
+    """
+    def __init__(self):
+        self._calls = weakref.WeakKeyDictionary()  # loop -> {key: task}
+        self.executions = 0
+        self.shared = 0
+
+    async def do(self, key, coro_fn):
+        """Returns (result, shared) where shared says another call produced it"""
+        import asyncio  # only loaded by programs that already use it
+
+        loop = asyncio.get_running_loop()
+        calls = self._calls.setdefault(loop, {})
+        task = calls.get(key)
+        shared = task is not None
+        if task is None:
+            self.executions += 1
+            task = calls[key] = loop.create_task(coro_fn())
+            task.add_done_callback(lambda done: _finish(calls, key, done))
+        else:
+            self.shared += 1
+            return await asyncio.shield(task), shared
+        try:
+            return await asyncio.shield(task), shared
+        except asyncio.CancelledError:
+            while not task.done():
+                try:
+                    await asyncio.wait((task,))
+                except asyncio.CancelledError:
+                    continue
+            raise
+
+    def in_flight(self):
+        return sum(len(calls) for calls in self._calls.values())
+
+def _finish(calls, key, task):
+    if calls.get(key) is task:
+        del calls[key]
+    if not task.cancelled():
+        task.exception()  # mark retrieved even if every waiter was cancelled
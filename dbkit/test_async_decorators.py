@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""Tests for the decorators applied to coroutine functions (aiosqlite)."""
+import asyncio
+import importlib
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    import aiosqlite  # noqa: F401
+except ImportError:  # pragma: no cover - optional dependency
+    aiosqlite = None
+
+
+@unittest.skipIf(aiosqlite is None, "aiosqlite is not installed")
+class TestAsyncDecorators(unittest.TestCase):
+    """The same decorator stack works on async def functions."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Import the decorator modules against a scratch users.db."""
+        cls.cwd = os.getcwd()
+        cls.tmp = tempfile.TemporaryDirectory()
+        os.chdir(cls.tmp.name)
+        conn = sqlite3.connect("users.db")
+        conn.execute("CREATE TABLE users "
+                     "(id INTEGER PRIMARY KEY, name TEXT, email TEXT, age INT)")
+        conn.executemany("INSERT INTO users VALUES (?, ?, ?, ?)",
+                         [(i, f"user{i}", f"user{i}@example.com", 20 + i)
+                          for i in range(1, 11)])
+        conn.commit()
+        conn.close()
+
+        sys.path.insert(0, ROOT)
+        cls.dec = importlib.import_module("dbkit.decorators")
+        cls.async_pool = importlib.import_module("dbkit.async_pool")
+
+    @classmethod
+    def tearDownClass(cls):
+        """Restore the working directory and drop the scratch database."""
+        os.chdir(cls.cwd)
+        sys.path.remove(ROOT)
+        cls.tmp.cleanup()
+
+    def setUp(self):
+        """Start every test with an empty cache."""
+        self.dec.query_cache.clear()
+
+    def run_async(self, coro):
+        """Run coro in a fresh loop, closing that loop's pools afterwards."""
+        async def main():
+            try:
+                return await coro
+            finally:
+                await self.async_pool.close_pools()
+        return asyncio.run(main())
+
+    def test_cached_read_and_transactional_write(self):
+        """Async reads are cached and invalidated by async commits."""
+        dec = self.dec
+
+        @dec.with_db_connection
+        @dec.cache_query
+        async def fetch(conn, query, params=()):
+            async with conn.execute(query, params) as cursor:
+                return await cursor.fetchall()
+
+        @dec.with_db_connection
+        @dec.transactional
+        async def set_email(conn, user_id, email):
+            await conn.execute("UPDATE users SET email = ? WHERE id = ?", (email, user_id))
+
+        query = "SELECT email FROM users WHERE id = ?"
+
+        async def scenario():
+            first = await fetch(query=query, params=(1,))
+            again = await fetch(query=query, params=(1,))
+            await set_email(user_id=1, email="async@example.com")
+            after = await fetch(query=query, params=(1,))
+            return first, again, after
+
+        first, again, after = self.run_async(scenario())
+        self.assertEqual(first, again)
+        self.assertEqual(after, [("async@example.com",)])
+        self.assertGreaterEqual(self.dec.query_cache.stats()["invalidations"], 1)
+
+    def test_rollback_on_error(self):
+        """A failing async transaction leaves the row untouched."""
+        dec = self.dec
+
+        @dec.with_db_connection
+        @dec.transactional
+        async def broken(conn):
+            await conn.execute("UPDATE users SET age = 0 WHERE id = 2")
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            self.run_async(broken())
+        conn = sqlite3.connect("users.db")
+        self.assertEqual(conn.execute("SELECT age FROM users WHERE id = 2").fetchone(), (22,))
+        conn.close()
+
+    def test_retry_and_log_queries(self):
+        """Transient errors are retried with async sleeps and calls are recorded."""
+        attempts = []
+
+        @self.dec.with_db_connection
+        @self.dec.retry_on_failure(retries=3, delay=0.001)
+        @self.dec.log_queries
+        async def count(conn, query):
+            attempts.append(1)
+            if len(attempts) < 2:
+                raise sqlite3.OperationalError("database is locked")
+            async with conn.execute(query) as cursor:
+                return await cursor.fetchall()
+
+        rows = self.run_async(count(query="SELECT COUNT(*) FROM users"))
+        self.assertEqual(rows, [(10,)])
+        self.assertEqual(len(attempts), 2)
+        stats = self.dec.log_queries.metrics.snapshot()["SELECT COUNT(*) FROM users"]
+        self.assertEqual((stats["calls"], stats["errors"]), (2, 1))
+
+    def test_cancelled_cache_leader_keeps_its_connection(self):
+        """A cancelled leader returns its connection only after the shared load ends."""
+        finished = []
+
+        @self.dec.with_db_connection
+        @self.dec.cache_query
+        async def slow_count(conn, query):
+            async with conn.execute(query) as cursor:
+                rows = await cursor.fetchall()
+            await asyncio.sleep(0.05)
+            finished.append(1)
+            return rows
+
+        async def scenario():
+            leader = asyncio.ensure_future(slow_count(query="SELECT COUNT(*) FROM users"))
+            await asyncio.sleep(0.02)
+            leader.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await leader
+            pool = self.async_pool.get_async_pool("users.db")
+            return list(finished), pool.stats()["in_use"]
+
+        self.assertEqual(self.run_async(scenario()), ([1], 0))
+
+    def test_disk_tier_stays_off_the_event_loop(self):
+        """A locked cache file makes the cached read wait, not the whole loop."""
+        from dbkit import invalidation
+        from dbkit.disk_cache import DiskCache, TieredCache
+        from dbkit.query_cache import LRUCache
+
+        path = os.path.join(self.tmp.name, "cache.sqlite3")
+        cache = TieredCache(LRUCache(), DiskCache(path))
+        cache.disk.stats()  # creates the file
+
+        @self.dec.with_db_connection
+        @self.dec.cache_query(cache=cache)
+        async def fetch(conn, query):
+            async with conn.execute(query) as cursor:
+                return await cursor.fetchall()
+
+        self.addCleanup(invalidation._caches.remove, cache)
+
+        async def scenario():
+            loop = asyncio.get_running_loop()
+            locker = sqlite3.connect(path, isolation_level=None)
+            locker.execute("BEGIN IMMEDIATE")  # another worker writing the cache
+            loop.call_later(0.3, locker.execute, "COMMIT")
+            gaps, done = [], asyncio.Event()
+
+            async def ticker():
+                last = loop.time()
+                while not done.is_set():
+                    await asyncio.sleep(0.01)
+                    gaps.append(loop.time() - last)
+                    last = loop.time()
+
+            ticking = asyncio.ensure_future(ticker())
+            started = loop.time()
+            rows = await fetch(query="SELECT COUNT(*) FROM users")
+            waited = loop.time() - started
+            done.set()
+            await ticking
+            locker.close()
+            return rows, waited, max(gaps)
+
+        rows, waited, longest_gap = self.run_async(scenario())
+        self.assertEqual(rows, [(10,)])
+        self.assertGreaterEqual(waited, 0.25)  # the disk write did wait for the lock
+        self.assertLess(longest_gap, 0.2)
+        self.assertEqual(cache.disk.stats()["entries"], 1)
+
+    def test_pool_reuses_connections(self):
+        """Concurrent coroutines share at most `size` pooled connections."""
+        @self.dec.with_db_connection
+        async def ages(conn):
+            async with conn.execute("SELECT age FROM users") as cursor:
+                return len(await cursor.fetchall())
+
+        async def scenario():
+            results = await asyncio.gather(*(ages() for _ in range(20)))
+            pool = self.async_pool.get_async_pool("users.db")
+            return results, pool.stats()
+
+        results, stats = self.run_async(scenario())
+        self.assertEqual(results, [10] * 20)
+        self.assertLessEqual(stats["connections"], 5)
+        self.assertEqual(stats["checkouts"], 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""Tests for the sqlite3 connection pool behind with_db_connection."""
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dbkit import connection_pool, decorators  # noqa: E402
+from dbkit.connection_pool import PoolTimeout, SQLitePool  # noqa: E402
+
+
+class PoolTestCase(unittest.TestCase):
+    """A scratch users.db per test"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "users.db")
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.execute("INSERT INTO users VALUES (1, 'old')")
+        conn.commit()
+        conn.close()
+        self.pools = []
+
+    def tearDown(self):
+        for pool in self.pools:
+            pool.close()
+        connection_pool.configure(self.path)  # closes the shared pool, if any
+        self.tmp.cleanup()
+
+    def pool(self, **options):
+        pool = SQLitePool(self.path, **options)
+        self.pools.append(pool)
+        return pool
+
+    def name(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            return conn.execute("SELECT name FROM users WHERE id = 1").fetchone()[0]
+        finally:
+            conn.close()
+
+
+class TestSharedPool(PoolTestCase):
+    """Bounded pool shared by all threads"""
+
+    def test_checkout_and_release_reuse_connection(self):
+        pool = self.pool(size=2)
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            self.assertEqual(pool.stats()["in_use"], 1)
+        self.assertIs(first, second)
+        stats = pool.stats()
+        self.assertEqual((stats["created"], stats["checkouts"], stats["in_use"]), (1, 2, 0))
+
+    def test_release_rolls_back_open_transaction(self):
+        pool = self.pool(size=1)
+        with pool.connection() as conn:
+            conn.execute("UPDATE users SET name = 'uncommitted'")
+        self.assertFalse(conn.in_transaction)
+        self.assertEqual(self.name(), "old")
+
+    def test_exhaustion_times_out(self):
+        pool = self.pool(size=1, timeout=0.01)
+        held = pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        pool.release(held)
+        self.assertIs(pool.acquire(), held)
+        stats = pool.stats()
+        self.assertEqual((stats["connections"], stats["timeouts"]), (1, 1))
+
+
+class TestPerThreadPool(PoolTestCase):
+    """One connection per thread, shared by nested calls"""
+
+    def test_threads_get_their_own_connection(self):
+        pool = self.pool(per_thread=True)
+        seen = []
+
+        def worker():
+            with pool.connection() as conn:
+                with pool.connection() as nested:
+                    seen.append((conn, nested))
+
+        threads = [threading.Thread(target=worker) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+            thread.join()
+        self.assertTrue(all(conn is nested for conn, nested in seen))
+        self.assertEqual(len({id(conn) for conn, _ in seen}), 3)
+
+    def test_nested_release_keeps_outer_transaction(self):
+        pool = self.pool(per_thread=True)
+        with pool.connection() as conn:
+            conn.execute("UPDATE users SET name = 'X'")
+            with pool.connection():
+                pass
+            self.assertTrue(conn.in_transaction)
+            conn.commit()
+        self.assertEqual(self.name(), "X")
+
+        with pool.connection() as conn:
+            conn.execute("UPDATE users SET name = 'uncommitted'")
+        self.assertEqual(self.name(), "X")  # the outermost release rolled back
+
+    def test_nested_decorated_call_inside_transaction(self):
+        connection_pool.configure(self.path, per_thread=True)
+
+        @decorators.with_db_connection(database=self.path)
+        def read_name(conn):
+            return conn.execute("SELECT name FROM users WHERE id = 1").fetchone()[0]
+
+        @decorators.with_db_connection(database=self.path)
+        @decorators.transactional
+        def rename(conn, name):
+            conn.execute("UPDATE users SET name = ?", (name,))
+            return read_name()
+
+        self.assertEqual(rename("X"), "X")
+        self.assertEqual(self.name(), "X")
+
+    def test_dead_thread_connections_are_closed(self):
+        pool = self.pool(per_thread=True)
+        conns = []
+
+        def worker():
+            with pool.connection() as conn:
+                conns.append(conn)
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        with pool.connection():
+            pass
+        self.assertEqual(pool.stats()["connections"], 1)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            conns[0].execute("SELECT 1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""Tests for the DatabaseConnection and ExecuteQuery context managers."""
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dbkit import connection_pool  # noqa: E402
+from dbkit.connection_pool import PoolTimeout, SQLitePool  # noqa: E402
+from dbkit.context import DatabaseConnection, ExecuteQuery  # noqa: E402
+
+try:
+    import aiosqlite  # noqa: F401
+except ImportError:  # pragma: no cover - optional dependency
+    aiosqlite = None
+
+
+class TestDatabaseConnection(unittest.TestCase):
+    """Plain and pooled DatabaseConnection / ExecuteQuery"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "users.db")
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, age INT)")
+        conn.executemany("INSERT INTO users VALUES (?, ?)", [(1, 21), (2, 30)])
+        conn.commit()
+        conn.close()
+        self.pool = SQLitePool(self.path, size=1, timeout=0.05)
+
+    def tearDown(self):
+        self.pool.close()
+        connection_pool.configure(self.path)  # closes the shared pool, if any
+        self.tmp.cleanup()
+
+    def test_plain_connection_is_closed(self):
+        with DatabaseConnection(self.path) as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM users").fetchone(), (2,))
+        with self.assertRaises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+
+    def test_pooled_connection_is_reused(self):
+        connection = DatabaseConnection(self.path, pool=self.pool)
+        with connection as first:
+            self.assertEqual(connection.stats()["in_use"], 1)
+        with connection as second:
+            pass
+        self.assertIs(first, second)
+        stats = connection.stats()
+        self.assertEqual((stats["created"], stats["checkouts"], stats["in_use"]), (1, 2, 0))
+
+    def test_open_transaction_is_rolled_back(self):
+        with self.assertRaises(RuntimeError):
+            with DatabaseConnection(self.path, pool=self.pool) as conn:
+                conn.execute("UPDATE users SET age = 0")
+                raise RuntimeError("boom")
+        with DatabaseConnection(self.path, pool=self.pool) as conn:
+            self.assertFalse(conn.in_transaction)
+            self.assertEqual(conn.execute("SELECT age FROM users WHERE id = 1").fetchone(), (21,))
+
+    def test_checkout_timeout(self):
+        with DatabaseConnection(self.path, pool=self.pool):
+            with self.assertRaises(PoolTimeout):
+                with DatabaseConnection(self.path, pool=self.pool, timeout=0.01):
+                    pass
+        stats = self.pool.stats()
+        self.assertEqual((stats["timeouts"], stats["waits"], stats["in_use"]), (1, 1, 0))
+
+    def test_execute_query_pooled(self):
+        with ExecuteQuery(self.path, "SELECT id FROM users WHERE age > ?", (25,),
+                          pooled=True) as rows:
+            self.assertEqual(rows, [(2,)])
+        with self.assertRaises(sqlite3.OperationalError):
+            with ExecuteQuery(self.path, "SELECT nope FROM users", pooled=True):
+                pass
+        # The failed query still returned its connection
+        stats = DatabaseConnection(self.path, pooled=True).stats()
+        self.assertEqual((stats["created"], stats["in_use"]), (1, 0))
+
+    def test_pool_is_looked_up_on_every_enter(self):
+        connection = DatabaseConnection(self.path, pooled=True)
+        with connection as first:
+            pass
+        connection_pool.configure(self.path, size=2)  # replaces the shared pool
+        with connection as second:
+            pass
+        self.assertIsNot(first, second)
+        self.assertEqual(connection.stats()["size"], 2)
+
+    def test_nested_per_thread_keeps_outer_transaction(self):
+        pool = SQLitePool(self.path, per_thread=True)
+        try:
+            with DatabaseConnection(self.path, pool=pool) as conn:
+                conn.execute("UPDATE users SET age = 99 WHERE id = 1")
+                with DatabaseConnection(self.path, pool=pool) as nested:
+                    self.assertIs(nested, conn)
+                conn.commit()
+        finally:
+            pool.close()
+        with DatabaseConnection(self.path) as conn:
+            self.assertEqual(conn.execute("SELECT age FROM users WHERE id = 1").fetchone(), (99,))
+
+    def test_one_instance_shared_by_threads(self):
+        pool = SQLitePool(self.path, size=2)
+        connection = DatabaseConnection(self.path, pool=pool)
+        both_in = threading.Barrier(2)
+        seen = []
+
+        def worker():
+            with connection as conn:
+                both_in.wait(timeout=5)
+                seen.append(conn)
+                conn.execute("SELECT COUNT(*) FROM users").fetchone()
+
+        try:
+            threads = [threading.Thread(target=worker) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertIsNot(seen[0], seen[1])
+            self.assertEqual(pool.stats()["in_use"], 0)
+        finally:
+            pool.close()
+
+    @unittest.skipIf(aiosqlite is None, "aiosqlite is not installed")
+    def test_same_instance_with_and_async_with(self):
+        from dbkit import async_pool
+
+        connection = DatabaseConnection(self.path, pooled=True)
+
+        async def main():
+            try:
+                async with connection as conn:
+                    cursor = await conn.execute("SELECT COUNT(*) FROM users")
+                    return await cursor.fetchone()
+            finally:
+                await async_pool.close_pools()
+
+        with connection as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM users").fetchone(), (2,))
+        # Each event loop gets its own async pool
+        self.assertEqual(asyncio.run(main()), (2,))
+        self.assertEqual(asyncio.run(main()), (2,))
+        with connection as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM users").fetchone(), (2,))
+
+    @unittest.skipIf(aiosqlite is None, "aiosqlite is not installed")
+    def test_async_with_pooled(self):
+        from dbkit import async_pool
+
+        async def main():
+            pool = async_pool.AsyncSQLitePool(self.path, size=1)
+            connection = DatabaseConnection(self.path, pool=pool)
+            async with connection as conn:
+                await conn.execute("UPDATE users SET age = 0")
+            async with connection as again:
+                cursor = await again.execute("SELECT age FROM users WHERE id = 1")
+                row = await cursor.fetchone()
+            stats = connection.stats()
+            await pool.close()
+            return conn is again, row, stats
+
+        same, row, stats = asyncio.run(main())
+        self.assertTrue(same)
+        self.assertEqual(row, (21,))
+        self.assertEqual((stats["created"], stats["checkouts"], stats["in_use"]), (1, 2, 0))
+
+    @unittest.skipIf(aiosqlite is None, "aiosqlite is not installed")
+    def test_one_instance_shared_by_tasks(self):
+        from dbkit import async_pool
+
+        async def main():
+            pool = async_pool.AsyncSQLitePool(self.path, size=4)
+            connection = DatabaseConnection(self.path, pool=pool)
+
+            async def task(delay):
+                async with connection as conn:
+                    await asyncio.sleep(delay)  # exits in another order than enters
+                    cursor = await conn.execute("SELECT COUNT(*) FROM users")
+                    await cursor.fetchone()
+                    return conn
+
+            try:
+                conns = await asyncio.gather(*(task(0.04 - i * 0.01) for i in range(4)))
+                return conns, pool.stats()
+            finally:
+                await pool.close()
+
+        conns, stats = asyncio.run(main())
+        self.assertEqual(len({id(conn) for conn in conns}), 4)
+        self.assertEqual(stats["in_use"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
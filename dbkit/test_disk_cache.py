@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""Tests for the shared on-disk cache tier."""
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import time
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from dbkit.disk_cache import DiskCache, TieredCache, dumps, loads  # noqa: E402
+from dbkit.query_cache import LRUCache  # noqa: E402
+
+ROWS = [(i, f"user{i}", f"user{i}@example.com", 20 + i % 50) for i in range(500)]
+
+
+class TestDiskCache(unittest.TestCase):
+    """Entries survive across cache instances and processes."""
+
+    def setUp(self):
+        """Each test gets its own cache file."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "cache.sqlite3")
+
+    def tearDown(self):
+        """Remove the cache file."""
+        self.tmp.cleanup()
+
+    def test_serialization_round_trip(self):
+        """Large results are compressed and come back equal."""
+        blob = dumps(ROWS)
+        self.assertEqual(blob[:1], b"z")
+        self.assertEqual(loads(blob), ROWS)
+        self.assertEqual(loads(dumps([(1,)])), [(1,)])
+
+    def test_shared_between_processes(self):
+        """A value stored by another process is a hit here."""
+        script = textwrap.dedent(f"""
+            import sys
+            sys.path.insert(0, {ROOT!r})
+            from dbkit.disk_cache import DiskCache
+            DiskCache({self.path!r}).put(("q", 1), [(1, "a")], tags=["users"])
+        """)
+        subprocess.run([sys.executable, "-c", script], check=True)
+        cache = DiskCache(self.path)
+        self.assertEqual(cache.get(("q", 1)), [(1, "a")])
+        self.assertIsNone(cache.get(("q", 2)))
+
+    def test_size_bound_evicts_least_recent(self):
+        """The file never holds more than max_bytes of values."""
+        cache = DiskCache(self.path, max_bytes=20000, touch_interval=0)
+        for i in range(50):
+            cache.put(("q", i), [(i, "x" * 500)])
+        stats = cache.stats()
+        self.assertLessEqual(stats["bytes"], 20000)
+        self.assertGreater(stats["evictions"], 0)
+        self.assertIsNone(cache.get(("q", 0)))
+        self.assertEqual(cache.get(("q", 49)), [(49, "x" * 500)])
+
+    def test_tags_and_ttl(self):
+        """Tag invalidation and expiry both turn entries into misses."""
+        cache = DiskCache(self.path)
+        cache.put(("users",), ROWS, tags=["users"])
+        cache.put(("audit",), [], tags=["audit"])
+        cache.put(("old",), [], ttl=-1)
+        self.assertEqual(cache.invalidate_tags(["users"]), 1)
+        self.assertIsNone(cache.get(("users",)))
+        self.assertEqual(cache.get(("audit",)), [])
+        self.assertIsNone(cache.get(("old",)))
+
+    def test_put_refuses_reads_older_than_an_invalidation(self):
+        """A value read before another process invalidated its tags is not stored."""
+        reader = DiskCache(self.path)
+        read_at = time.time()
+        DiskCache(self.path).invalidate_tags(["users"])  # e.g. another worker's write
+        self.assertFalse(reader.put(("q",), ROWS, tags=["users"], since=read_at))
+        self.assertIsNone(reader.get(("q",)))
+        self.assertTrue(reader.put(("q",), ROWS, tags=["users"], since=time.time()))
+        self.assertEqual(reader.get(("q",)), ROWS)
+
+
+class TestTieredCache(unittest.TestCase):
+    """The LRU sits in front of the disk tier."""
+
+    def setUp(self):
+        """Each test gets its own cache file."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "cache.sqlite3")
+
+    def tearDown(self):
+        """Remove the cache file."""
+        self.tmp.cleanup()
+
+    def test_disk_hit_is_promoted(self):
+        """A miss in memory but hit on disk fills the memory tier."""
+        DiskCache(self.path).put(("q",), ROWS, tags=["users"])
+        cache = TieredCache(LRUCache(), DiskCache(self.path))
+        self.assertEqual(cache.get(("q",)), ROWS)
+        self.assertEqual(cache.memory.get(("q",)), ROWS)
+        self.assertEqual(cache.invalidate_tags({"users"}), 1)
+        self.assertIsNone(cache.get(("q",)))
+
+    def test_disk_hit_is_not_promoted_past_a_write(self):
+        """A write committed during the disk read keeps the entry out of memory."""
+        from dbkit import invalidation
+
+        DiskCache(self.path).put(("q",), ROWS, tags=["users"])
+        cache = TieredCache(LRUCache(), DiskCache(self.path))
+        get_entry = cache.disk.get_entry
+
+        def racing_get_entry(*args):
+            entry = get_entry(*args)
+            invalidation.tables_written({"users"})  # commits right after the read
+            return entry
+
+        cache.disk.get_entry = racing_get_entry
+        self.assertEqual(cache.get(("q",)), ROWS)
+        self.assertNotIn(("q",), cache.memory)
+
+    def test_warm_start(self):
+        """A new process starts with the recently used entries in memory."""
+        first = TieredCache(LRUCache(), DiskCache(self.path))
+        for i in range(10):
+            first.put(("q", i), [(i,)], tags=["users"])
+        restarted = TieredCache(LRUCache(), DiskCache(self.path), warm_start=5)
+        self.assertEqual(restarted.warm(), 5)
+        self.assertEqual(len(restarted), 5)
+        self.assertEqual(restarted.memory.get(("q", 9)), [(9,)])
+
+    def test_memory_ttl_caps_memory_entries(self):
+        """Memory entries expire after memory_ttl even if the disk keeps them."""
+        cache = TieredCache(LRUCache(ttl=300), DiskCache(self.path, ttl=300), memory_ttl=0.01)
+        cache.put(("q",), [(1,)], tags=["users"])
+        time.sleep(0.02)
+        self.assertNotIn(("q",), cache.memory)
+        DiskCache(self.path).invalidate_tags(["users"])  # another process's write
+        self.assertIsNone(cache.get(("q",)))
+
+    def test_store_if_fresh_writes_disk_outside_the_lock(self):
+        """The disk write does not hold the process-wide invalidation lock."""
+        from dbkit import invalidation
+
+        cache = TieredCache(LRUCache(), DiskCache(self.path))
+        held = []
+        put_shared = cache.put_shared
+
+        def spy(*args, **kwargs):
+            held.append(invalidation._lock.locked())
+            return put_shared(*args, **kwargs)
+
+        cache.put_shared = spy
+        since, read_at = invalidation.generation(), time.time()
+        self.assertTrue(invalidation.store_if_fresh(cache, ("q",), [(1,)], {"users"},
+                                                    since, read_at=read_at))
+        self.assertEqual(held, [False])
+        self.assertEqual(DiskCache(self.path).get(("q",)), [(1,)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Tests for group-committed writes."""
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dbkit.group_commit import GroupCommitter  # noqa: E402
+
+
+def set_email(conn, user_id, email):
+    """Update one user, failing on a bad address."""
+    if "@" not in email:
+        raise ValueError(email)
+    conn.execute("UPDATE users SET email = ? WHERE id = ?", (email, user_id))
+    return user_id
+
+
+class TestGroupCommitter(unittest.TestCase):
+    """Batched writes commit together but succeed or fail one by one."""
+
+    def setUp(self):
+        """Create a scratch users table and a committer for it."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.database = os.path.join(self.tmp.name, "users.db")
+        conn = sqlite3.connect(self.database)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, email TEXT)")
+        conn.executemany("INSERT INTO users VALUES (?, ?)",
+                         [(i, f"user{i}@example.com") for i in range(20)])
+        conn.commit()
+        conn.close()
+        self.committer = GroupCommitter(self.database, max_batch=8, max_delay=0.05)
+
+    def tearDown(self):
+        """Stop the writer thread and remove the database."""
+        self.committer.close()
+        self.tmp.cleanup()
+
+    def emails(self):
+        """Current emails read through a fresh connection."""
+        conn = sqlite3.connect(self.database)
+        try:
+            return dict(conn.execute("SELECT id, email FROM users"))
+        finally:
+            conn.close()
+
+    def test_queued_writes_share_a_commit(self):
+        """Writes queued together land in one batch and are all visible."""
+        futures = [self.committer.submit(set_email, i, f"new{i}@example.com")
+                   for i in range(8)]
+        self.assertEqual([future.result() for future in futures], list(range(8)))
+        self.assertEqual(self.committer.stats()["batches"], 1)
+        emails = self.emails()
+        self.assertTrue(all(emails[i] == f"new{i}@example.com" for i in range(8)))
+
+    def test_failed_write_only_fails_its_caller(self):
+        """A raising job is rolled back; its batch mates still commit."""
+        good = self.committer.submit(set_email, 1, "ok@example.com")
+        bad = self.committer.submit(set_email, 2, "not-an-email")
+        self.assertEqual(good.result(), 1)
+        with self.assertRaises(ValueError):
+            bad.result()
+        emails = self.emails()
+        self.assertEqual(emails[1], "ok@example.com")
+        self.assertEqual(emails[2], "user2@example.com")
+
+    def test_concurrent_callers(self):
+        """Many threads calling at once all get their own result."""
+        results = []
+
+        def worker(user_id):
+            results.append(self.committer.call(set_email, user_id, f"t{user_id}@example.com"))
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(results), list(range(20)))
+        self.assertEqual(self.committer.stats()["writes"], 20)
+        self.assertLess(self.committer.stats()["batches"], 20)
+
+    def test_write_that_ends_the_transaction_fails_the_batch(self):
+        """A job that rolls the batch back fails it, and the writer carries on."""
+        def rollback_and_raise(conn):
+            conn.rollback()
+            raise ValueError("gave up")
+
+        def rollback_quietly(conn):
+            conn.rollback()
+
+        for job, error in ((rollback_and_raise, ValueError),
+                           (rollback_quietly, sqlite3.OperationalError)):
+            earlier = self.committer.submit(set_email, 1, "lost@example.com")
+            broken = self.committer.submit(job)
+            later = self.committer.submit(set_email, 3, "lost@example.com")
+            with self.assertRaises(error):
+                broken.result(timeout=5)
+            for future in (earlier, later):
+                with self.assertRaises(sqlite3.OperationalError):
+                    future.result(timeout=5)
+            self.assertEqual(self.emails()[1], "user1@example.com")
+        self.assertEqual(self.committer.call(set_email, 4, "after@example.com"), 4)
+        self.assertEqual(self.emails()[4], "after@example.com")
+
+    def test_call_does_not_wait_on_a_dead_writer(self):
+        """If the writer thread dies, callers get an error instead of hanging."""
+        def broken_collect(first):
+            raise RuntimeError("writer bug")
+
+        self.committer._collect = broken_collect
+        with mock.patch("threading.excepthook"):  # the writer's traceback
+            with self.assertRaisesRegex(RuntimeError, "writer thread has stopped"):
+                self.committer.call(set_email, 1, "x@example.com")
+        with self.assertRaises(RuntimeError):
+            self.committer.submit(set_email, 1, "x@example.com")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Tests for the query instrumentation behind log_queries."""
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dbkit.instrumentation import (Instrumentation, QueryLog, fingerprint,  # noqa: E402
+                             instrument_queries)
+
+
+class TestFingerprint(unittest.TestCase):
+    """Queries differing only in literals share a fingerprint."""
+
+    def test_literals_are_replaced(self):
+        """Numbers, strings and IN lists collapse to placeholders."""
+        self.assertEqual(
+            fingerprint("SELECT *  FROM users\nWHERE id = 7 AND name = 'o''neil'"),
+            "SELECT * FROM users WHERE id = ? AND name = ?")
+        self.assertEqual(fingerprint("SELECT * FROM users WHERE id IN (1, 2,3)"),
+                         "SELECT * FROM users WHERE id IN (?)")
+
+    def test_identifiers_with_digits_are_kept(self):
+        """Digits inside table or column names are not literals."""
+        self.assertEqual(fingerprint("SELECT col1 FROM t2 WHERE x = 3"),
+                         "SELECT col1 FROM t2 WHERE x = ?")
+
+
+class TestInstrumentQueries(unittest.TestCase):
+    """The decorator aggregates calls, rows, errors and latency."""
+
+    def setUp(self):
+        """Collect sampled records synchronously into a list."""
+        self.records = []
+        self.log = QueryLog(sink=self.records.append)
+        self.metrics = Instrumentation(sample_rate=1.0, log=self.log)
+
+    def test_stats_per_fingerprint(self):
+        """Calls, rows and errors are counted under one fingerprint."""
+        @instrument_queries(metrics=self.metrics)
+        def fetch(query):
+            if "0" in query.split("=")[-1]:
+                raise ValueError("bad id")
+            return [(1,), (2,)]
+
+        fetch(query="SELECT id FROM users WHERE age = 1")
+        fetch("SELECT id FROM users WHERE age = 2")
+        with self.assertRaises(ValueError):
+            fetch(query="SELECT id FROM users WHERE age = 0")
+
+        stats = json.loads(self.metrics.export_json())
+        entry = stats["SELECT id FROM users WHERE age = ?"]
+        self.assertEqual(entry["calls"], 3)
+        self.assertEqual(entry["rows"], 4)
+        self.assertEqual(entry["errors"], 1)
+        self.assertEqual(sum(entry["histogram_us"].values()), 3)
+        self.assertGreaterEqual(entry["p99_us"], entry["p50_us"])
+
+    def test_sampled_records_reach_the_sink(self):
+        """With sample_rate=1 every call is handed to the background log."""
+        @instrument_queries(metrics=self.metrics)
+        def fetch(query):
+            return []
+
+        for i in range(5):
+            fetch(query=f"SELECT * FROM users WHERE id = {i}")
+        self.log.flush()
+        self.assertEqual([record["query"] for record in self.records],
+                         [f"SELECT * FROM users WHERE id = {i}" for i in range(5)])
+
+    def test_no_sampling_by_default(self):
+        """Without a sample rate nothing is logged."""
+        metrics = Instrumentation(log=self.log)
+        instrument_queries(lambda query: None, metrics=metrics)(query="SELECT 1")
+        self.log.flush()
+        self.assertEqual(self.records, [])
+        self.assertEqual(metrics.snapshot()["SELECT ?"]["calls"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
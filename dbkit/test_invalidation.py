@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""Tests for table-aware invalidation between cache_query and transactional."""
+import importlib
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestTableInvalidation(unittest.TestCase):
+    """Interleaved reads and writes must never serve stale cached results."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Decorate the test functions against a scratch users.db."""
+        cls.cwd = os.getcwd()
+        cls.tmp = tempfile.TemporaryDirectory()
+        os.chdir(cls.tmp.name)
+        conn = sqlite3.connect("users.db")
+        conn.execute("CREATE TABLE users "
+                     "(id INTEGER PRIMARY KEY, name TEXT, email TEXT, age INT)")
+        conn.execute("CREATE TABLE audit (id INTEGER PRIMARY KEY, note TEXT)")
+        conn.executemany("INSERT INTO users VALUES (?, ?, ?, ?)",
+                         [(i, f"user{i}", f"user{i}@example.com", 20 + i)
+                          for i in range(1, 11)])
+        conn.commit()
+        conn.close()
+
+        sys.path.insert(0, ROOT)
+        cls.dec = importlib.import_module("dbkit.decorators")
+        dec = cls.dec
+
+        @dec.with_db_connection
+        @dec.cache_query
+        def fetch(conn, query, params=()):
+            return conn.execute(query, params).fetchall()
+
+        @dec.with_db_connection
+        @dec.transactional
+        def update_user_email(conn, user_id, new_email):
+            conn.execute("UPDATE users SET email = ? WHERE id = ?", (new_email, user_id))
+
+        @dec.with_db_connection
+        @dec.transactional
+        def add_note(conn, note):
+            conn.execute("INSERT INTO audit (note) VALUES (?)", (note,))
+
+        @dec.with_db_connection
+        @dec.transactional
+        def failing_update(conn, user_id):
+            conn.execute("UPDATE users SET age = 0 WHERE id = ?", (user_id,))
+            raise RuntimeError("boom")
+
+        cls.fetch = staticmethod(fetch)
+        cls.update_user_email = staticmethod(update_user_email)
+        cls.add_note = staticmethod(add_note)
+        cls.failing_update = staticmethod(failing_update)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Restore the working directory and drop the scratch database."""
+        os.chdir(cls.cwd)
+        sys.path.remove(ROOT)
+        cls.tmp.cleanup()
+
+    def setUp(self):
+        """Start every test with an empty cache."""
+        self.dec.query_cache.clear()
+
+    def direct(self, query, params=()):
+        """Run a query without any cache."""
+        conn = sqlite3.connect("users.db")
+        try:
+            return conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
+
+    def test_write_invalidates_cached_read(self):
+        """A committed update is visible to the next cached read."""
+        query = "SELECT email FROM users WHERE id = ?"
+        self.assertEqual(self.fetch(query=query, params=(1,)),
+                         self.direct(query, (1,)))
+        self.update_user_email(user_id=1, new_email="new@example.com")
+        self.assertEqual(self.fetch(query=query, params=(1,)),
+                         [("new@example.com",)])
+
+    def test_write_to_other_table_keeps_entry(self):
+        """Only entries that read the written table are dropped."""
+        before = self.dec.query_cache.stats()
+        self.fetch(query="SELECT * FROM users")
+        self.fetch(query="SELECT * FROM audit")
+        self.add_note(note="hello")
+        stats = self.dec.query_cache.stats()
+        self.assertEqual(stats["entries"], 1)
+        self.assertEqual(stats["invalidations"] - before["invalidations"], 1)
+        self.fetch(query="SELECT * FROM users")
+        self.assertEqual(self.dec.query_cache.stats()["hits"] - before["hits"], 1)
+
+    def test_rolled_back_write_does_not_invalidate(self):
+        """A failed transaction leaves the cache alone."""
+        self.fetch(query="SELECT * FROM users")
+        before = self.dec.query_cache.stats()["invalidations"]
+        with self.assertRaises(RuntimeError):
+            self.failing_update(user_id=2)
+        self.assertEqual(self.dec.query_cache.stats()["invalidations"], before)
+        self.assertEqual(self.fetch(query="SELECT * FROM users"),
+                         self.direct("SELECT * FROM users"))
+
+    def test_random_interleaving_matches_database(self):
+        """Every cached read equals an uncached read, whatever the order."""
+        rng = random.Random(42)
+        queries = [
+            ("SELECT * FROM users", ()),
+            ("SELECT email FROM users WHERE id = ?", (3,)),
+            ("SELECT COUNT(*) FROM audit", ()),
+            ("SELECT u.id, a.note FROM users u JOIN audit a ON a.id = u.id", ()),
+        ]
+        for step in range(200):
+            if rng.random() < 0.3:
+                if rng.random() < 0.5:
+                    self.update_user_email(user_id=rng.randint(1, 10),
+                                              new_email=f"{step}@example.com")
+                else:
+                    self.add_note(note=f"step {step}")
+            else:
+                query, params = rng.choice(queries)
+                self.assertEqual(self.fetch(query=query, params=params),
+                                 self.direct(query, params))
+
+    def test_write_during_read_is_not_cached(self):
+        """A read that overlaps a committed write is returned but not cached."""
+        @self.dec.with_db_connection
+        @self.dec.cache_query
+        def fetch_then_write(conn, query):
+            rows = conn.execute(query).fetchall()
+            self.update_user_email(user_id=4, new_email="raced@example.com")
+            return rows
+
+        query = "SELECT email FROM users WHERE id = 4"
+        fetch_then_write(query=query)
+        self.assertEqual(len(self.dec.query_cache), 0)
+        self.assertEqual(self.fetch(query=query), [("raced@example.com",)])
+
+    def test_cached_read_inside_transaction_keeps_tracking_writes(self):
+        """A cached lookup does not switch off the transaction's write tracking."""
+        @self.dec.cache_query
+        def lookup(conn, query, params=()):
+            return conn.execute(query, params).fetchall()
+
+        @self.dec.with_db_connection
+        @self.dec.transactional
+        def read_then_update(conn, email):
+            lookup(conn, query=query, params=(6,))
+            conn.execute("UPDATE users SET email = ? WHERE id = 6", (email,))
+
+        query = "SELECT email FROM users WHERE id = ?"
+        read = self.dec.with_db_connection(lookup)
+        read_then_update(email="a@x")
+        self.assertEqual(read(query=query, params=(6,)), [("a@x",)])
+        read_then_update(email="b@x")
+        self.assertEqual(read(query=query, params=(6,)), [("b@x",)])
+
+    def test_read_inside_rolled_back_transaction_is_not_cached(self):
+        """Uncommitted rows seen inside a transaction never reach the cache."""
+        @self.dec.cache_query
+        def lookup(conn, query, params=()):
+            return conn.execute(query, params).fetchall()
+
+        @self.dec.with_db_connection
+        @self.dec.transactional
+        def dirty_read(conn):
+            conn.execute("UPDATE users SET email = 'dirty@x' WHERE id = 7")
+            self.assertEqual(lookup(conn, query=query, params=(7,)), [("dirty@x",)])
+            raise RuntimeError("boom")
+
+        query = "SELECT email FROM users WHERE id = ?"
+        with self.assertRaises(RuntimeError):
+            dirty_read()
+        self.assertEqual(len(self.dec.query_cache), 0)
+        read = self.dec.with_db_connection(lookup)
+        self.assertEqual(read(query=query, params=(7,)), self.direct(query, (7,)))
+
+    def test_concurrent_readers_see_last_write(self):
+        """After concurrent reads and writes settle, reads are fresh."""
+        query = "SELECT email FROM users WHERE id = ?"
+        errors = []
+
+        def reader():
+            try:
+                for _ in range(50):
+                    self.fetch(query=query, params=(5,))
+            except Exception as err:  # pragma: no cover - reported below
+                errors.append(err)
+
+        def writer():
+            for i in range(20):
+                self.update_user_email(user_id=5, new_email=f"w{i}@example.com")
+
+        threads = [threading.Thread(target=reader) for _ in range(4)]
+        threads.append(threading.Thread(target=writer))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(self.fetch(query=query, params=(5,)),
+                         [("w19@example.com",)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Tests for the bounded LRU/TTL cache behind cache_query."""
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dbkit.query_cache import LRUCache, make_key  # noqa: E402
+
+
+class TestLRUCache(unittest.TestCase):
+    """Eviction, expiry, tag invalidation and counters"""
+
+    def test_evicts_least_recently_used_entry(self):
+        cache = LRUCache(max_entries=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.get("a"), 1)  # b is now the oldest
+        cache.put("c", 3)
+        self.assertNotIn("b", cache)
+        self.assertEqual((cache.get("a"), cache.get("c")), (1, 3))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_evicts_by_bytes(self):
+        cache = LRUCache(max_entries=100, max_bytes=25, sizeof=len)
+        cache.put("a", "x" * 10)
+        cache.put("b", "x" * 10)
+        cache.put("c", "x" * 10)
+        self.assertEqual(len(cache), 2)
+        self.assertNotIn("a", cache)
+        self.assertEqual(cache.stats()["bytes"], 20)
+        cache.put("huge", "x" * 30)  # larger than the whole cache: not stored
+        self.assertNotIn("huge", cache)
+        self.assertEqual(len(cache), 2)
+
+    def test_ttl_expiry(self):
+        cache = LRUCache(ttl=60)
+        cache.put("short", 1, ttl=0.01)
+        cache.put("long", 2)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("short"))
+        self.assertEqual(cache.get("long"), 2)
+        stats = cache.stats()
+        self.assertEqual((stats["expirations"], stats["entries"]), (1, 1))
+
+    def test_invalidate_tags(self):
+        cache = LRUCache()
+        cache.put("users", 1, tags={"users"})
+        cache.put("join", 2, tags={"users", "orders"})
+        cache.put("orders", 3, tags={"orders"})
+        self.assertEqual(cache.invalidate_tags({"users"}), 2)
+        self.assertEqual((cache.get("users"), cache.get("join")), (None, None))
+        self.assertEqual(cache.get("orders"), 3)
+        # Tag index entries went with the dropped keys
+        self.assertEqual(cache.invalidate_tags({"users"}), 0)
+        self.assertEqual(cache.stats()["invalidations"], 2)
+
+    def test_hit_and_miss_counters(self):
+        cache = LRUCache()
+        cache.get("a")
+        cache.put("a", None)
+        sentinel = object()
+        self.assertIsNone(cache.get("a", sentinel))  # a cached None is a hit
+        cache["b"] = 2
+        self.assertEqual(cache["b"], 2)
+        with self.assertRaises(KeyError):
+            cache["missing"]
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 2))
+
+    def test_make_key_separates_parameters(self):
+        def fetch(query, params=()):
+            return query, params
+
+        self.assertNotEqual(make_key(fetch, ("q", (1,)), {}),
+                            make_key(fetch, ("q", (2,)), {}))
+        # Unhashable parameters still produce a usable key
+        self.assertEqual(make_key(fetch, ("q", [1]), {}), make_key(fetch, ("q", [1]), {}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Tests for the slow-query detector and plan capture."""
+import os
+import sqlite3
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dbkit.query_plans import (FULL_SCAN, TEMP_BTREE, SlowQueryDetector,  # noqa: E402
+                         explain, plan_flags, profile_queries)
+
+
+class TestQueryPlans(unittest.TestCase):
+    """Slow queries get their plan captured and flagged."""
+
+    def setUp(self):
+        """An in-memory users table with an index on id only."""
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.execute("CREATE TABLE users "
+                          "(id INTEGER PRIMARY KEY, name TEXT, email TEXT, age INT)")
+        self.conn.executemany("INSERT INTO users VALUES (?, ?, ?, ?)",
+                              [(i, f"u{i}", f"u{i}@example.com", i % 50)
+                               for i in range(200)])
+
+    def tearDown(self):
+        """Close the connection."""
+        self.conn.close()
+
+    def test_plan_flags(self):
+        """Full scans and temp B-trees are flagged; index searches are not."""
+        scan = explain(self.conn, "SELECT * FROM users WHERE email = ?")
+        self.assertIn(FULL_SCAN, plan_flags(scan))
+        grouped = explain(self.conn, "SELECT age, COUNT(*) FROM users GROUP BY age")
+        self.assertIn(TEMP_BTREE, plan_flags(grouped))
+        self.assertEqual(plan_flags(explain(self.conn, "SELECT * FROM users WHERE id = ?")), {})
+
+    def test_only_slow_calls_are_explained(self):
+        """Calls under the threshold are counted but not explained."""
+        detector = SlowQueryDetector(threshold_ms=10 ** 6)
+
+        @profile_queries(detector=detector)
+        def fetch(conn, query, params=()):
+            return conn.execute(query, params).fetchall()
+
+        fetch(self.conn, "SELECT * FROM users WHERE email = ?", ("u1@example.com",))
+        self.assertEqual(detector.report(), [])
+
+    def test_report_lists_worst_offenders(self):
+        """Every slow fingerprint is reported once with its plan, worst first."""
+        detector = SlowQueryDetector(threshold_ms=0)
+
+        @profile_queries(detector=detector)
+        def fetch(conn, query, params=()):
+            return conn.execute(query, params).fetchall()
+
+        for i in range(5):
+            fetch(self.conn, f"SELECT * FROM users WHERE email = 'u{i}@example.com'")
+            fetch(self.conn, query="SELECT * FROM users WHERE id = ?", params=(i,))
+
+        report = detector.report()
+        self.assertEqual(len(report), 2)
+        by_fingerprint = {row["fingerprint"]: row for row in report}
+        scan = by_fingerprint["SELECT * FROM users WHERE email = ?"]
+        self.assertEqual((scan["calls"], scan["slow_calls"]), (5, 5))
+        self.assertEqual(scan["flags"], [FULL_SCAN])
+        self.assertEqual(by_fingerprint["SELECT * FROM users WHERE id = ?"]["flags"], [])
+        self.assertEqual([row["fingerprint"] for row in detector.report(flagged_only=True)],
+                         ["SELECT * FROM users WHERE email = ?"])
+        self.assertIn("! SCAN users", detector.format_report())
+
+
+if __name__ == "__main__":
+    unittest.main()
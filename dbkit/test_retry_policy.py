@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Tests for the backoff, error classification and budget behind retry_on_failure."""
+import os
+import random
+import sqlite3
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dbkit import connection_pool  # noqa: E402
+from dbkit.retry_policy import Backoff, RetryBudget, as_predicate, is_transient  # noqa: E402
+
+
+class TestIsTransient(unittest.TestCase):
+    """Only lock contention and pool exhaustion are worth retrying."""
+
+    def test_locked_database_is_transient(self):
+        """SQLite busy/locked errors are retried."""
+        self.assertTrue(is_transient(sqlite3.OperationalError("database is locked")))
+        self.assertTrue(is_transient(connection_pool.PoolTimeout("no connection")))
+
+    def test_programming_errors_are_not(self):
+        """Syntax errors, missing tables and constraints fail immediately."""
+        self.assertFalse(is_transient(sqlite3.OperationalError("near \"SELEC\": syntax error")))
+        self.assertFalse(is_transient(sqlite3.OperationalError("no such table: users")))
+        self.assertFalse(is_transient(sqlite3.IntegrityError("UNIQUE constraint failed")))
+        self.assertFalse(is_transient(ValueError("database is locked")))
+
+    def test_exception_classes_as_predicate(self):
+        """retry_on also accepts exception classes."""
+        predicate = as_predicate((KeyError, TimeoutError))
+        self.assertTrue(predicate(KeyError()))
+        self.assertFalse(predicate(ValueError()))
+
+
+class TestBackoff(unittest.TestCase):
+    """Waits grow exponentially up to the cap, jittered below the bound."""
+
+    def test_exponential_and_capped(self):
+        """Without jitter the waits are delay * multiplier**n, capped."""
+        backoff = Backoff(delay=0.1, multiplier=2, max_delay=0.5, jitter=False)
+        self.assertEqual([backoff(n) for n in range(1, 6)],
+                         [0.1, 0.2, 0.4, 0.5, 0.5])
+
+    def test_jitter_stays_below_bound(self):
+        """With jitter every wait lies in [0, bound] and they differ."""
+        backoff = Backoff(delay=0.1, multiplier=2, max_delay=1, rng=random.Random(1))
+        waits = [backoff(3) for _ in range(100)]
+        self.assertTrue(all(0 <= wait <= 0.4 for wait in waits))
+        self.assertGreater(len(set(waits)), 90)
+
+
+class TestRetryBudget(unittest.TestCase):
+    """Retries are limited to a fraction of the calls."""
+
+    def test_budget_runs_out(self):
+        """Once the tokens are spent further retries are refused."""
+        budget = RetryBudget(ratio=0.5, min_per_second=0, max_tokens=2)
+        self.assertTrue(budget.withdraw())
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+        budget.deposit()
+        budget.deposit()
+        self.assertTrue(budget.withdraw())
+        self.assertEqual(budget.stats()["rejected"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
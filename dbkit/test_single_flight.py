@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""Tests for single-flight coalescing of concurrent cache misses."""
+import asyncio
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dbkit.single_flight import AsyncSingleFlight, SingleFlight  # noqa: E402
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Concurrent threads with one key share one execution."""
+
+    def run_threads(self, flight, fn, count=8):
+        """Call flight.do from count threads at once; return outcomes."""
+        outcomes = []
+        start = threading.Barrier(count)
+
+        def caller():
+            start.wait()
+            try:
+                outcomes.append(flight.do("key", fn))
+            except Exception as err:
+                outcomes.append(err)
+
+        threads = [threading.Thread(target=caller) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return outcomes
+
+    def test_one_execution_shared_result(self):
+        """Only one thread runs fn; the others get its result."""
+        runs = []
+
+        def slow():
+            runs.append(1)
+            time.sleep(0.1)
+            return [("row",)]
+
+        flight = SingleFlight()
+        outcomes = self.run_threads(flight, slow)
+        self.assertEqual(len(runs), 1)
+        self.assertEqual({id(result) for result, _ in outcomes}, {id(outcomes[0][0])})
+        self.assertEqual(sorted(shared for _, shared in outcomes), [False] + [True] * 7)
+        self.assertEqual(flight.in_flight(), 0)
+
+    def test_exception_is_shared(self):
+        """Every waiter sees the leader's exception; the key is then free."""
+        def failing():
+            time.sleep(0.1)
+            raise LookupError("boom")
+
+        flight = SingleFlight()
+        outcomes = self.run_threads(flight, failing)
+        self.assertTrue(all(isinstance(outcome, LookupError) for outcome in outcomes))
+        self.assertEqual(flight.executions, 1)
+        self.assertEqual(flight.do("key", lambda: 42), (42, False))
+
+    def test_reentrant_call_does_not_deadlock(self):
+        """The leader calling the same key again runs it directly."""
+        flight = SingleFlight()
+        result, _ = flight.do("key", lambda: flight.do("key", lambda: 7)[0] + 1)
+        self.assertEqual(result, 8)
+
+
+class TestAsyncSingleFlight(unittest.TestCase):
+    """Concurrent coroutines with one key share one execution."""
+
+    def test_one_execution_shared_result(self):
+        """Only one coroutine runs; the others await its result."""
+        runs = []
+
+        async def slow():
+            runs.append(1)
+            await asyncio.sleep(0.05)
+            return "rows"
+
+        async def main():
+            flight = AsyncSingleFlight()
+            results = await asyncio.gather(*(flight.do("key", slow) for _ in range(10)))
+            return flight, results
+
+        flight, results = asyncio.run(main())
+        self.assertEqual(len(runs), 1)
+        self.assertEqual({result for result, _ in results}, {"rows"})
+        self.assertEqual(flight.in_flight(), 0)
+
+    def test_cancelled_leader_does_not_cancel_followers(self):
+        """Cancelling the first caller leaves the shared work running."""
+        async def slow():
+            await asyncio.sleep(0.05)
+            return "rows"
+
+        async def main():
+            flight = AsyncSingleFlight()
+            leader = asyncio.ensure_future(flight.do("key", slow))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(flight.do("key", slow))
+            await asyncio.sleep(0)
+            leader.cancel()
+            return await follower
+
+        self.assertEqual(asyncio.run(main()), ("rows", True))
+
+    def test_cancelled_leader_waits_for_its_task(self):
+        """The leader's cancellation only propagates once the shared task is done."""
+        finished = []
+
+        async def slow():
+            await asyncio.sleep(0.05)
+            finished.append(1)
+            return "rows"
+
+        async def main():
+            flight = AsyncSingleFlight()
+            leader = asyncio.ensure_future(flight.do("key", slow))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            try:
+                await leader
+            except asyncio.CancelledError:
+                return list(finished)
+
+        self.assertEqual(asyncio.run(main()), [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
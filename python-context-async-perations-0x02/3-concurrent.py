@@ -1,28 +1,40 @@
+import os
+import sys
 import asyncio
-import aiosqlite
+
+# The decorators live in the shared dbkit package at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dbkit import async_pool  # noqa: E402
+from dbkit.decorators import with_db_connection  # noqa: E402
+
 
 # Step 1: Define async function to fetch all users
-async def async_fetch_users():
-    async with aiosqlite.connect("users.db") as db:
-        async with db.execute("SELECT * FROM users") as cursor:
-            results = await cursor.fetchall()
-            print("[INFO] All Users:", results)
-            return results
+# (with_db_connection hands it a pooled aiosqlite connection)
+@with_db_connection
+async def async_fetch_users(db):
+    async with db.execute("SELECT * FROM users") as cursor:
+        results = await cursor.fetchall()
+        print("[INFO] All Users:", results)
+        return results
 
 # Step 2: Define async function to fetch users older than 40
-async def async_fetch_older_users():
-    async with aiosqlite.connect("users.db") as db:
-        async with db.execute("SELECT * FROM users WHERE age > 40") as cursor:
-            results = await cursor.fetchall()
-            print("[INFO] Users older than 40:", results)
-            return results
+@with_db_connection
+async def async_fetch_older_users(db):
+    async with db.execute("SELECT * FROM users WHERE age > 40") as cursor:
+        results = await cursor.fetchall()
+        print("[INFO] Users older than 40:", results)
+        return results
 
 # Step 3: Function that runs both concurrently using asyncio.gather
 async def fetch_concurrently():
-    results = await asyncio.gather(
-        async_fetch_users(),
-        async_fetch_older_users()
-    )
+    try:
+        results = await asyncio.gather(
+            async_fetch_users(),
+            async_fetch_older_users()
+        )
+    finally:
+        await async_pool.close_pools()
     return results
 
 # Step 4: Run the concurrent fetch
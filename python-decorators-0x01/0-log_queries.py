@@ -1,22 +1,13 @@
+import os
+import sys
 import sqlite3
-import functools
 from datetime import datetime  # ✅ Added as required
 
-# Step 1: Create the log_queries decorator
-def log_queries(func):
-    """
-    Decorator that logs the SQL query before executing it.
-    It also prints a timestamp when the query is logged.
-    """
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        query = kwargs.get("query", None)
-        if query:
-            print(f"[{datetime.now()}] Executing query: {query}")
-        else:
-            print(f"[{datetime.now()}] Executing function without query argument.")
-        return func(*args, **kwargs)
-    return wrapper
+# The decorators live in the shared dbkit package at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Step 1: The log_queries decorator (records queries instead of printing them)
+from dbkit.decorators import log_queries  # noqa: E402
 
 
 # Step 2: Apply decorator to function
@@ -31,5 +22,7 @@ def fetch_all_users(query):
 
 
 # Step 3: Run the function to test
-users = fetch_all_users(query="SELECT * FROM users")
-print(users)
+if __name__ == "__main__":
+    users = fetch_all_users(query="SELECT * FROM users")
+    print(users)
+    print(f"[{datetime.now()}] Query stats: {log_queries.metrics.export_json()}")
@@ -1,21 +1,12 @@
-import sqlite3
-import functools
+import os
+import sys
 
-def with_db_connection(func):
-    """Decorator that opens a database connection, passes it to the function, and closes it afterward"""
+# The decorators live in the shared dbkit package at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        # Step 1: Open connection
-        conn = sqlite3.connect('users.db')
-        try:
-            # Step 2: Call the original function, but pass the connection as first argument
-            return func(conn, *args, **kwargs)
-        finally:
-            # Step 3: Close connection no matter what (even if an error happens)
-            conn.close()
-
-    return wrapper
+# Step 1-3: with_db_connection checks a pooled connection out, passes it as
+# the first argument and returns it to the pool no matter what
+from dbkit.decorators import with_db_connection  # noqa: E402
 
 
 # Step 4: Use the decorator
@@ -27,5 +18,6 @@ def get_user_by_id(conn, user_id):
 
 
 # Step 5: Test the function
-user = get_user_by_id(user_id=1)
-print(user)
+if __name__ == "__main__":
+    user = get_user_by_id(user_id=1)
+    print(user)
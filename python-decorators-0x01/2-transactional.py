@@ -1,33 +1,14 @@
-import sqlite3
-import functools
+import os
+import sys
 
-# Step 1: Copy the with_db_connection decorator from previous task
-def with_db_connection(func):
-    """Decorator that opens a database connection, passes it to the function, and closes it afterward"""
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        conn = sqlite3.connect('users.db')
-        try:
-            return func(conn, *args, **kwargs)
-        finally:
-            conn.close()
-    return wrapper
+# The decorators live in the shared dbkit package at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-
-# Step 2: Create the transactional decorator
-def transactional(func):
-    """Decorator that wraps a function call in a database transaction"""
-    @functools.wraps(func)
-    def wrapper(conn, *args, **kwargs):
-        try:
-            result = func(conn, *args, **kwargs)  # Run the function
-            conn.commit()  # ✅ Commit changes if successful
-            return result
-        except Exception as e:
-            conn.rollback()  # ❌ Rollback if something went wrong
-            print(f"[ERROR] Transaction rolled back due to: {e}")
-            raise  # Re-raise the error so we know something failed
-    return wrapper
+# Step 1: with_db_connection from the previous task
+# Step 2: transactional commits on success, rolls back on error, and drops
+# cached reads of the tables it wrote (batched_transactional groups commits)
+from dbkit.decorators import (batched_transactional, transactional,  # noqa: E402,F401
+                              with_db_connection)
 
 
 # Step 3: Use both decorators
@@ -39,5 +20,6 @@ def update_user_email(conn, user_id, new_email):
 
 
 # Step 4: Test the function
-update_user_email(user_id=1, new_email='Crawford_Cartwright@hotmail.com')
-print("✅ Email updated successfully")
+if __name__ == "__main__":
+    update_user_email(user_id=1, new_email='Crawford_Cartwright@hotmail.com')
+    print("✅ Email updated successfully")
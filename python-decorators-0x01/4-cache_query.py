@@ -1,43 +1,14 @@
-import sqlite3
-import functools
+import os
+import sys
 
-# Step 1: Create a simple dictionary to store cached results
-query_cache = {}
+# The decorators live in the shared dbkit package at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Step 2: Copy our with_db_connection decorator from previous tasks
-def with_db_connection(func):
-    """Decorator that opens a database connection, passes it to the function, and closes it afterward"""
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        conn = sqlite3.connect('users.db')
-        try:
-            return func(conn, *args, **kwargs)
-        finally:
-            conn.close()
-    return wrapper
-
-
-# Step 3: Implement the cache_query decorator
-def cache_query(func):
-    """
-    Decorator that caches results based on the SQL query string.
-    If the same query is called again, it returns the cached result instead of hitting the database.
-    """
-    @functools.wraps(func)
-    def wrapper(conn, *args, **kwargs):
-        # Assume query is passed as a keyword argument
-        query = kwargs.get("query")
-        if query in query_cache:
-            print(f"[CACHE] Using cached result for query: {query}")
-            return query_cache[query]
-
-        # If not cached, execute function and store result
-        result = func(conn, *args, **kwargs)
-        query_cache[query] = result
-        print(f"[CACHE] Stored result for query: {query}")
-        return result
-
-    return wrapper
+# Step 1: query_cache is the bounded LRU/TTL cache (plus an on-disk tier
+# when QUERY_CACHE_FILE is set)
+# Step 2: with_db_connection from previous tasks
+# Step 3: cache_query caches results by query and parameters
+from dbkit.decorators import cache_query, query_cache, with_db_connection  # noqa: E402,F401
 
 
 # Step 4: Use the decorators
@@ -50,8 +21,9 @@ def fetch_users_with_cache(conn, query):
 
 
 # Step 5: Test caching
-# First call will hit the database and store the result
-users = fetch_users_with_cache(query="SELECT * FROM users")
+if __name__ == "__main__":
+    # First call will hit the database and store the result
+    users = fetch_users_with_cache(query="SELECT * FROM users")
 
-# Second call will use the cached data
-users_again = fetch_users_with_cache(query="SELECT * FROM users")
+    # Second call will use the cached data
+    users_again = fetch_users_with_cache(query="SELECT * FROM users")
@@ -1,21 +1,23 @@
-import mysql.connector
+seed = __import__('seed')
 
-def stream_users():
+def stream_users(chunk_size=seed.STREAM_CHUNK_SIZE, records=False):
+    """
+    Yield user_data rows one by one from an unbuffered cursor.
+    Rows are fetched chunk_size at a time, so memory stays bounded
+    however large the table is. records=True yields compact
+    rowtypes records (row.age / row["age"]) instead of dicts.
+    """
     try:
-        connection = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="yourpassword",
-            database="ALX_prodev"
-        )
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM user_data")
+        connection = seed.prodev_pool().acquire()
+        try:
+            for rows in seed.stream_rows(connection, "SELECT * FROM user_data",
+                                         chunk_size=chunk_size,
+                                         records=records):
+                yield from rows
+        finally:
+            # Runs on exhaustion, errors and early generator close alike;
+            # hands the connection back to the pool
+            connection.close()
 
-        for row in cursor:
-            yield row
-
-        cursor.close()
-        connection.close()
-
-    except mysql.connector.Error as err:
+    except seed.DB_ERRORS as err:
         print(f"Database error: {err}")
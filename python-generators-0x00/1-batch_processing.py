@@ -1,37 +1,63 @@
-import mysql.connector
+seed = __import__('seed')
+pipeline = __import__('pipeline')
+prefetch = __import__('prefetch')
+columnar = __import__('columnar')
 
-def stream_users_in_batches(batch_size):
-    try:
-        connection = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="yourpassword",
-            database="ALX_prodev"
-        )
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM user_data")
+# age > 25 runs as a SQL WHERE clause instead of a Python if per row
+USERS_OVER_25 = pipeline.Query("user_data").where("age", ">", 25)
 
-        batch = []
-        for row in cursor:
-            batch.append(row)
-            if len(batch) == batch_size:
+def stream_users_in_batches(batch_size, query=None, prefetch_batches=0,
+                            columnar_batches=False, records=False):
+    """
+    Yield batches of user_data rows.
+    Pass a pipeline.Query to push its columns and filters down into SQL;
+    without one every row and column is streamed.
+    prefetch_batches=N fetches up to N batches ahead on a background thread.
+    columnar_batches=True yields columnar.ColumnBatch objects (NumPy column
+    arrays) instead of lists of dicts; batch.to_rows() converts back.
+    records=True yields lists of compact rowtypes records instead of dicts.
+    """
+    if prefetch_batches:
+        yield from prefetch.prefetch(
+            stream_users_in_batches(batch_size, query,
+                                    columnar_batches=columnar_batches,
+                                    records=records),
+            prefetch_batches
+        )
+        return
+    if query is None:
+        query = pipeline.Query("user_data")
+    try:
+        connection = seed.prodev_pool().acquire()
+        try:
+            # Each fetchmany() on the unbuffered cursor is one batch
+            if columnar_batches:
+                batches = columnar.column_batches(connection, query, batch_size)
+            else:
+                batches = query.batches(connection, batch_size, records)
+            for batch in batches:
                 yield batch
-                batch = []
-
-        if batch:  # yield remaining rows
-            yield batch
-
-        cursor.close()
-        connection.close()
+        finally:
+            connection.close()
         return  # ✅ Added return for completeness
 
-    except mysql.connector.Error as err:
+    except seed.DB_ERRORS as err:
         print(f"Database error: {err}")
         return  # ✅ Added return in error case
 
 def batch_processing(batch_size):
-    for batch in stream_users_in_batches(batch_size):
+    for batch in stream_users_in_batches(batch_size, USERS_OVER_25):
         for user in batch:
-            if user['age'] > 25:
-                yield user
+            yield user
     return  # ✅ Added return for completeness
+
+def batch_processing_columnar(batch_size):
+    """
+    Columnar variant of batch_processing: yields ColumnBatch objects with
+    the users over 25, filtered vectorized as batch[batch["age"] > 25].
+    """
+    for batch in stream_users_in_batches(batch_size, columnar_batches=True):
+        over_25 = batch[batch["age"] > 25]
+        if len(over_25):
+            yield over_25
+    return
@@ -1,20 +1,108 @@
 #!/usr/bin/python3
+import base64
+import json
+
 seed = __import__('seed')
+prefetch = __import__('prefetch')
+rowtypes = __import__('rowtypes')
 
-def paginate_users(page_size, offset):
-    connection = seed.connect_to_prodev()
-    cursor = connection.cursor(dictionary=True)
+# Keyset mode needs a unique, indexed sort key (see seed.create_table)
+KEYSET_COLUMNS = ("user_id", "email")
+
+def paginate_users(page_size, offset, connection=None, records=False):
+    own_connection = connection is None
+    if own_connection:
+        connection = seed.connect_to_prodev()
+    cursor = seed.streaming_cursor(connection, dictionary=not records)
     cursor.execute(f"SELECT * FROM user_data LIMIT {page_size} OFFSET {offset}")
-    rows = cursor.fetchall()
-    connection.close()
+    rows = fetch_page(cursor, records)
+    cursor.close()
+    if own_connection:
+        connection.close()
     return rows
 
-def lazy_pagination(page_size):
-    offset = 0
-    while True:
-        page = paginate_users(page_size, offset)
-        if not page:
-            break
-        yield page
-        offset += page_size
+def paginate_users_after(connection, page_size, last_key=None, key="user_id",
+                         records=False):
+    """
+    Keyset (seek) page: the next page_size rows whose key is greater than
+    last_key. The server seeks straight into the index instead of scanning
+    and discarding `offset` rows, so every page costs the same.
+    """
+    if key not in KEYSET_COLUMNS:
+        raise ValueError(f"Keyset pagination needs one of {KEYSET_COLUMNS}, got {key!r}")
+    marker = seed.param_marker(connection)
+    cursor = seed.streaming_cursor(connection, dictionary=not records)
+    if last_key is None:
+        cursor.execute(
+            f"SELECT * FROM user_data ORDER BY {key} LIMIT {marker}",
+            (page_size,)
+        )
+    else:
+        cursor.execute(
+            f"SELECT * FROM user_data WHERE {key} > {marker} "
+            f"ORDER BY {key} LIMIT {marker}",
+            (last_key, page_size)
+        )
+    rows = fetch_page(cursor, records)
+    cursor.close()
+    return rows
+
+def fetch_page(cursor, records=False):
+    """All rows of the page, as rowtypes records if asked for"""
+    rows = cursor.fetchall()
+    return rowtypes.make_records(cursor, rows) if records else rows
+
+def make_cursor(page, key="user_id"):
+    """
+    Resumable cursor token for the position right after `page`.
+    Save it once the page has been processed; passing it back as
+    lazy_pagination(..., after=token) restarts the walk from there.
+    """
+    state = {"key": key, "after": str(page[-1][key])}
+    return base64.urlsafe_b64encode(json.dumps(state).encode()).decode()
+
+def read_cursor(token):
+    """Decode a token from make_cursor into (key, last_key)"""
+    state = json.loads(base64.urlsafe_b64decode(token.encode()))
+    return state["key"], state["after"]
+
+def lazy_pagination(page_size, keyset=False, after=None, key="user_id",
+                    prefetch_pages=0, records=False):
+    """
+    Lazily yield pages of user_data over a single connection.
+    Default mode keeps the original LIMIT/OFFSET behaviour; keyset=True
+    (implied by passing an `after` cursor token) seeks on `key` instead.
+    prefetch_pages=N fetches up to N pages ahead on a background thread.
+    records=True returns pages of compact rowtypes records instead of dicts.
+    """
+    pages = fetch_pages(page_size, keyset, after, key, records)
+    if prefetch_pages:
+        pages = prefetch.prefetch(pages, prefetch_pages)
+    yield from pages
+    return
+
+def fetch_pages(page_size, keyset=False, after=None, key="user_id",
+                records=False):
+    last_key = None
+    if after is not None:
+        keyset = True
+        key, last_key = read_cursor(after)
+
+    connection = seed.connect_to_prodev()
+    try:
+        offset = 0
+        while True:
+            if keyset:
+                page = paginate_users_after(connection, page_size, last_key,
+                                            key, records)
+            else:
+                page = paginate_users(page_size, offset, connection, records)
+            if not page:
+                break
+            yield page
+            if keyset:
+                last_key = page[-1][key]
+            offset += page_size
+    finally:
+        connection.close()
     return
@@ -1,16 +1,18 @@
 #!/usr/bin/python3
 seed = __import__('seed')
+pipeline = __import__('pipeline')
+aggregates = __import__('aggregates')
+
+AGES = pipeline.Query("user_data").select("age")
 
 def stream_user_ages():
     connection = seed.connect_to_prodev()
-    cursor = connection.cursor()
-    cursor.execute("SELECT age FROM user_data")
-
-    for row in cursor:
-        yield row[0]  # row is a tuple like (age,)
-
-    cursor.close()
-    connection.close()
+    try:
+        # Projection pushdown: only the age column leaves the server
+        for row in AGES.stream(connection):
+            yield row["age"]
+    finally:
+        connection.close()
     return
 
 def compute_average_age():
@@ -27,3 +29,42 @@ def compute_average_age():
     else:
         print("No users found.")
     return
+
+def stream_user_age_batches(batch_size=seed.STREAM_CHUNK_SIZE):
+    """Like stream_user_ages, but yields lists of ages one fetchmany at a time"""
+    connection = seed.connect_to_prodev()
+    try:
+        for rows in AGES.batches(connection, batch_size):
+            yield [row["age"] for row in rows]
+    finally:
+        connection.close()
+    return
+
+def compute_age_statistics(batch_size=seed.STREAM_CHUNK_SIZE, pushdown=False):
+    """
+    Mean, stddev, min/max, p50/p95/p99 and a histogram of user ages.
+    pushdown=True only needs the moments and asks the database for them.
+    """
+    if pushdown:
+        connection = seed.connect_to_prodev()
+        try:
+            report = aggregates.sql_moments(connection, "age").as_dict()
+        finally:
+            connection.close()
+    else:
+        summary = aggregates.Summary(start=0, stop=100, bins=10)
+        report = summary.consume(stream_user_age_batches(batch_size)).report()
+
+    if not report["count"]:
+        print("No users found.")
+        return report
+    print(f"Users: {report['count']}, mean age: {report['mean']:.2f}, "
+          f"stddev: {report['stddev']:.2f}, "
+          f"min: {report['min']:.2f}, max: {report['max']:.2f}")
+    if not pushdown:
+        print(f"p50: {report['p50']:.2f}, p95: {report['p95']:.2f}, "
+              f"p99: {report['p99']:.2f}")
+        if report["underflow"] or report["overflow"]:
+            print(f"Outside the histogram: {report['underflow']} below 0, "
+                  f"{report['overflow']} at 100 or above")
+    return report
@@ -0,0 +1,256 @@
+import math
+
+seed = __import__('seed')
+pipeline = __import__('pipeline')
+
+class Moments:
+    """
+    Single-pass count/mean/variance/min/max (Welford).
+    update() takes a whole chunk: the chunk's own mean and sum of squared
+    deviations are computed with builtin sum() and then merged in, so the
+    Python-level work is per chunk rather than per value. merge() combines
+    partial results from other workers (Chan et al. parallel formula).
+    """
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared deviations from the mean
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        value = float(value)
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        return self
+
+    def update(self, values):
+        values = [float(v) for v in values]
+        if not values:
+            return self
+        chunk = Moments()
+        chunk.count = len(values)
+        chunk.mean = math.fsum(values) / chunk.count
+        chunk.m2 = math.fsum((v - chunk.mean) ** 2 for v in values)
+        chunk.min = min(values)
+        chunk.max = max(values)
+        return self.merge(chunk)
+
+    def merge(self, other):
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.__dict__.update(other.__dict__)
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        """Population variance"""
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def stddev(self):
+        return math.sqrt(self.variance)
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "stddev": self.stddev,
+            "min": self.min,
+            "max": self.max,
+        }
+
+class Histogram:
+    """
+    Fixed-width histogram over [start, stop) with `bins` buckets plus
+    underflow/overflow counters. Histograms with the same edges merge by
+    adding counts.
+    """
+    def __init__(self, start, stop, bins):
+        if stop <= start or bins < 1:
+            raise ValueError("Histogram needs start < stop and at least one bin")
+        self.start = start
+        self.stop = stop
+        self.bins = bins
+        self.width = (stop - start) / bins
+        self.counts = [0] * bins
+        self.underflow = 0
+        self.overflow = 0
+
+    def update(self, values):
+        counts = self.counts
+        for value in values:
+            value = float(value)
+            if value < self.start:
+                self.underflow += 1
+            elif value >= self.stop:
+                self.overflow += 1
+            else:
+                counts[min(int((value - self.start) / self.width), self.bins - 1)] += 1
+        return self
+
+    def merge(self, other):
+        if (other.start, other.stop, other.bins) != (self.start, self.stop, self.bins):
+            raise ValueError("Cannot merge histograms with different edges")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+        return self
+
+    def edges(self):
+        return [self.start + i * self.width for i in range(self.bins + 1)]
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with relative error guarantees (DDSketch).
+    Values are counted in logarithmic buckets of ratio gamma, so any
+    quantile is returned within relative_accuracy of the true value and
+    memory depends on the value range, not on how many rows were seen.
+    Sketches with the same accuracy merge by adding bucket counts.
+    """
+    def __init__(self, relative_accuracy=0.01):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.positive = {}
+        self.negative = {}
+        self.zeros = 0
+        self.count = 0
+
+    def _key(self, value):
+        return math.ceil(math.log(value) / self.log_gamma)
+
+    def _value(self, key):
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def update(self, values):
+        positive = self.positive
+        negative = self.negative
+        for value in values:
+            value = float(value)
+            self.count += 1
+            if value > 0:
+                key = self._key(value)
+                positive[key] = positive.get(key, 0) + 1
+            elif value < 0:
+                key = self._key(-value)
+                negative[key] = negative.get(key, 0) + 1
+            else:
+                self.zeros += 1
+        return self
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        for mine, theirs in ((self.positive, other.positive),
+                             (self.negative, other.negative)):
+            for key, count in theirs.items():
+                mine[key] = mine.get(key, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+        return self
+
+    def quantile(self, q):
+        """Approximate q-quantile (0 <= q <= 1), None if the sketch is empty"""
+        if not 0 <= q <= 1:
+            raise ValueError("q must be between 0 and 1")
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        # Most negative values first: largest keys of the negative store
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._value(key)
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self.positive))
+
+class Summary:
+    """Moments, histogram and quantile sketch fed from the same chunks"""
+    def __init__(self, start=0, stop=100, bins=10, relative_accuracy=0.01):
+        self.moments = Moments()
+        self.histogram = Histogram(start, stop, bins)
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    def update(self, values):
+        values = [float(v) for v in values]
+        self.moments.update(values)
+        self.histogram.update(values)
+        self.sketch.update(values)
+        return self
+
+    def merge(self, other):
+        self.moments.merge(other.moments)
+        self.histogram.merge(other.histogram)
+        self.sketch.merge(other.sketch)
+        return self
+
+    def consume(self, chunks):
+        """Feed an iterable of value chunks, e.g. a batched generator"""
+        for chunk in chunks:
+            self.update(chunk)
+        return self
+
+    def report(self, quantiles=(0.5, 0.95, 0.99)):
+        report = self.moments.as_dict()
+        for q in quantiles:
+            report[f"p{q * 100:g}"] = self.sketch.quantile(q)
+        report["histogram"] = list(zip(self.histogram.edges(), self.histogram.counts))
+        # Values outside [start, stop) are in no bucket, only counted here
+        report["underflow"] = self.histogram.underflow
+        report["overflow"] = self.histogram.overflow
+        return report
+
+def sql_moments(connection, column, query=None):
+    """
+    Push a plain aggregate down to SQL: count, mean, min, max and variance
+    of column come back in one row instead of streaming every value.
+    Variance uses SUM(x*x), which is fine for small bounded columns such
+    as age; use Moments over a stream when precision matters more.
+    Python-side filters on the query cannot be pushed down and are refused.
+    """
+    if query is None:
+        query = pipeline.Query()
+    if query.predicates:
+        raise ValueError("Query has Python filters, aggregate the stream instead")
+    column = pipeline.check_identifier(column)
+    where, params = query.where_sql(seed.param_marker(connection))
+    cursor = connection.cursor()
+    cursor.execute(
+        f"SELECT COUNT({column}), SUM({column}), SUM({column} * {column}), "
+        f"MIN({column}), MAX({column}) FROM {query.table}{where}",
+        params
+    )
+    count, total, total_squares, lowest, highest = cursor.fetchone()
+    cursor.close()
+
+    moments = Moments()
+    if count:
+        moments.count = count
+        moments.mean = float(total) / count
+        moments.m2 = max(float(total_squares) - count * moments.mean ** 2, 0.0)
+        moments.min = float(lowest)
+        moments.max = float(highest)
+    return moments
@@ -0,0 +1,172 @@
+import asyncio
+import contextlib
+import weakref
+
+seed = __import__('seed')
+pipeline = __import__('pipeline')
+rowtypes = __import__('rowtypes')
+paginate = __import__('2-lazy_paginate')
+
+class MySQLBackend:
+    """aiomysql with server-side (SS) cursors, so rows stay on the server"""
+    marker = "%s"
+
+    def __init__(self, **connect_args):
+        self.connect_args = connect_args or {
+            "host": "localhost",
+            "user": "root",
+            "password": "yourpassword",
+            "db": "ALX_prodev",
+        }
+
+    async def connect(self):
+        import aiomysql
+        return await aiomysql.connect(**self.connect_args)
+
+    async def execute(self, connection, sql, params, dictionary):
+        import aiomysql
+        cursor_class = aiomysql.SSDictCursor if dictionary else aiomysql.SSCursor
+        cursor = await connection.cursor(cursor_class)
+        await cursor.execute(sql, params)
+        return cursor
+
+    async def close(self, connection, cursor, finished):
+        # Closing an SS cursor drains the rest of the result set, so an
+        # abandoned stream just drops the socket instead.
+        if cursor is not None and finished:
+            await cursor.close()
+        connection.close()
+
+class SQLiteBackend:
+    """aiosqlite against a local file, for tests and benchmarks"""
+    marker = "?"
+
+    def __init__(self, path=seed.SQLITE_DB):
+        self.path = path
+
+    async def connect(self):
+        import aiosqlite
+        return await aiosqlite.connect(self.path)
+
+    async def execute(self, connection, sql, params, dictionary):
+        cursor = await connection.execute(sql, params)
+        if dictionary:
+            cursor.row_factory = seed.dict_row
+        return cursor
+
+    async def close(self, connection, cursor, finished):
+        if cursor is not None:
+            await cursor.close()
+        await connection.close()
+
+_backend = MySQLBackend()
+_max_in_flight = 8
+# One semaphore per event loop bounds the fetches of all its streams
+_in_flight = weakref.WeakKeyDictionary()
+
+def configure(backend=None, max_in_flight=8):
+    """Choose the async backend and how many fetches may run at once"""
+    global _backend, _max_in_flight
+    if backend is not None:
+        _backend = backend
+    _max_in_flight = max_in_flight
+    _in_flight.clear()
+
+def use_sqlite(path=seed.SQLITE_DB, max_in_flight=8):
+    configure(SQLiteBackend(path), max_in_flight)
+
+def in_flight():
+    loop = asyncio.get_running_loop()
+    semaphore = _in_flight.get(loop)
+    if semaphore is None:
+        semaphore = _in_flight[loop] = asyncio.Semaphore(_max_in_flight)
+    return semaphore
+
+async def astream_rows(sql, params=(), chunk_size=seed.STREAM_CHUNK_SIZE,
+                       dictionary=True, records=False):
+    """
+    Async counterpart of seed.stream_rows: yields fetchmany chunks.
+    Each fetch holds a slot of the shared in-flight semaphore, so many
+    concurrent exports on one event loop cannot flood the database.
+    The connection is closed when the stream ends, fails, is closed with
+    aclose() or its task is cancelled; the close itself is shielded so a
+    second cancellation cannot leak the connection.
+    """
+    connection = await _backend.connect()
+    cursor = None
+    finished = False
+    try:
+        cursor = await _backend.execute(connection, sql, params,
+                                        dictionary and not records)
+        while True:
+            async with in_flight():
+                rows = await cursor.fetchmany(chunk_size)
+            if not rows:
+                finished = True
+                break
+            yield rowtypes.make_records(cursor, rows) if records else list(rows)
+    finally:
+        await asyncio.shield(_backend.close(connection, cursor, finished))
+
+async def astream_users_in_batches(batch_size, query=None, records=False):
+    if query is None:
+        query = pipeline.Query("user_data")
+    sql, params = query.to_sql(_backend.marker)
+    # aclosing: if our consumer stops early, the inner stream (and its
+    # connection) is closed now, not whenever it is garbage collected
+    async with contextlib.aclosing(astream_rows(sql, params, batch_size,
+                                                records=records)) as stream:
+        async for rows in stream:
+            if query.predicates or len(query.fetched_columns()) > len(query.columns):
+                rows = list(query.apply(rows, records))
+            if rows:
+                yield rows
+
+async def astream_users(chunk_size=seed.STREAM_CHUNK_SIZE, records=False):
+    """async for row in astream_users(): ... (see 0-stream_users)"""
+    async with contextlib.aclosing(astream_users_in_batches(
+            chunk_size, records=records)) as batches:
+        async for rows in batches:
+            for row in rows:
+                yield row
+
+async def astream_user_ages(chunk_size=seed.STREAM_CHUNK_SIZE):
+    async with contextlib.aclosing(astream_rows("SELECT age FROM user_data", (),
+                                                chunk_size, dictionary=False)) as stream:
+        async for rows in stream:
+            for row in rows:
+                yield row[0]
+
+async def alazy_pagination(page_size, after=None, key="user_id", records=False):
+    """
+    Keyset pages of user_data over one connection (see
+    2-lazy_paginate.lazy_pagination); make_cursor tokens work as `after`.
+    """
+    last_key = None
+    if after is not None:
+        key, last_key = paginate.read_cursor(after)
+    if key not in paginate.KEYSET_COLUMNS:
+        raise ValueError(f"Keyset pagination needs one of {paginate.KEYSET_COLUMNS}, got {key!r}")
+    marker = _backend.marker
+    connection = await _backend.connect()
+    try:
+        while True:
+            if last_key is None:
+                sql = f"SELECT * FROM user_data ORDER BY {key} LIMIT {marker}"
+                params = (page_size,)
+            else:
+                sql = (f"SELECT * FROM user_data WHERE {key} > {marker} "
+                       f"ORDER BY {key} LIMIT {marker}")
+                params = (last_key, page_size)
+            cursor = await _backend.execute(connection, sql, params, not records)
+            async with in_flight():
+                page = await cursor.fetchall()
+            if records:
+                page = rowtypes.make_records(cursor, page)
+            await cursor.close()
+            if not page:
+                return
+            yield list(page)
+            last_key = page[-1][key]
+    finally:
+        await asyncio.shield(_backend.close(connection, None, True))
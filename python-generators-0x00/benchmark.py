@@ -0,0 +1,206 @@
+#!/usr/bin/python3
+"""
+Benchmark and memory profile of the python-generators-0x00 streaming code.
+
+Seeds a synthetic user_data table per size in a local SQLite stand-in,
+then runs every case in a fresh process (so peak RSS is per case) and
+reports rows/s, time-to-first-row, peak RSS and per-row allocations.
+
+    python benchmark.py --sizes 10000 1000000 10000000 --output run.json
+    python benchmark.py --sizes 10000 --compare run.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+import uuid
+
+seed = __import__('seed')
+
+DEFAULT_SIZES = (10000, 1000000, 10000000)
+# LIMIT/OFFSET pagination is quadratic; past this size it only measures that
+OFFSET_PAGINATION_MAX_ROWS = 1000000
+
+def seed_database(path, rows, chunk_size=50000):
+    """Create path with exactly `rows` synthetic users (reused if already there)"""
+    connection = seed.connect_sqlite(path)
+    seed.create_table(connection)
+    cursor = connection.cursor()
+    cursor.execute("SELECT COUNT(*) FROM user_data")
+    existing = cursor.fetchone()[0]
+    if existing > rows:
+        cursor.execute("DELETE FROM user_data")
+        existing = 0
+    for start in range(existing, rows, chunk_size):
+        cursor.executemany(
+            "INSERT INTO user_data (user_id, name, email, age) VALUES (?, ?, ?, ?)",
+            [(str(uuid.uuid4()), f"User {i}", f"user{i}@example.com", 18 + i % 83)
+             for i in range(start, min(start + chunk_size, rows))]
+        )
+        connection.commit()
+    cursor.close()
+    connection.close()
+
+def cases(batch_size):
+    """name -> (factory returning an iterable, function counting rows per item)"""
+    stream = __import__('0-stream_users')
+    batches = __import__('1-batch_processing')
+    paginate = __import__('2-lazy_paginate')
+    ages = __import__('4-stream_ages')
+
+    def average_age():
+        with contextlib.redirect_stdout(io.StringIO()):
+            ages.compute_average_age()
+        return iter(())
+
+    one = lambda item: 1
+    size = len
+    return {
+        "stream_users": (lambda: stream.stream_users(batch_size), one),
+        "stream_users_in_batches": (
+            lambda: batches.stream_users_in_batches(batch_size), size),
+        "batch_processing": (lambda: batches.batch_processing(batch_size), one),
+        "lazy_pagination": (lambda: paginate.lazy_pagination(batch_size), size),
+        "lazy_pagination_keyset": (
+            lambda: paginate.lazy_pagination(batch_size, keyset=True), size),
+        "compute_average_age": (average_age, None),
+    }
+
+def flatten(item):
+    return item if isinstance(item, list) else [item]
+
+def run_case(name, path, rows, batch_size, sample, results):
+    """Runs in its own process: time the case, then sample its allocations"""
+    seed.use_sqlite(path)
+    factory, count = cases(batch_size)[name]
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    first_row = None
+    seen = 0
+    for item in factory():
+        if first_row is None:
+            first_row = time.perf_counter() - start
+        seen += count(item)
+    elapsed = time.perf_counter() - start
+    if count is None:
+        seen = rows  # aggregate: one pass over every row
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Per-row cost of the objects a consumer receives: hold `sample` rows
+    # and measure the live blocks/bytes they add.
+    blocks_per_row = bytes_per_row = None
+    if count is not None:
+        held = []
+        iterator = factory()
+        blocks = sys.getallocatedblocks()
+        tracemalloc.start()
+        for item in iterator:
+            held.extend(flatten(item))
+            if len(held) >= sample:
+                break
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        if held:
+            blocks_per_row = (sys.getallocatedblocks() - blocks) / len(held)
+            bytes_per_row = current / len(held)
+        iterator.close()
+
+    results.put({
+        "case": name,
+        "rows": rows,
+        "rows_seen": seen,
+        "elapsed_s": elapsed,
+        "rows_per_s": seen / elapsed if elapsed else None,
+        "time_to_first_row_s": first_row,
+        "peak_rss_kb": peak_rss,
+        "rss_growth_kb": peak_rss - rss_before,
+        "blocks_per_row": blocks_per_row,
+        "bytes_per_row": bytes_per_row,
+    })
+
+def run(sizes, batch_size=1000, sample=10000, directory=".", only=None):
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for rows in sizes:
+        path = os.path.join(directory, f"bench_user_data_{rows}.sqlite3")
+        with contextlib.redirect_stdout(io.StringIO()):
+            seed_database(path, rows)
+        for name in cases(batch_size):
+            if only and name not in only:
+                continue
+            if name == "lazy_pagination" and rows > OFFSET_PAGINATION_MAX_ROWS:
+                results.append({"case": name, "rows": rows, "skipped": "quadratic"})
+                continue
+            queue = context.Queue()
+            worker = context.Process(target=run_case,
+                                     args=(name, path, rows, batch_size, sample, queue))
+            worker.start()
+            result = queue.get()
+            worker.join()
+            results.append(result)
+            print(format_result(result))
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "batch_size": batch_size,
+        "results": results,
+    }
+
+def format_result(result):
+    if "skipped" in result:
+        return f"{result['case']:<24} {result['rows']:>10} rows  skipped ({result['skipped']})"
+    first = result["time_to_first_row_s"]
+    per_row = result["bytes_per_row"]
+    return (f"{result['case']:<24} {result['rows']:>10} rows  "
+            f"{result['rows_per_s']:>12,.0f} rows/s  "
+            f"ttfr {'-' if first is None else f'{first * 1000:.1f}ms':>9}  "
+            f"peak rss {result['peak_rss_kb'] / 1024:7.1f} MB  "
+            f"{'-' if per_row is None else f'{per_row:.0f} B/row'}")
+
+def compare(current, baseline, tolerance=0.10):
+    """Print rows/s changes against a previous run; returns the regressions"""
+    previous = {(r["case"], r["rows"]): r for r in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        old = previous.get((result["case"], result["rows"]))
+        if not old or "skipped" in result or "skipped" in old:
+            continue
+        ratio = result["rows_per_s"] / old["rows_per_s"]
+        flag = "REGRESSION" if ratio < 1 - tolerance else ""
+        print(f"{result['case']:<24} {result['rows']:>10} rows  {ratio:6.2f}x {flag}")
+        if flag:
+            regressions.append((result["case"], result["rows"], ratio))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--sample", type=int, default=10000,
+                        help="rows held when measuring per-row allocations")
+    parser.add_argument("--cases", nargs="+", help="only run these cases")
+    parser.add_argument("--dir", default=".", help="where the SQLite files go")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--compare", help="JSON from a previous run")
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.batch_size, args.sample, args.dir, args.cases)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            if compare(report, json.load(file)):
+                sys.exit(1)
+
+if __name__ == "__main__":
+    main()
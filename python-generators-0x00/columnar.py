@@ -0,0 +1,127 @@
+from decimal import Decimal
+
+try:
+    import numpy as np
+except ImportError:  # columnar mode is optional
+    np = None
+
+seed = __import__('seed')
+pipeline = __import__('pipeline')
+
+def require_numpy():
+    if np is None:
+        raise ImportError("Columnar batches need numpy: pip install numpy")
+
+def to_array(values):
+    """
+    Pack one column into a NumPy array: int64/float64 for numeric columns
+    (DECIMAL ages become float64), one byte per character for ASCII strings
+    (ids, emails), fixed-width unicode for other strings, and a plain
+    object array only for anything else (e.g. NULLs).
+    The dtype comes from every value, not just the first: SQLite hands
+    DECIMAL columns back as a mix of int and float, and int64 would
+    truncate the floats.
+    """
+    if not values or any(v is None for v in values):
+        return np.array(values, dtype=object)
+    kinds = set(map(type, values))
+    if kinds == {bool}:
+        return np.array(values, dtype=bool)
+    if bool not in kinds and all(issubclass(k, int) for k in kinds):
+        return np.array(values, dtype=np.int64)
+    if bool not in kinds and all(issubclass(k, (int, float, Decimal)) for k in kinds):
+        return np.array([float(v) for v in values], dtype=np.float64)
+    if all(issubclass(k, str) for k in kinds):
+        if all(v.isascii() for v in values):
+            return np.array([v.encode("ascii") for v in values], dtype=bytes)
+        return np.array(values, dtype=str)
+    return np.array(values, dtype=object)
+
+class ColumnBatch:
+    """
+    A batch of rows stored column by column, e.g.
+
+        adults = batch[batch["age"] > 25]
+
+    batch["age"] is a NumPy array, so filters and aggregates run
+    vectorized. ASCII string columns are bytes arrays (compare them with
+    b"..." values). Indexing with a boolean mask or index array returns a
+    new ColumnBatch; to_rows() converts back to the usual list of dicts.
+    """
+    def __init__(self, columns):
+        self.columns = dict(columns)
+
+    @classmethod
+    def from_tuples(cls, names, rows):
+        require_numpy()
+        transposed = list(zip(*rows)) if rows else [()] * len(names)
+        return cls({name: to_array(list(values))
+                    for name, values in zip(names, transposed)})
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build a batch from dict rows (e.g. an existing row batch)"""
+        names = list(rows[0]) if rows else []
+        return cls.from_tuples(names, [tuple(row[n] for n in names) for row in rows])
+
+    def __len__(self):
+        for values in self.columns.values():
+            return len(values)
+        return 0
+
+    def __getitem__(self, item):
+        if isinstance(item, str):
+            return self.columns[item]
+        return ColumnBatch({name: values[item]
+                            for name, values in self.columns.items()})
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def names(self):
+        return list(self.columns)
+
+    @property
+    def nbytes(self):
+        """Memory held by the column arrays"""
+        return sum(values.nbytes for values in self.columns.values())
+
+    def to_rows(self):
+        """Back to row dicts for consumers that expect the dictionary cursor shape"""
+        names = self.names()
+        columns = [
+            [v.decode("ascii") for v in values.tolist()]
+            if values.dtype.kind == "S" else values.tolist()
+            for values in self.columns.values()
+        ]
+        return [dict(zip(names, values)) for values in zip(*columns)]
+
+def column_batches(connection, query=None, batch_size=seed.STREAM_CHUNK_SIZE):
+    """
+    Stream query as ColumnBatch objects. Rows are fetched as plain tuples
+    (no per-row dict) and transposed straight into column arrays.
+    Python-side filters cannot run on columns and are refused; use
+    where() pushdown or mask the batch instead.
+    """
+    require_numpy()
+    if query is None:
+        query = pipeline.Query()
+    if query.predicates:
+        raise ValueError("Columnar batches do not run Python filters, "
+                         "mask the batch instead")
+    sql, params = query.to_sql(seed.param_marker(connection))
+    cursor = seed.streaming_cursor(connection, dictionary=False)
+    try:
+        cursor.execute(sql, params)
+        names = [column[0] for column in cursor.description]
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield ColumnBatch.from_tuples(names, rows)
+    finally:
+        try:
+            cursor.close()
+        except Exception:
+            # Same as seed.stream_rows: unread rows go with the connection
+            pass
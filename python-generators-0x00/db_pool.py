@@ -0,0 +1,272 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+class PoolTimeout(Exception):
+    """No connection became available within the checkout timeout"""
+
+def default_health_check(connection):
+    """mysql.connector pings via is_connected(); anything else runs SELECT 1"""
+    is_connected = getattr(connection, "is_connected", None)
+    if is_connected is not None:
+        return is_connected()
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT 1")
+        cursor.fetchall()
+    finally:
+        cursor.close()
+    return True
+
+class PooledConnection:
+    """
+    What acquire() hands out: behaves like the driver connection, but
+    close() gives it back to the pool instead of disconnecting, so the
+    existing `connection.close()` calls in the generators keep working.
+    """
+    def __init__(self, pool, connection):
+        self._pool = pool
+        self.raw_connection = connection
+
+    def __getattr__(self, name):
+        if self.raw_connection is None:
+            raise AttributeError(f"Connection already returned to the pool ({name})")
+        return getattr(self.raw_connection, name)
+
+    def close(self):
+        if self.raw_connection is not None:
+            connection, self.raw_connection = self.raw_connection, None
+            self._pool.release(connection)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+class ConnectionPool:
+    """
+    Thread-safe pool of DB connections built by `connect`.
+
+    - min_size connections are opened up front and kept warm
+    - at most max_size exist at once; acquire() waits up to
+      checkout_timeout for one to be released, then raises PoolTimeout
+    - connections idle longer than health_check_interval are checked with
+      health_check before being handed out; broken ones are replaced
+    - connections idle longer than idle_timeout are closed, down to min_size
+    - on release, open transactions are rolled back; connections that
+      cannot be reset (e.g. unread MySQL results) are discarded
+    """
+    def __init__(self, connect, min_size=1, max_size=10, idle_timeout=300.0,
+                 checkout_timeout=30.0, health_check=default_health_check,
+                 health_check_interval=1.0):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError("Pool needs 0 <= min_size <= max_size and max_size >= 1")
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.health_check = health_check
+        self.health_check_interval = health_check_interval
+        self.pid = os.getpid()
+
+        self._lock = threading.Condition()
+        self._idle = deque()  # (connection, last_used), most recent on the right
+        self._size = 0        # idle + checked out + being opened
+        self._closed = False
+        self._stats = {
+            "created": 0, "closed": 0, "checkouts": 0, "waits": 0,
+            "wait_time": 0.0, "timeouts": 0, "health_failures": 0,
+            "evicted": 0, "discarded": 0,
+        }
+        for _ in range(min_size):
+            self._size += 1
+            self._idle.append((self._create(), time.monotonic()))
+
+    def _create(self):
+        """Open a connection for a slot already counted in _size"""
+        try:
+            connection = self.connect()
+        except BaseException:
+            with self._lock:
+                self._size -= 1
+                self._lock.notify()
+            raise
+        with self._lock:
+            self._stats["created"] += 1
+        return connection
+
+    def _close(self, connection, reason=None):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._stats["closed"] += 1
+            if reason:
+                self._stats[reason] += 1
+
+    def _discard(self, connection, reason=None):
+        """Close a connection and free its slot"""
+        with self._lock:
+            self._size -= 1
+            self._lock.notify()
+        self._close(connection, reason)
+
+    def _evict_idle(self, now):
+        """Pop connections idle past idle_timeout (caller holds the lock)"""
+        stale = []
+        while (self._idle and self._size > self.min_size
+               and now - self._idle[0][1] > self.idle_timeout):
+            stale.append(self._idle.popleft()[0])
+            self._size -= 1
+        return stale
+
+    def acquire(self, timeout=None):
+        """Check out a connection; close() it (or use `with`) to give it back"""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        waited = False
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+                now = time.monotonic()
+                stale = self._evict_idle(now)
+                connection = last_used = None
+                if self._idle:
+                    connection, last_used = self._idle.pop()
+                elif self._size < self.max_size:
+                    self._size += 1  # reserve the slot before connecting
+                else:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(f"No connection available after {timeout}s")
+                    if not waited:
+                        self._stats["waits"] += 1
+                        waited = True
+                    self._lock.wait(remaining)
+                    self._stats["wait_time"] += time.monotonic() - now
+                    continue
+            for old in stale:
+                self._close(old, "evicted")
+
+            if connection is None:
+                connection = self._create()
+            elif (now - last_used > self.health_check_interval
+                  and not self._healthy(connection)):
+                self._discard(connection, "health_failures")
+                continue
+            with self._lock:
+                self._stats["checkouts"] += 1
+            return PooledConnection(self, connection)
+
+    def _healthy(self, connection):
+        try:
+            return bool(self.health_check(connection))
+        except Exception:
+            return False
+
+    def release(self, connection):
+        if getattr(connection, "unread_result", False):
+            # Generator stopped early on an unbuffered cursor; draining the
+            # rest of the result could take forever, so drop the connection.
+            self._discard(connection, "discarded")
+            return
+        try:
+            connection.rollback()
+        except Exception:
+            self._discard(connection, "discarded")
+            return
+        with self._lock:
+            if self._closed:
+                closed = True
+            else:
+                closed = False
+                self._idle.append((connection, time.monotonic()))
+                self._lock.notify()
+        if closed:
+            self._discard(connection)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = self._size
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = self._size - len(self._idle)
+        return stats
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+        for connection in idle:
+            self._discard(connection)
+
+# Process-wide registry: one pool per name, created on first use
+_pools = {}
+_factories = {}
+_registry_lock = threading.Lock()
+
+def configure(name, connect, **options):
+    """
+    (Re)define how the named pool connects, e.g. to point the generators
+    at a local SQLite stand-in. An existing pool with that name is closed.
+    """
+    with _registry_lock:
+        _factories[name] = (connect, options)
+        pool = _pools.pop(name, None)
+    if pool is not None:
+        pool.close()
+
+def get_pool(name):
+    """
+    The process-wide pool for name. A forked child (e.g. a parallel_scan
+    worker) never reuses the parent's sockets and gets its own pool.
+    """
+    with _registry_lock:
+        pool = _pools.get(name)
+        if pool is None or pool.pid != os.getpid():
+            if name not in _factories:
+                raise KeyError(f"No connection pool configured for {name!r}")
+            connect, options = _factories[name]
+            pool = _pools[name] = ConnectionPool(connect, **options)
+        return pool
+
+def benchmark(calls=5000, path="db_pool_bench.sqlite3"):
+    """Connect-per-call vs pooled checkout on a local SQLite database"""
+    def query(connection):
+        cursor = connection.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchall()
+        cursor.close()
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        connection = sqlite3.connect(path)
+        query(connection)
+        connection.close()
+    direct = (time.perf_counter() - start) / calls
+
+    pool = ConnectionPool(lambda: sqlite3.connect(path, check_same_thread=False),
+                          min_size=1, max_size=4)
+    start = time.perf_counter()
+    for _ in range(calls):
+        connection = pool.acquire()
+        query(connection)
+        connection.close()
+    pooled = (time.perf_counter() - start) / calls
+    pool.close()
+
+    print(f"connect per call: {direct * 1e6:.1f} us/call")
+    print(f"pooled checkout:  {pooled * 1e6:.1f} us/call ({direct / pooled:.1f}x)")
+    return direct, pooled
+
+if __name__ == "__main__":
+    benchmark()
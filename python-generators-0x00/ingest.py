@@ -0,0 +1,169 @@
+import csv
+import json
+import mmap
+import os
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+seed = __import__('seed')
+
+CHUNK_BYTES = 8 * 1024 * 1024
+COMMIT_EVERY = 10000
+
+def read_checkpoint(checkpoint_file, csv_file):
+    """Byte offset and row count to resume from, (None, 0) if there is none"""
+    if not checkpoint_file or not os.path.exists(checkpoint_file):
+        return None, 0
+    with open(checkpoint_file) as file:
+        state = json.load(file)
+    stat = os.stat(csv_file)
+    if (state["csv_file"], state["size"], state["mtime"]) != (
+            os.path.abspath(csv_file), stat.st_size, stat.st_mtime):
+        raise ValueError(f"Checkpoint {checkpoint_file} was written for a "
+                         f"different version of {csv_file}; delete it to start over")
+    return state["offset"], state["rows"]
+
+def write_checkpoint(checkpoint_file, csv_file, offset, rows):
+    """Atomically record that everything before `offset` is committed"""
+    stat = os.stat(csv_file)
+    state = {
+        "csv_file": os.path.abspath(csv_file),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "offset": offset,
+        "rows": rows,
+    }
+    temp_file = checkpoint_file + ".tmp"
+    with open(temp_file, "w") as file:
+        json.dump(state, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_file, checkpoint_file)
+
+def chunk_ranges(data, start, chunk_bytes):
+    """Split data[start:] into (begin, end) byte ranges that end on a newline"""
+    size = len(data)
+    while start < size:
+        end = min(start + chunk_bytes, size)
+        if end < size:
+            newline = data.find(b"\n", end)
+            end = size if newline == -1 else newline + 1
+        yield start, end
+        start = end
+
+def parse_range(csv_file, begin, end, columns, commit_every):
+    """
+    Parse the lines in csv_file[begin:end] into insert batches of at most
+    commit_every rows. Each batch comes with the byte offset right after
+    its last line, which is what gets checkpointed once it is committed.
+    Module-level so worker processes can run it; the workers map the file
+    themselves, so only offsets travel to them.
+    """
+    name_at, email_at, age_at = columns
+    with open(csv_file, "rb") as file, \
+            mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        lines = data[begin:end].split(b"\n")
+    if lines and lines[-1] == b"":
+        lines.pop()  # the chunk ends with a newline
+
+    batches = []
+    offset = begin
+    for first in range(0, len(lines), commit_every):
+        group = lines[first:first + commit_every]
+        offset += sum(len(line) + 1 for line in group)
+        text = [line.decode("utf-8").rstrip("\r") for line in group]
+        values = [
+            (str(uuid.uuid4()), row[name_at], row[email_at], float(row[age_at]))
+            for row in csv.reader(line for line in text if line)
+        ]
+        batches.append((values, min(offset, end)))
+    return batches
+
+def ingest_csv(connection, csv_file, checkpoint_file=None,
+               commit_every=COMMIT_EVERY, chunk_bytes=CHUNK_BYTES, workers=0):
+    """
+    Resumable version of seed.bulk_insert_data.
+
+    The CSV is memory-mapped and parsed chunk_bytes at a time (in `workers`
+    processes if workers > 0). Rows are committed every commit_every rows,
+    and after each commit the byte offset reached is written to
+    checkpoint_file. Re-running with the same checkpoint file continues
+    after the last committed row instead of starting again. A crash
+    between a commit and its checkpoint only replays that one batch,
+    whose rows the unique key on email then skips.
+    Assumes no quoted field contains a newline (true for user_data CSVs).
+    """
+    if checkpoint_file is None:
+        checkpoint_file = csv_file + ".checkpoint"
+    offset, rows_done = read_checkpoint(checkpoint_file, csv_file)
+
+    if os.path.getsize(csv_file) == 0:
+        columns, ranges = None, []  # nothing to read (and mmap refuses empty files)
+    else:
+        with open(csv_file, "rb") as file, \
+                mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            header_end = data.find(b"\n") + 1 or len(data)
+            header = next(csv.reader([data[:header_end].decode("utf-8-sig").strip()]))
+            columns = tuple(header.index(name) for name in ("name", "email", "age"))
+            ranges = list(chunk_ranges(data, offset or header_end, chunk_bytes))
+
+    executor = None
+    if workers and ranges:
+        pending = deque()
+        remaining = iter(ranges)
+
+        def parsed():
+            # Keep at most 2 chunks per worker parsed ahead of the inserts
+            while True:
+                while len(pending) < workers * 2:
+                    bounds = next(remaining, None)
+                    if bounds is None:
+                        break
+                    pending.append(executor.submit(
+                        parse_range, csv_file, *bounds, columns, commit_every))
+                if not pending:
+                    return
+                yield pending.popleft().result()
+    else:
+        def parsed():
+            for begin, end in ranges:
+                yield parse_range(csv_file, begin, end, columns, commit_every)
+
+    query = seed.insert_ignore_query(connection)
+    cursor = connection.cursor()
+    rows_read = 0
+    rows_inserted = 0
+    start = time.perf_counter()
+    try:
+        if workers and ranges:
+            # Created in here, so the shutdown below runs whatever fails
+            executor = ProcessPoolExecutor(max_workers=workers)
+        for batches in parsed():
+            for values, batch_end in batches:
+                if values:
+                    cursor.executemany(query, values)
+                    rows_inserted += max(cursor.rowcount, 0)
+                connection.commit()
+                rows_read += len(values)
+                write_checkpoint(checkpoint_file, csv_file, batch_end,
+                                 rows_done + rows_read)
+    finally:
+        cursor.close()
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    elapsed = time.perf_counter() - start
+
+    rows_per_sec = rows_read / elapsed if elapsed > 0 else 0.0
+    print(f"Inserted {rows_inserted} of {rows_read} rows "
+          f"in {elapsed:.2f}s ({rows_per_sec:,.0f} rows/s), "
+          f"{rows_done + rows_read} rows done in total")
+    return {
+        "rows_read": rows_read,
+        "rows_inserted": rows_inserted,
+        "rows_total": rows_done + rows_read,
+        "elapsed": elapsed,
+        "rows_per_sec": rows_per_sec,
+        "offset": ranges[-1][1] if ranges else offset,
+    }
@@ -0,0 +1,150 @@
+import functools
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+seed = __import__('seed')
+pipeline = __import__('pipeline')
+
+def partition_bounds(connection, partitions, key="user_id", table="user_data"):
+    """
+    Split table into `partitions` key ranges of roughly equal row counts.
+    Returns (low, high) pairs where low is inclusive, high is exclusive
+    and None means unbounded. The boundaries (every step-th key) are
+    picked in one ordered pass over the key index by a window function,
+    so only partitions - 1 keys come back, and each worker can then seek
+    straight to its own range.
+    """
+    key = pipeline.check_identifier(key)
+    table = pipeline.check_identifier(table)
+    cursor = connection.cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM {table}")
+    total = cursor.fetchone()[0]
+    step = total // partitions
+
+    bounds = []
+    if step > 0 and partitions > 1:
+        # Positions step + 1, 2 * step + 1, ... (what OFFSET i * step would
+        # return). step and the limit are ints we computed, inlined so '%'
+        # needs no escaping for the MySQL driver
+        cursor.execute(
+            f"SELECT {key} FROM ("
+            f"SELECT {key}, ROW_NUMBER() OVER (ORDER BY {key}) AS position "
+            f"FROM {table}) AS numbered "
+            f"WHERE position > 1 AND (position - 1) % {int(step)} = 0 "
+            f"ORDER BY position LIMIT {int(partitions) - 1}"
+        )
+        bounds = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+
+    edges = [None] + bounds + [None]
+    return list(zip(edges[:-1], edges[1:]))
+
+def scan_partition(connect, query, key, low, high, batch_size, func):
+    """
+    Worker side: stream one key range on its own connection and return
+    func(batch) for each batch. Runs in a pool process, so connect, query
+    and func must be picklable (module-level functions, no lambdas).
+    """
+    if low is not None:
+        query = query.where(key, ">=", low)
+    if high is not None:
+        query = query.where(key, "<", high)
+    connection = connect()
+    try:
+        return [func(batch) for batch in query.batches(connection, batch_size)]
+    finally:
+        connection.close()
+
+def parallel_scan(func, query=None, key="user_id", workers=None, partitions=None,
+                  batch_size=seed.STREAM_CHUNK_SIZE, ordered=True,
+                  max_pending=None, connect=seed.connect_to_prodev):
+    """
+    Scan query's rows across a process pool and yield func(batch) results.
+
+    The table is split into key ranges (default: 4 per worker) and each
+    range is streamed on its own connection in a worker process.
+    ordered=True yields results in key-range order; ordered=False yields
+    each range as soon as it finishes. At most max_pending ranges
+    (default: 2 per worker) are in flight or buffered, which bounds the
+    memory used when the consumer is slower than the workers.
+    """
+    if query is None:
+        query = pipeline.Query()
+    workers = workers or os.cpu_count() or 1
+    partitions = partitions or workers * 4
+    max_pending = max(max_pending or workers * 2, 1)
+
+    connection = connect()
+    try:
+        ranges = partition_bounds(connection, partitions, key, query.table)
+    finally:
+        connection.close()
+
+    executor = ProcessPoolExecutor(max_workers=workers)
+    pending = deque()
+    ranges = iter(ranges)
+    try:
+        while True:
+            while len(pending) < max_pending:
+                bounds = next(ranges, None)
+                if bounds is None:
+                    break
+                pending.append(executor.submit(
+                    scan_partition, connect, query, key, *bounds, batch_size, func
+                ))
+            if not pending:
+                return
+
+            if ordered:
+                done = pending.popleft()
+            else:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                done = finished.pop()
+                pending.remove(done)
+            yield from done.result()
+    finally:
+        # Also runs on early close: drop queued ranges, keep the pool tidy
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def users_over_25(batch):
+    """batch_processing's filter as a picklable per-batch function"""
+    return [user for user in batch if user["age"] > 25]
+
+def benchmark(rows=500000, path="parallel_scan_bench.sqlite3", max_workers=None):
+    """Rows/s of parallel_scan over a local SQLite stand-in per worker count"""
+    connect = functools.partial(seed.connect_sqlite, path)
+    connection = connect()
+    seed.create_table(connection)
+    cursor = connection.cursor()
+    cursor.execute("SELECT COUNT(*) FROM user_data")
+    missing = rows - cursor.fetchone()[0]
+    if missing > 0:
+        cursor.executemany(
+            "INSERT INTO user_data (user_id, name, email, age) VALUES (?, ?, ?, ?)",
+            ((os.urandom(16).hex(), f"user{i}", f"user{i}.{time.time_ns()}@example.com",
+              18 + i % 80) for i in range(missing))
+        )
+        connection.commit()
+    cursor.close()
+    connection.close()
+
+    max_workers = max_workers or os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= max_workers:
+        counts.append(counts[-1] * 2)
+    results = {}
+    for workers in counts:
+        start = time.perf_counter()
+        matched = sum(len(batch) for batch in parallel_scan(
+            users_over_25, workers=workers, connect=connect, ordered=False
+        ))
+        elapsed = time.perf_counter() - start
+        results[workers] = rows / elapsed
+        print(f"workers={workers}: {elapsed:.2f}s, {rows / elapsed:,.0f} rows/s "
+              f"({matched} rows matched)")
+    return results
+
+if __name__ == "__main__":
+    benchmark()
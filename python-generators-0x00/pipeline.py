@@ -0,0 +1,129 @@
+import re
+
+seed = __import__('seed')
+rowtypes = __import__('rowtypes')
+
+# Operators that can be pushed down into the SQL WHERE clause
+OPERATORS = ("=", "!=", "<", "<=", ">", ">=", "LIKE", "IN")
+IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+def check_identifier(name):
+    """Table/column names are spliced into SQL, so only allow plain names"""
+    if not IDENTIFIER.match(name):
+        raise ValueError(f"Invalid SQL identifier: {name!r}")
+    return name
+
+class Query:
+    """
+    Small composable query over a table, e.g.
+
+        Query("user_data").select("user_id", "age").where("age", ">", 25)
+
+    select() and where() are pushed down into the SELECT/WHERE clauses so
+    the database only sends the rows and columns we need. filter() takes
+    any Python predicate; those cannot be pushed down and run as lazy
+    generator stages over the streamed rows instead.
+    Every method returns a new Query, so partial queries can be reused.
+    """
+    def __init__(self, table="user_data"):
+        self.table = check_identifier(table)
+        self.columns = ()      # projection, empty means SELECT *
+        self.conditions = ()   # (column, operator, value), ANDed together
+        self.predicates = ()   # Python-side filters, in declaration order
+        self.needed = ()       # extra columns the Python filters read
+
+    def _copy(self, **changes):
+        query = Query(self.table)
+        query.__dict__.update(self.__dict__)
+        query.__dict__.update(changes)
+        return query
+
+    def select(self, *columns):
+        """Only fetch these columns"""
+        return self._copy(columns=tuple(check_identifier(c) for c in columns))
+
+    def where(self, column, operator, value):
+        """Filter rows in SQL: column <operator> value"""
+        operator = operator.upper()
+        if operator not in OPERATORS:
+            raise ValueError(f"Operator {operator!r} cannot be pushed down, "
+                             f"use filter() instead")
+        condition = (check_identifier(column), operator, value)
+        return self._copy(conditions=self.conditions + (condition,))
+
+    def filter(self, predicate, columns=()):
+        """
+        Filter rows in Python with predicate(row).
+        List the columns the predicate reads so they are fetched even if
+        they are not part of select(); they are dropped again afterwards.
+        """
+        needed = self.needed + tuple(check_identifier(c) for c in columns)
+        return self._copy(predicates=self.predicates + (predicate,),
+                          needed=needed)
+
+    def fetched_columns(self):
+        if not self.columns:
+            return ()
+        extra = [c for c in dict.fromkeys(self.needed) if c not in self.columns]
+        return self.columns + tuple(extra)
+
+    def to_sql(self, marker="%s"):
+        """Build the pushed-down statement and its parameters"""
+        columns = ", ".join(self.fetched_columns()) or "*"
+        where, params = self.where_sql(marker)
+        return f"SELECT {columns} FROM {self.table}{where}", params
+
+    def where_sql(self, marker="%s"):
+        """The pushed-down WHERE clause (empty if there is none) and its parameters"""
+        clauses = []
+        params = []
+        for column, operator, value in self.conditions:
+            if operator == "IN":
+                values = tuple(value)
+                placeholders = ", ".join([marker] * len(values))
+                clauses.append(f"{column} IN ({placeholders})")
+                params.extend(values)
+            else:
+                clauses.append(f"{column} {operator} {marker}")
+                params.append(value)
+        if not clauses:
+            return "", ()
+        return " WHERE " + " AND ".join(clauses), tuple(params)
+
+    def apply(self, rows, records=False):
+        """
+        Lazily run the Python-side stages over an iterable of dict rows
+        (records=True: rowtypes records, which stay records when the
+        filter-only columns are dropped)
+        """
+        for predicate in self.predicates:
+            rows = filter(predicate, rows)
+        if len(self.fetched_columns()) > len(self.columns):
+            columns = self.columns
+            if records:
+                record, new = rowtypes.record_type(columns), tuple.__new__
+                rows = (new(record, [row[c] for c in columns]) for row in rows)
+            else:
+                rows = ({c: row[c] for c in columns} for row in rows)
+        return rows
+
+    def batches(self, connection, batch_size=seed.STREAM_CHUNK_SIZE,
+                records=False):
+        """
+        Yield lists of matching rows. Batches come straight from fetchmany,
+        so they can be shorter than batch_size when Python filters apply.
+        records=True gives rowtypes records instead of dicts.
+        """
+        sql, params = self.to_sql(seed.param_marker(connection))
+        for rows in seed.stream_rows(connection, sql, params, batch_size,
+                                     records=records):
+            if self.predicates or len(self.fetched_columns()) > len(self.columns):
+                rows = list(self.apply(rows, records))
+            if rows:
+                yield rows
+
+    def stream(self, connection, chunk_size=seed.STREAM_CHUNK_SIZE,
+               records=False):
+        """Yield matching rows one at a time"""
+        for rows in self.batches(connection, chunk_size, records):
+            yield from rows
@@ -0,0 +1,90 @@
+import queue
+import threading
+import time
+
+# Markers the producer thread puts on the queue next to the items
+_DONE = object()
+_ERROR = object()
+
+def prefetch(iterable, depth=2):
+    """
+    Iterate `iterable` on a background thread, up to `depth` items ahead.
+
+    While the consumer works on one page/batch the next ones are already
+    being fetched, so DB round-trips overlap with processing. The queue is
+    bounded, so a slow consumer never makes the producer buffer more than
+    `depth` items. Exceptions raised by the source are re-raised in the
+    consumer; closing this generator early stops the producer and closes
+    the source generator (and with it its cursor/connection) on its thread.
+    """
+    items = queue.Queue(maxsize=max(depth, 1))
+    stop = threading.Event()
+
+    def put(item):
+        # Time out regularly so a closed consumer cannot block us forever
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        source = iter(iterable)
+        try:
+            for item in source:
+                if not put((None, item)):
+                    break
+            else:
+                put((_DONE, None))
+        except BaseException as err:
+            put((_ERROR, err))
+        finally:
+            close = getattr(source, "close", None)
+            if close is not None:
+                close()
+
+    producer = threading.Thread(target=produce, name="prefetch", daemon=True)
+    producer.start()
+    try:
+        while True:
+            marker, item = items.get()
+            if marker is _DONE:
+                return
+            if marker is _ERROR:
+                raise item
+            yield item
+    finally:
+        stop.set()
+        producer.join()
+
+def benchmark(items=20, fetch_delay=0.05, work_delay=0.05, depth=2):
+    """
+    Wall-clock time of a slow source feeding a slow consumer, with and
+    without prefetching. Ideal speed-up is about
+    (fetch + work) / max(fetch, work).
+    """
+    def slow_pages():
+        for page in range(items):
+            time.sleep(fetch_delay)  # simulated DB round-trip
+            yield page
+
+    def consume(pages):
+        start = time.perf_counter()
+        for _ in pages:
+            time.sleep(work_delay)  # simulated slow consumer
+        return time.perf_counter() - start
+
+    serial = consume(slow_pages())
+    overlapped = consume(prefetch(slow_pages(), depth))
+    print(f"{items} pages, fetch {fetch_delay * 1000:.0f}ms, "
+          f"work {work_delay * 1000:.0f}ms: serial {serial:.2f}s, "
+          f"prefetch(depth={depth}) {overlapped:.2f}s "
+          f"({serial / overlapped:.2f}x)")
+    return serial, overlapped
+
+if __name__ == "__main__":
+    benchmark()
+    benchmark(fetch_delay=0.02, work_delay=0.08)
+    benchmark(fetch_delay=0.08, work_delay=0.02)
@@ -0,0 +1,69 @@
+import sys
+import timeit
+from collections import namedtuple
+from functools import lru_cache
+
+@lru_cache(maxsize=None)
+def record_type(names):
+    """
+    Compact row class for a tuple of column names (one class per shape).
+
+    Records are tuples underneath (__slots__ = (), no per-row dict), so a
+    user_data row costs one small tuple instead of a dict with four key
+    slots. They support attribute access (row.age), key access
+    (row["age"]), keys()/items()/get() and dict(row). Iterating a record
+    yields its values, like any tuple.
+    """
+    base = namedtuple("Record", names, rename=True)
+
+    class Record(base):
+        __slots__ = ()
+        _index = {name: i for i, name in enumerate(names)}
+
+        def __getitem__(self, key):
+            if isinstance(key, str):
+                return tuple.__getitem__(self, self._index[key])
+            return tuple.__getitem__(self, key)
+
+        def keys(self):
+            return list(self._index)
+
+        def items(self):
+            return list(zip(self._index, self))
+
+        def get(self, key, default=None):
+            index = self._index.get(key)
+            return default if index is None else tuple.__getitem__(self, index)
+
+    return Record
+
+def columns_of(cursor):
+    return tuple(column[0] for column in cursor.description)
+
+def make_records(cursor, rows):
+    """Wrap a fetchmany/fetchall chunk of plain tuples from cursor"""
+    record = record_type(columns_of(cursor))
+    new = tuple.__new__
+    return [new(record, row) for row in rows]
+
+def row_factory(cursor, row):
+    """sqlite3 row_factory building records instead of tuples or dicts"""
+    return tuple.__new__(record_type(columns_of(cursor)), row)
+
+def benchmark(rows=100000):
+    """Per-row memory and construction cost: dict rows vs records"""
+    names = ("user_id", "name", "email", "age")
+    values = ("00000000-0000-0000-0000-000000000000", "Jane Doe",
+              "jane@example.com", 42)
+    record = record_type(names)
+
+    dict_bytes = sys.getsizeof(dict(zip(names, values)))
+    record_bytes = sys.getsizeof(tuple.__new__(record, values))
+    dict_time = timeit.timeit(lambda: dict(zip(names, values)), number=rows)
+    record_time = timeit.timeit(lambda: tuple.__new__(record, values), number=rows)
+    print(f"dict row:   {dict_bytes} bytes, {dict_time / rows * 1e9:.0f} ns/row")
+    print(f"record row: {record_bytes} bytes, {record_time / rows * 1e9:.0f} ns/row")
+    return {"dict": (dict_bytes, dict_time), "record": (record_bytes, record_time)}
+
+if __name__ == "__main__":
+    benchmark()
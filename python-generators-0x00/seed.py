@@ -1,16 +1,60 @@
-import mysql.connector
 import csv
+import functools
+import sqlite3
+import time
 import uuid
+from itertools import islice
+
+rowtypes = __import__('rowtypes')
+db_pool = __import__('db_pool')
+
+try:
+    import mysql.connector
+except ImportError:  # SQLite stand-in only (local benchmarks)
+    mysql = None
+
+SQLITE_DB = "ALX_prodev.sqlite3"
+STREAM_CHUNK_SIZE = 1000
+
+if mysql is not None:
+    DB_ERRORS = (mysql.connector.Error, sqlite3.Error)
+else:
+    DB_ERRORS = (sqlite3.Error,)
+
+
+def open_server_connection():
+    return mysql.connector.connect(
+        host="localhost",
+        user="root",
+        password="yourpassword"
+    )
+
+def open_prodev_connection():
+    return mysql.connector.connect(
+        host="localhost",
+        user="root",
+        password="yourpassword",
+        database="ALX_prodev"
+    )
+
+# Pools are only created (and connect) on first checkout
+db_pool.configure("server", open_server_connection, min_size=0, max_size=2)
+db_pool.configure("prodev", open_prodev_connection, min_size=1, max_size=10)
+
+def prodev_pool():
+    """The process-wide pool every generator module checks out from"""
+    return db_pool.get_pool("prodev")
+
+def use_sqlite(path=SQLITE_DB, **pool_options):
+    """Point both pools at a local SQLite stand-in instead of MySQL"""
+    connect = functools.partial(connect_sqlite, path, check_same_thread=False)
+    db_pool.configure("server", connect, min_size=0, max_size=2)
+    db_pool.configure("prodev", connect, **pool_options)
 
 def connect_db():
     try:
-        connection = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="yourpassword"
-        )
-        return connection
-    except mysql.connector.Error as err:
+        return db_pool.get_pool("server").acquire()
+    except DB_ERRORS as err:
         print(f"Error: {err}")
         return None
 
@@ -20,33 +64,117 @@ def create_database(connection):
     cursor.close()
 
 def connect_to_prodev():
+    """Check out a pooled ALX_prodev connection; close() returns it"""
     try:
-        connection = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="yourpassword",
-            database="ALX_prodev"
-        )
-        return connection
-    except mysql.connector.Error as err:
+        return prodev_pool().acquire()
+    except DB_ERRORS as err:
         print(f"Error: {err}")
         return None
 
+def connect_sqlite(path=SQLITE_DB, **options):
+    """Open a local SQLite stand-in for ALX_prodev (used for benchmarks)"""
+    return sqlite3.connect(path, **options)
+
+def is_sqlite(connection):
+    connection = getattr(connection, "raw_connection", connection)
+    return isinstance(connection, sqlite3.Connection)
+
+def param_marker(connection):
+    """Placeholder style of the driver: '?' for sqlite3, '%s' for MySQL"""
+    return "?" if is_sqlite(connection) else "%s"
+
+def dict_row(cursor, row):
+    """sqlite3 row_factory that builds the same dict rows as dictionary=True"""
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+def streaming_cursor(connection, dictionary=True):
+    """
+    Cursor that leaves the result set on the server.
+    mysql.connector: unbuffered cursor, rows are read off the socket on
+    fetch. sqlite3 cursors already step through the result lazily.
+    """
+    if is_sqlite(connection):
+        cursor = connection.cursor()
+        if dictionary:
+            cursor.row_factory = dict_row
+        return cursor
+    return connection.cursor(dictionary=dictionary, buffered=False)
+
+def stream_rows(connection, query, params=(), chunk_size=STREAM_CHUNK_SIZE,
+                dictionary=True, records=False):
+    """
+    Run query on a streaming cursor and yield its rows in fetchmany chunks.
+    At most chunk_size rows are held client-side at any time, so memory
+    and first-row latency do not depend on the size of the table.
+    If the consumer stops early the cursor is closed without draining it.
+    records=True yields compact rowtypes records instead of dicts.
+    """
+    cursor = streaming_cursor(connection, dictionary and not records)
+    try:
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rowtypes.make_records(cursor, rows) if records else rows
+    finally:
+        try:
+            cursor.close()
+        except Exception:
+            # Unbuffered MySQL cursors refuse to close with unread rows;
+            # closing the connection afterwards discards them.
+            pass
+
 def create_table(connection):
     cursor = connection.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS user_data (
-            user_id VARCHAR(36) PRIMARY KEY,
-            name VARCHAR(255) NOT NULL,
-            email VARCHAR(255) NOT NULL,
-            age DECIMAL(5,2) NOT NULL,
-            INDEX(user_id)
-        )
-    """)
+    if is_sqlite(connection):
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS user_data (
+                user_id VARCHAR(36) PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                email VARCHAR(255) NOT NULL,
+                age DECIMAL(5,2) NOT NULL
+            )
+        """)
+    else:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS user_data (
+                user_id VARCHAR(36) PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                email VARCHAR(255) NOT NULL,
+                age DECIMAL(5,2) NOT NULL,
+                INDEX(user_id),
+                UNIQUE KEY uq_user_data_email (email)
+            )
+        """)
+    ensure_email_unique(connection)
     connection.commit()
     cursor.close()
     print("Table user_data created successfully")
 
+def ensure_email_unique(connection):
+    """
+    Make sure user_data has a unique key on email.
+    Tables created before the key existed get it added here, so the
+    database (not a per-row SELECT) is what rejects duplicate emails.
+    """
+    cursor = connection.cursor()
+    if is_sqlite(connection):
+        cursor.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_user_data_email "
+            "ON user_data (email)"
+        )
+    else:
+        cursor.execute(
+            "SHOW INDEX FROM user_data WHERE Key_name = 'uq_user_data_email'"
+        )
+        if not cursor.fetchall():
+            cursor.execute(
+                "ALTER TABLE user_data "
+                "ADD UNIQUE KEY uq_user_data_email (email)"
+            )
+    cursor.close()
+
 def insert_data(connection, csv_file):
     cursor = connection.cursor()
     with open(csv_file, newline='', encoding='utf-8') as file:
@@ -69,3 +197,58 @@ def insert_data(connection, csv_file):
             """, (user_id, name, email, age))
     connection.commit()
     cursor.close()
+
+def read_csv_in_chunks(csv_file, chunk_size):
+    """Yield the CSV rows as lists of at most chunk_size dicts"""
+    with open(csv_file, newline='', encoding='utf-8') as file:
+        reader = csv.DictReader(file)
+        while True:
+            chunk = list(islice(reader, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+def insert_ignore_query(connection):
+    """INSERT for user_data that silently skips emails already present"""
+    marker = param_marker(connection)
+    verb = "INSERT OR IGNORE" if is_sqlite(connection) else "INSERT IGNORE"
+    return (
+        f"{verb} INTO user_data (user_id, name, email, age) "
+        f"VALUES ({marker}, {marker}, {marker}, {marker})"
+    )
+
+def bulk_insert_data(connection, csv_file, chunk_size=5000):
+    """
+    Bulk, idempotent version of insert_data.
+    Reads the CSV chunk by chunk and inserts each chunk with one executemany
+    call (mysql.connector rewrites it into a multi-row VALUES insert).
+    Duplicate emails are skipped by the unique key on email
+    (INSERT IGNORE / INSERT OR IGNORE), so re-running the seed is safe.
+    Returns the ingest stats and prints rows/s and total elapsed time.
+    """
+    query = insert_ignore_query(connection)
+    cursor = connection.cursor()
+    rows_read = 0
+    rows_inserted = 0
+    start = time.perf_counter()
+    for chunk in read_csv_in_chunks(csv_file, chunk_size):
+        values = [
+            (str(uuid.uuid4()), row['name'], row['email'], float(row['age']))
+            for row in chunk
+        ]
+        cursor.executemany(query, values)
+        rows_read += len(values)
+        rows_inserted += max(cursor.rowcount, 0)
+    connection.commit()
+    cursor.close()
+    elapsed = time.perf_counter() - start
+
+    rows_per_sec = rows_read / elapsed if elapsed > 0 else 0.0
+    print(f"Inserted {rows_inserted} of {rows_read} rows "
+          f"in {elapsed:.2f}s ({rows_per_sec:,.0f} rows/s)")
+    return {
+        "rows_read": rows_read,
+        "rows_inserted": rows_inserted,
+        "elapsed": elapsed,
+        "rows_per_sec": rows_per_sec,
+    }
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""Tests for the mergeable streaming aggregates."""
+import contextlib
+import io
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+seed = __import__('seed')
+pipeline = __import__('pipeline')
+aggregates = __import__('aggregates')
+
+
+def chunks(values, size):
+    return [values[i:i + size] for i in range(0, len(values), size)]
+
+
+class TestMoments(unittest.TestCase):
+    """Welford updates and the Chan et al. merge"""
+
+    def setUp(self):
+        rng = random.Random(5)
+        self.values = [rng.uniform(18, 90) for _ in range(1000)]
+
+    def assertMomentsEqual(self, first, second):
+        self.assertEqual(first.count, second.count)
+        self.assertAlmostEqual(first.mean, second.mean, places=9)
+        self.assertAlmostEqual(first.variance, second.variance, places=6)
+        self.assertEqual((first.min, first.max), (second.min, second.max))
+
+    def test_matches_statistics(self):
+        moments = aggregates.Moments().update(self.values)
+        self.assertEqual(moments.count, len(self.values))
+        self.assertAlmostEqual(moments.mean, statistics.fmean(self.values), places=9)
+        self.assertAlmostEqual(moments.stddev, statistics.pstdev(self.values), places=9)
+        self.assertEqual((moments.min, moments.max), (min(self.values), max(self.values)))
+
+    def test_add_matches_update(self):
+        one_by_one = aggregates.Moments()
+        for value in self.values:
+            one_by_one.add(value)
+        self.assertMomentsEqual(one_by_one, aggregates.Moments().update(self.values))
+
+    def test_merge_equals_single_pass(self):
+        single = aggregates.Moments().update(self.values)
+        merged = aggregates.Moments()
+        for chunk in chunks(self.values, 137):
+            merged.merge(aggregates.Moments().update(chunk))
+        self.assertMomentsEqual(merged, single)
+        # Empty partials change nothing, on either side
+        merged.merge(aggregates.Moments())
+        self.assertMomentsEqual(aggregates.Moments().merge(merged), single)
+
+    def test_empty(self):
+        moments = aggregates.Moments().update([])
+        self.assertEqual((moments.count, moments.variance, moments.min), (0, 0.0, None))
+
+
+class TestHistogram(unittest.TestCase):
+    """Fixed buckets plus out-of-range counters"""
+
+    def test_buckets_and_out_of_range(self):
+        histogram = aggregates.Histogram(0, 100, 10).update([-1, 0, 9.9, 10, 99.9, 100, 150])
+        self.assertEqual(histogram.counts, [2, 1] + [0] * 7 + [1])
+        self.assertEqual((histogram.underflow, histogram.overflow), (1, 2))
+
+    def test_merge(self):
+        first = aggregates.Histogram(0, 100, 10).update([5, 105])
+        first.merge(aggregates.Histogram(0, 100, 10).update([5, -5]))
+        self.assertEqual(first.counts[0], 2)
+        self.assertEqual((first.underflow, first.overflow), (1, 1))
+        with self.assertRaises(ValueError):
+            first.merge(aggregates.Histogram(0, 50, 10))
+
+
+class TestQuantileSketch(unittest.TestCase):
+    """Quantiles within relative_accuracy, mergeable"""
+
+    def setUp(self):
+        rng = random.Random(7)
+        self.values = [rng.lognormvariate(3, 1) for _ in range(5000)]
+        self.values += [-v for v in self.values[:500]] + [0.0] * 50
+
+    def true_quantile(self, q):
+        ordered = sorted(self.values)
+        return ordered[int(q * (len(ordered) - 1))]
+
+    def test_quantiles_within_relative_accuracy(self):
+        for accuracy in (0.01, 0.05):
+            sketch = aggregates.QuantileSketch(accuracy).update(self.values)
+            for q in (0, 0.01, 0.05, 0.1, 0.25, 0.5, 0.9, 0.95, 0.99, 1):
+                expected = self.true_quantile(q)
+                self.assertLessEqual(abs(sketch.quantile(q) - expected),
+                                     accuracy * abs(expected) + 1e-12, (accuracy, q))
+
+    def test_merge_equals_single_pass(self):
+        single = aggregates.QuantileSketch().update(self.values)
+        merged = aggregates.QuantileSketch()
+        for chunk in chunks(self.values, 999):
+            merged.merge(aggregates.QuantileSketch().update(chunk))
+        for q in (0.1, 0.5, 0.99):
+            self.assertEqual(merged.quantile(q), single.quantile(q))
+        with self.assertRaises(ValueError):
+            merged.merge(aggregates.QuantileSketch(0.05))
+
+    def test_empty_and_bad_q(self):
+        sketch = aggregates.QuantileSketch()
+        self.assertIsNone(sketch.quantile(0.5))
+        with self.assertRaises(ValueError):
+            sketch.quantile(1.5)
+
+
+class TestSummary(unittest.TestCase):
+    """Everything fed from the same chunks"""
+
+    def test_report_counts_values_outside_the_histogram(self):
+        ages = [25, 40, 101, 120, -3]
+        summary = aggregates.Summary(start=0, stop=100, bins=10)
+        report = summary.consume([ages[:2], ages[2:]]).report()
+        self.assertEqual(report["count"], 5)
+        self.assertEqual(sum(count for _, count in report["histogram"]), 2)
+        self.assertEqual((report["underflow"], report["overflow"]), (1, 2))
+        self.assertAlmostEqual(report["p50"], 40, delta=0.4)
+
+
+class TestSqlMoments(unittest.TestCase):
+    """Moments pushed down to SQL agree with the streamed ones"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.connection = seed.connect_sqlite(os.path.join(self.tmp.name, "prodev.sqlite3"))
+        with contextlib.redirect_stdout(io.StringIO()):
+            seed.create_table(self.connection)
+        rng = random.Random(3)
+        self.ages = [rng.randint(18, 90) for _ in range(300)]
+        self.connection.executemany(
+            "INSERT INTO user_data VALUES (?, ?, ?, ?)",
+            [(f"id-{i}", f"User {i}", f"user{i}@example.com", age)
+             for i, age in enumerate(self.ages)])
+        self.connection.commit()
+
+    def tearDown(self):
+        self.connection.close()
+        self.tmp.cleanup()
+
+    def test_matches_streamed_moments(self):
+        pushed = aggregates.sql_moments(self.connection, "age")
+        streamed = aggregates.Moments().update(self.ages)
+        self.assertEqual(pushed.count, streamed.count)
+        self.assertAlmostEqual(pushed.mean, streamed.mean, places=9)
+        self.assertTrue(math.isclose(pushed.stddev, streamed.stddev, rel_tol=1e-9))
+        self.assertEqual((pushed.min, pushed.max), (streamed.min, streamed.max))
+
+    def test_where_is_pushed_down(self):
+        query = pipeline.Query().where("age", ">=", 50)
+        pushed = aggregates.sql_moments(self.connection, "age", query)
+        self.assertEqual(pushed.count, sum(age >= 50 for age in self.ages))
+        self.assertEqual(aggregates.sql_moments(
+            self.connection, "age", pipeline.Query().where("age", ">", 1000)).count, 0)
+
+    def test_python_filters_and_bad_columns_are_refused(self):
+        with self.assertRaises(ValueError):
+            aggregates.sql_moments(self.connection, "age",
+                                   pipeline.Query().filter(lambda row: True))
+        with self.assertRaises(ValueError):
+            aggregates.sql_moments(self.connection, "age); DROP TABLE user_data; --")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Tests for the async-generator streaming APIs, on aiosqlite."""
+import asyncio
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+import uuid
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+async_stream = __import__('async_stream')
+
+try:
+    import aiosqlite  # noqa: F401
+except ImportError:  # pragma: no cover - optional dependency
+    aiosqlite = None
+
+
+class CountingBackend(async_stream.SQLiteBackend):
+    """SQLiteBackend that counts open connections"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.open = 0
+
+    async def connect(self):
+        connection = await super().connect()
+        self.open += 1
+        return connection
+
+    async def close(self, connection, cursor, finished):
+        await super().close(connection, cursor, finished)
+        self.open -= 1
+
+
+@unittest.skipIf(aiosqlite is None, "aiosqlite is not installed")
+class TestAsyncStream(unittest.TestCase):
+    """Early exit from the nested async generators closes the connection"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "prodev.sqlite3")
+        connection = sqlite3.connect(self.path)
+        connection.execute("CREATE TABLE user_data (user_id VARCHAR(36) PRIMARY KEY, "
+                           "name TEXT, email TEXT, age DECIMAL(5,2))")
+        connection.executemany(
+            "INSERT INTO user_data VALUES (?, ?, ?, ?)",
+            [(str(uuid.uuid4()), f"User {i}", f"user{i}@example.com", 20 + i % 50)
+             for i in range(100)])
+        connection.commit()
+        connection.close()
+        self.backend = CountingBackend(self.path)
+        async_stream.configure(self.backend)
+
+    def tearDown(self):
+        async_stream.configure(async_stream.MySQLBackend())
+        self.tmp.cleanup()
+
+    def test_aclose_closes_inner_stream(self):
+        async def main():
+            for stream in (async_stream.astream_users(10),
+                           async_stream.astream_users_in_batches(10),
+                           async_stream.astream_user_ages(10)):
+                await stream.__anext__()
+                self.assertEqual(self.backend.open, 1)
+                await stream.aclose()
+                self.assertEqual(self.backend.open, 0)
+
+        asyncio.run(main())
+
+    def test_break_lets_the_interpreter_exit(self):
+        script = textwrap.dedent(f"""
+            import asyncio, sys
+            sys.path.insert(0, {HERE!r})
+            async_stream = __import__('async_stream')
+            async_stream.use_sqlite({self.path!r})
+
+            async def main():
+                async for row in async_stream.astream_users(10):
+                    break
+
+            asyncio.run(main())
+        """)
+        completed = subprocess.run([sys.executable, "-c", script], timeout=60)
+        self.assertEqual(completed.returncode, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
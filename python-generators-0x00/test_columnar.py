@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Tests for the columnar (NumPy) batch mode, on the SQLite stand-in."""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+seed = __import__('seed')
+columnar = __import__('columnar')
+batches = __import__('1-batch_processing')
+
+
+@unittest.skipIf(columnar.np is None, "numpy is not installed")
+class TestColumnar(unittest.TestCase):
+    """ColumnBatch dtypes and the vectorized age filter"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmp.name, "prodev.sqlite3")
+        connection = seed.connect_sqlite(path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            seed.create_table(connection)
+        # DECIMAL ages come back from SQLite as a mix of int and float;
+        # the first row of each batch is an int
+        ages = [20 + (i % 3) * 2.75 if i % 2 else 20 + i % 11 for i in range(300)]
+        connection.executemany(
+            "INSERT INTO user_data VALUES (?, ?, ?, ?)",
+            [(str(uuid.uuid4()), f"User {i}", f"user{i}@example.com", age)
+             for i, age in enumerate(ages)])
+        connection.commit()
+        connection.close()
+        self.expected = sum(1 for age in ages if age > 25)
+        seed.use_sqlite(path, min_size=0, max_size=2)
+
+    def tearDown(self):
+        seed.use_sqlite(seed.SQLITE_DB)  # drops the pools on the temp file
+        self.tmp.cleanup()
+
+    def test_to_array_dtypes(self):
+        np = columnar.np
+        self.assertEqual(columnar.to_array([25, 25.5]).dtype, np.float64)
+        self.assertEqual(columnar.to_array([25, 26]).dtype, np.int64)
+        self.assertEqual(columnar.to_array([True, False]).dtype, np.bool_)
+        self.assertEqual(columnar.to_array(["a", "b"]).dtype.kind, "S")
+        self.assertEqual(columnar.to_array([1, None]).dtype, object)
+
+    def test_columnar_filter_matches_row_filter(self):
+        rows = list(batches.batch_processing(50))
+        column_rows = sum(len(batch) for batch in batches.batch_processing_columnar(50))
+        self.assertEqual(len(rows), self.expected)
+        self.assertEqual(column_rows, self.expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
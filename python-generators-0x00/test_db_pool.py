@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""Tests for the connection pool behind the generators, on the SQLite stand-in."""
+import functools
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+seed = __import__('seed')
+db_pool = __import__('db_pool')
+
+
+class UnreadConnection:
+    """Stands in for a MySQL connection left with an unread result"""
+
+    unread_result = True
+    closed = False
+
+    def rollback(self):
+        raise AssertionError("an unread result must not be rolled back")
+
+    def close(self):
+        self.closed = True
+
+
+class PoolTestCase(unittest.TestCase):
+    """A scratch SQLite file per test"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "prodev.sqlite3")
+        self.connect = functools.partial(seed.connect_sqlite, self.path,
+                                         check_same_thread=False)
+        connection = self.connect()
+        connection.execute("CREATE TABLE t (x INTEGER)")
+        connection.commit()
+        connection.close()
+        self.pools = []
+
+    def tearDown(self):
+        for pool in self.pools:
+            pool.close()
+        self.tmp.cleanup()
+
+    def pool(self, **options):
+        pool = db_pool.ConnectionPool(self.connect, **options)
+        self.pools.append(pool)
+        return pool
+
+
+class TestConnectionPool(PoolTestCase):
+    """Checkout limits, health checks, eviction and release"""
+
+    def test_max_size_and_timeout(self):
+        pool = self.pool(min_size=0, max_size=2, checkout_timeout=0.01)
+        first, second = pool.acquire(), pool.acquire()
+        with self.assertRaises(db_pool.PoolTimeout):
+            pool.acquire()
+        raw = first.raw_connection
+        first.close()
+        self.assertIs(pool.acquire().raw_connection, raw)
+        stats = pool.stats()
+        self.assertEqual((stats["created"], stats["size"], stats["timeouts"]), (2, 2, 1))
+        second.close()
+
+    def test_waiter_gets_released_connection(self):
+        pool = self.pool(min_size=0, max_size=1, checkout_timeout=5)
+        held = pool.acquire()
+        raw = held.raw_connection
+        got = []
+        waiter = threading.Thread(target=lambda: got.append(pool.acquire()))
+        waiter.start()
+        time.sleep(0.02)
+        held.close()
+        waiter.join()
+        self.assertIs(got[0].raw_connection, raw)
+        self.assertEqual(pool.stats()["waits"], 1)
+        got[0].close()
+
+    def test_failing_health_check_replaces_connection(self):
+        broken = []
+        pool = self.pool(min_size=1, max_size=1, health_check_interval=0,
+                         health_check=lambda connection: connection not in broken)
+        with pool.acquire() as connection:
+            broken.append(connection.raw_connection)
+        with pool.acquire() as connection:
+            self.assertNotIn(connection.raw_connection, broken)
+        stats = pool.stats()
+        self.assertEqual((stats["health_failures"], stats["created"], stats["size"]),
+                         (1, 2, 1))
+
+    def test_idle_connections_are_evicted_down_to_min_size(self):
+        pool = self.pool(min_size=1, max_size=3, idle_timeout=0.01)
+        connections = [pool.acquire() for _ in range(3)]
+        for connection in connections:
+            connection.close()
+        self.assertEqual(pool.stats()["idle"], 3)
+        time.sleep(0.02)
+        with pool.acquire():
+            stats = pool.stats()
+            self.assertEqual((stats["evicted"], stats["size"], stats["in_use"]), (2, 1, 1))
+
+    def test_release_rolls_back(self):
+        pool = self.pool(min_size=1, max_size=1)
+        with pool.acquire() as connection:
+            connection.execute("INSERT INTO t VALUES (1)")
+            raw = connection.raw_connection
+        self.assertFalse(raw.in_transaction)
+        with pool.acquire() as connection:
+            self.assertEqual(connection.execute("SELECT COUNT(*) FROM t").fetchone(), (0,))
+        with self.assertRaises(AttributeError):
+            connection.execute("SELECT 1")  # already given back
+
+    def test_unread_result_is_discarded(self):
+        pool = db_pool.ConnectionPool(UnreadConnection, min_size=0, max_size=1)
+        connection = pool.acquire()
+        raw = connection.raw_connection
+        connection.close()
+        self.assertTrue(raw.closed)
+        stats = pool.stats()
+        self.assertEqual((stats["discarded"], stats["size"]), (1, 0))
+
+
+class TestRegistry(PoolTestCase):
+    """configure() and get_pool()"""
+
+    name = "test_db_pool"
+
+    def tearDown(self):
+        db_pool.configure(self.name, self.connect)  # closes the live pool, if any
+        db_pool._factories.pop(self.name, None)
+        super().tearDown()
+
+    def test_configure_replaces_live_pool(self):
+        db_pool.configure(self.name, self.connect, min_size=0, max_size=1)
+        old = db_pool.get_pool(self.name)
+        held = old.acquire()
+        raw = held.raw_connection
+
+        db_pool.configure(self.name, self.connect, min_size=0, max_size=3)
+        new = db_pool.get_pool(self.name)
+        self.assertIsNot(new, old)
+        self.assertEqual(new.max_size, 3)
+        with self.assertRaises(RuntimeError):
+            old.acquire()
+        held.close()  # released into a closed pool: disconnected
+        with self.assertRaises(sqlite3.ProgrammingError):
+            raw.execute("SELECT 1")
+        self.assertEqual(old.stats()["size"], 0)
+
+    def test_forked_child_gets_its_own_pool(self):
+        db_pool.configure(self.name, self.connect, min_size=0)
+        parent = db_pool.get_pool(self.name)
+        self.assertIs(db_pool.get_pool(self.name), parent)
+        parent.pid = -1  # as seen from a forked child
+        child = db_pool.get_pool(self.name)
+        self.assertIsNot(child, parent)
+        self.assertEqual(child.pid, os.getpid())
+        parent.close()
+
+    def test_unknown_pool(self):
+        with self.assertRaises(KeyError):
+            db_pool.get_pool("no such pool")
+
+
+if __name__ == "__main__":
+    unittest.main()
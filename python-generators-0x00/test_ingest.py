@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Tests for the resumable, checkpointed CSV ingest, on the SQLite stand-in."""
+import contextlib
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+seed = __import__('seed')
+ingest = __import__('ingest')
+
+
+class Interrupted(Exception):
+    """Stands in for a crash in the middle of an ingest"""
+
+
+class FlakyConnection:
+    """sqlite3 connection whose cursors fail on the nth executemany call"""
+
+    def __init__(self, connection, fail_on):
+        self.raw_connection = connection
+        self.calls = 0
+        self.fail_on = fail_on
+
+    def __getattr__(self, name):
+        return getattr(self.raw_connection, name)
+
+    def cursor(self):
+        cursor = self.raw_connection.cursor()
+        flaky = self
+
+        class Cursor:
+            rowcount = property(lambda _: cursor.rowcount)
+
+            def executemany(self, query, values):
+                flaky.calls += 1
+                if flaky.calls == flaky.fail_on:
+                    raise Interrupted()
+                return cursor.executemany(query, values)
+
+            def close(self):
+                cursor.close()
+        return Cursor()
+
+
+class TestIngest(unittest.TestCase):
+    """ingest_csv commits in batches and resumes from its checkpoint"""
+
+    rows = 95
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.csv_file = os.path.join(self.tmp.name, "user_data.csv")
+        with open(self.csv_file, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["name", "email", "age"])
+            for i in range(self.rows):
+                writer.writerow([f"User {i}", f"user{i}@example.com", 20 + i % 50])
+        self.checkpoint = self.csv_file + ".checkpoint"
+        self.connection = seed.connect_sqlite(os.path.join(self.tmp.name, "prodev.sqlite3"))
+        with contextlib.redirect_stdout(io.StringIO()):
+            seed.create_table(self.connection)
+
+    def tearDown(self):
+        self.connection.close()
+        self.tmp.cleanup()
+
+    def ingest(self, connection, **options):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return ingest.ingest_csv(connection, self.csv_file, commit_every=20,
+                                     chunk_bytes=512, **options)
+
+    def count(self):
+        return self.connection.execute("SELECT COUNT(*) FROM user_data").fetchone()[0]
+
+    def test_resume_after_interruption(self):
+        with self.assertRaises(Interrupted):
+            self.ingest(FlakyConnection(self.connection, fail_on=4))
+        with open(self.checkpoint) as file:
+            state = json.load(file)
+        committed = self.count()
+        self.assertEqual(state["rows"], committed)
+        self.assertGreater(committed, 0)
+
+        stats = self.ingest(self.connection)
+        # Only the rows after the checkpoint were read again
+        self.assertEqual(stats["rows_read"], self.rows - committed)
+        self.assertEqual(stats["rows_inserted"], self.rows - committed)
+        self.assertEqual(stats["rows_total"], self.rows)
+        self.assertEqual(self.count(), self.rows)
+
+    def test_finished_ingest_reads_nothing_again(self):
+        self.assertEqual(self.ingest(self.connection)["rows_inserted"], self.rows)
+        stats = self.ingest(self.connection)
+        self.assertEqual((stats["rows_read"], stats["rows_total"]), (0, self.rows))
+        self.assertEqual(self.count(), self.rows)
+
+    def test_checkpoint_of_another_file_is_refused(self):
+        self.ingest(self.connection)
+        with open(self.csv_file, "a") as file:
+            file.write("Late,late@example.com,40\n")
+        with self.assertRaises(ValueError):
+            self.ingest(self.connection)
+
+    def test_empty_file(self):
+        open(self.csv_file, "w").close()
+        stats = self.ingest(self.connection)
+        self.assertEqual((stats["rows_read"], stats["rows_inserted"], stats["rows_total"]),
+                         (0, 0, 0))
+        self.assertEqual(self.count(), 0)
+
+    def test_worker_processes(self):
+        stats = self.ingest(self.connection, workers=2)
+        self.assertEqual((stats["rows_inserted"], stats["rows_total"]), (self.rows, self.rows))
+        self.assertEqual(self.count(), self.rows)
+
+
+if __name__ == "__main__":
+    unittest.main()
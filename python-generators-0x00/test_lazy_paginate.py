@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Tests for offset and keyset pagination, on the SQLite stand-in."""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+seed = __import__('seed')
+paginate = __import__('2-lazy_paginate')
+
+
+class TestLazyPagination(unittest.TestCase):
+    """Keyset pages and resuming from a cursor token"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmp.name, "prodev.sqlite3")
+        connection = seed.connect_sqlite(path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            seed.create_table(connection)
+        connection.executemany(
+            "INSERT INTO user_data VALUES (?, ?, ?, ?)",
+            [(f"id-{i:03d}", f"User {i}", f"user{i}@example.com", 20 + i % 50)
+             for i in range(23)])
+        connection.commit()
+        connection.close()
+        seed.use_sqlite(path, min_size=0, max_size=2)
+
+    def tearDown(self):
+        seed.use_sqlite(seed.SQLITE_DB)  # drops the pools on the temp file
+        self.tmp.cleanup()
+
+    def ids(self, pages):
+        return [row["user_id"] for page in pages for row in page]
+
+    def test_keyset_matches_offset(self):
+        offset_ids = self.ids(paginate.lazy_pagination(5))
+        keyset_ids = self.ids(paginate.lazy_pagination(5, keyset=True))
+        self.assertEqual(len(keyset_ids), 23)
+        self.assertEqual(sorted(offset_ids), keyset_ids)
+
+    def test_resume_from_cursor_token(self):
+        pages = paginate.lazy_pagination(5, keyset=True)
+        first, second = next(pages), next(pages)
+        token = paginate.make_cursor(second)
+        pages.close()
+        seen = self.ids([first, second])
+
+        rest = self.ids(paginate.lazy_pagination(5, after=token))
+        self.assertEqual(seen + rest, [f"id-{i:03d}" for i in range(23)])
+
+    def test_token_round_trip_and_key_check(self):
+        token = paginate.make_cursor([{"email": "user7@example.com"}], key="email")
+        self.assertEqual(paginate.read_cursor(token), ("email", "user7@example.com"))
+        connection = seed.connect_to_prodev()
+        try:
+            with self.assertRaises(ValueError):
+                paginate.paginate_users_after(connection, 5, key="age")
+        finally:
+            connection.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
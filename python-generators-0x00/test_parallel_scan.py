@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Tests for the partitioned parallel scan, on the SQLite stand-in."""
+import contextlib
+import functools
+import io
+import multiprocessing
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+seed = __import__('seed')
+pipeline = __import__('pipeline')
+parallel_scan = __import__('parallel_scan')
+
+ROWS = 203
+
+
+def user_ids(batch):
+    """Picklable per-batch function for the workers"""
+    return [row["user_id"] for row in batch]
+
+
+class TestParallelScan(unittest.TestCase):
+    """Key ranges cover the table once, in order or as they finish"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmp.name, "prodev.sqlite3")
+        self.connect = functools.partial(seed.connect_sqlite, path)
+        self.connection = self.connect()
+        with contextlib.redirect_stdout(io.StringIO()):
+            seed.create_table(self.connection)
+        self.ids = [f"id-{i:04d}" for i in range(ROWS)]
+        self.connection.executemany(
+            "INSERT INTO user_data VALUES (?, ?, ?, ?)",
+            [(user_id, f"User {i}", f"user{i}@example.com", 20 + i % 50)
+             for i, user_id in enumerate(reversed(self.ids))])
+        self.connection.commit()
+
+    def tearDown(self):
+        self.connection.close()
+        self.tmp.cleanup()
+
+    def scan(self, **options):
+        options.setdefault("workers", 2)
+        return parallel_scan.parallel_scan(user_ids, connect=self.connect,
+                                           batch_size=16, **options)
+
+    def test_bounds_match_offsets(self):
+        for partitions in (1, 2, 7, 16):
+            step = ROWS // partitions
+            expected = [self.ids[i * step] for i in range(1, partitions)]
+            ranges = parallel_scan.partition_bounds(self.connection, partitions)
+            self.assertEqual(len(ranges), partitions)
+            self.assertEqual([low for low, _ in ranges[1:]], expected)
+            self.assertEqual((ranges[0][0], ranges[-1][1]), (None, None))
+
+    def test_bounds_take_one_query_whatever_the_partition_count(self):
+        statements = []
+        self.connection.set_trace_callback(statements.append)
+        try:
+            parallel_scan.partition_bounds(self.connection, 32)
+        finally:
+            self.connection.set_trace_callback(None)
+        self.assertEqual(len(statements), 2)  # COUNT(*) and one ordered pass
+
+    def test_more_partitions_than_rows(self):
+        self.assertEqual(parallel_scan.partition_bounds(self.connection, ROWS + 1),
+                         [(None, None)])
+
+    def test_ordered_scan_yields_key_order(self):
+        scanned = [user_id for batch in self.scan(partitions=8) for user_id in batch]
+        self.assertEqual(scanned, self.ids)
+
+    def test_unordered_scan_covers_every_row_once(self):
+        batches = self.scan(partitions=8, ordered=False, max_pending=3)
+        scanned = [user_id for batch in batches for user_id in batch]
+        self.assertEqual(sorted(scanned), self.ids)
+
+    def test_query_filters_run_in_workers(self):
+        query = pipeline.Query().where("age", "<", 22)
+        scanned = [user_id for batch in self.scan(query=query, partitions=4)
+                   for user_id in batch]
+        self.assertEqual(len(scanned), sum(1 for i in range(ROWS) if 20 + i % 50 < 22))
+
+    def test_early_close_shuts_the_pool_down(self):
+        batches = self.scan(partitions=16, max_pending=2)
+        self.assertEqual(next(batches), self.ids[:ROWS // 16])  # the first range
+        batches.close()
+        self.assertEqual(multiprocessing.active_children(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Tests for the query pipeline and its pushdown, on the SQLite stand-in."""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+seed = __import__('seed')
+pipeline = __import__('pipeline')
+batch_processing = __import__('1-batch_processing')
+stream_ages = __import__('4-stream_ages')
+
+
+class TestQuerySql(unittest.TestCase):
+    """to_sql() and identifier checks"""
+
+    def test_select_star_without_conditions(self):
+        self.assertEqual(pipeline.Query().to_sql(), ("SELECT * FROM user_data", ()))
+
+    def test_columns_and_conditions(self):
+        query = (pipeline.Query("user_data").select("user_id", "age")
+                 .where("age", ">", 25).where("name", "like", "A%"))
+        self.assertEqual(query.to_sql("?"), (
+            "SELECT user_id, age FROM user_data WHERE age > ? AND name LIKE ?",
+            (25, "A%")))
+
+    def test_in_expands_one_marker_per_value(self):
+        query = pipeline.Query().where("age", "in", [20, 30, 40]).where("age", "!=", 30)
+        self.assertEqual(query.to_sql(), (
+            "SELECT * FROM user_data WHERE age IN (%s, %s, %s) AND age != %s",
+            (20, 30, 40, 30)))
+
+    def test_queries_are_immutable(self):
+        base = pipeline.Query().select("age")
+        base.where("age", ">", 1)
+        self.assertEqual(base.to_sql(), ("SELECT age FROM user_data", ()))
+
+    def test_identifiers_are_rejected(self):
+        for bad in ("user_data; DROP TABLE x", "age)", "1age", "a.b", "", "name --"):
+            with self.subTest(bad=bad):
+                with self.assertRaises(ValueError):
+                    pipeline.check_identifier(bad)
+        with self.assertRaises(ValueError):
+            pipeline.Query("users WHERE 1=1")
+        with self.assertRaises(ValueError):
+            pipeline.Query().select("age", "*")
+        with self.assertRaises(ValueError):
+            pipeline.Query().where("age; --", "=", 1)
+        with self.assertRaises(ValueError):
+            pipeline.Query().filter(lambda row: True, columns=["age)"])
+
+    def test_unknown_operator_is_refused(self):
+        with self.assertRaises(ValueError):
+            pipeline.Query().where("age", "BETWEEN", (1, 2))
+
+    def test_filter_columns_are_fetched(self):
+        keep = lambda row: True  # noqa: E731
+        query = pipeline.Query().select("name").filter(keep, columns=["age", "name"])
+        self.assertEqual(query.to_sql()[0], "SELECT name, age FROM user_data")
+        # Without select() every column is fetched anyway
+        query = pipeline.Query().filter(keep, columns=["age"])
+        self.assertEqual(query.to_sql()[0], "SELECT * FROM user_data")
+
+
+class TestQueryStream(unittest.TestCase):
+    """Rows streamed through the pushed-down query and Python stages"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmp.name, "prodev.sqlite3")
+        self.connection = seed.connect_sqlite(path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            seed.create_table(self.connection)
+        self.connection.executemany(
+            "INSERT INTO user_data VALUES (?, ?, ?, ?)",
+            [(f"id-{i:02d}", f"User {i}", f"user{i}@example.com", 20 + i)
+             for i in range(12)])
+        self.connection.commit()
+        seed.use_sqlite(path, min_size=0, max_size=2)
+
+    def tearDown(self):
+        self.connection.close()
+        seed.use_sqlite(seed.SQLITE_DB)  # drops the pools on the temp file
+        self.tmp.cleanup()
+
+    def test_where_runs_in_sql(self):
+        query = pipeline.Query().select("user_id").where("age", "IN", (21, 23))
+        self.assertEqual(list(query.stream(self.connection)),
+                         [{"user_id": "id-01"}, {"user_id": "id-03"}])
+
+    def test_filter_columns_are_dropped_again(self):
+        query = (pipeline.Query().select("name")
+                 .filter(lambda row: row["age"] % 5 == 0, columns=["age"]))
+        rows = list(query.stream(self.connection, chunk_size=4))
+        self.assertEqual(rows, [{"name": "User 0"}, {"name": "User 5"}, {"name": "User 10"}])
+
+    def test_records_stay_records_when_filter_columns_are_dropped(self):
+        query = (pipeline.Query().select("name")
+                 .filter(lambda row: row["age"] % 5 == 0, columns=["age"]))
+        rows = list(query.stream(self.connection, chunk_size=4, records=True))
+        self.assertEqual([row.name for row in rows], ["User 0", "User 5", "User 10"])
+        self.assertEqual(rows[0].keys(), ["name"])
+        self.assertNotIsInstance(rows[0], dict)
+
+    def test_batches_skip_chunks_emptied_by_filters(self):
+        query = pipeline.Query().filter(lambda row: row["age"] >= 30)
+        batches = list(query.batches(self.connection, batch_size=5))
+        self.assertEqual([len(batch) for batch in batches], [2])
+
+    def test_rewritten_generators(self):
+        over_25 = list(batch_processing.batch_processing(5))
+        self.assertEqual([user["age"] for user in over_25], list(range(26, 32)))
+        self.assertEqual(list(stream_ages.stream_user_ages()), list(range(20, 32)))
+
+
+if __name__ == "__main__":
+    unittest.main()
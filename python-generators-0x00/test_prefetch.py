@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""Tests for background prefetching."""
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+prefetch = __import__('prefetch')
+
+
+class TestPrefetch(unittest.TestCase):
+    """Order, error propagation and early close through the prefetch thread"""
+
+    def test_yields_every_item_in_order(self):
+        self.assertEqual(list(prefetch.prefetch(range(50), depth=3)), list(range(50)))
+
+    def test_source_error_is_raised_in_consumer(self):
+        def failing():
+            yield 1
+            yield 2
+            raise ValueError("lost connection")
+
+        items = []
+        with self.assertRaisesRegex(ValueError, "lost connection"):
+            for item in prefetch.prefetch(failing()):
+                items.append(item)
+        self.assertEqual(items, [1, 2])
+
+    def test_close_stops_producer_and_closes_source(self):
+        closed = threading.Event()
+        produced = []
+
+        def source():
+            try:
+                for i in range(1000):
+                    produced.append(i)
+                    yield i
+            finally:
+                closed.set()
+
+        before = threading.active_count()
+        items = prefetch.prefetch(source(), depth=2)
+        self.assertEqual(next(items), 0)
+        items.close()
+        self.assertTrue(closed.is_set())
+        # The producer never ran more than the queue depth ahead
+        self.assertLess(len(produced), 10)
+        self.assertEqual(threading.active_count(), before)
+
+
+if __name__ == "__main__":
+    unittest.main()
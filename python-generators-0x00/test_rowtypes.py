@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Tests for the compact record rows."""
+import os
+import sqlite3
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+rowtypes = __import__('rowtypes')
+
+NAMES = ("user_id", "name", "email", "age")
+VALUES = ("id-1", "Jane Doe", "jane@example.com", 42)
+
+
+class TestRecords(unittest.TestCase):
+    """Records read like dict rows but are tuples"""
+
+    def setUp(self):
+        self.row = tuple.__new__(rowtypes.record_type(NAMES), VALUES)
+
+    def test_key_and_attribute_access(self):
+        self.assertEqual(self.row["age"], 42)
+        self.assertEqual(self.row.age, 42)
+        self.assertEqual(self.row[1], "Jane Doe")
+        with self.assertRaises(KeyError):
+            self.row["missing"]
+
+    def test_dict_keys_items_and_get(self):
+        self.assertEqual(dict(self.row), dict(zip(NAMES, VALUES)))
+        self.assertEqual(self.row.keys(), list(NAMES))
+        self.assertEqual(self.row.items(), list(zip(NAMES, VALUES)))
+        self.assertEqual(self.row.get("email"), "jane@example.com")
+        self.assertIsNone(self.row.get("missing"))
+        self.assertEqual(self.row.get("missing", 0), 0)
+
+    def test_is_a_slotted_tuple(self):
+        self.assertEqual(tuple(self.row), VALUES)
+        self.assertFalse(hasattr(self.row, "__dict__"))
+
+    def test_one_class_per_shape(self):
+        self.assertIs(rowtypes.record_type(NAMES), rowtypes.record_type(NAMES))
+        self.assertIsNot(rowtypes.record_type(("age",)), rowtypes.record_type(NAMES))
+
+    def test_column_names_that_are_not_identifiers(self):
+        row = tuple.__new__(rowtypes.record_type(("COUNT(*)", "class")), (3, "a"))
+        self.assertEqual((row["COUNT(*)"], row["class"]), (3, "a"))
+
+    def test_from_a_cursor(self):
+        connection = sqlite3.connect(":memory:")
+        try:
+            cursor = connection.execute("SELECT 1 AS id, 'x' AS name")
+            (row,) = rowtypes.make_records(cursor, cursor.fetchall())
+            self.assertEqual((row.id, row["name"]), (1, "x"))
+            connection.row_factory = rowtypes.row_factory
+            row = connection.execute("SELECT 2 AS id").fetchone()
+            self.assertEqual(dict(row), {"id": 2})
+        finally:
+            connection.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
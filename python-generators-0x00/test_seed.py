@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Tests for the bulk CSV seed and row streaming, on the SQLite stand-in."""
+import contextlib
+import csv
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+seed = __import__('seed')
+stream_users = __import__('0-stream_users')
+
+
+class TestBulkInsert(unittest.TestCase):
+    """bulk_insert_data loads in chunks and is safe to re-run"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.csv_file = os.path.join(self.tmp.name, "user_data.csv")
+        with open(self.csv_file, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["name", "email", "age"])
+            for i in range(25):
+                writer.writerow([f"User {i}", f"user{i}@example.com", 20 + i])
+            writer.writerow(["Duplicate", "user3@example.com", 99])
+        self.connection = seed.connect_sqlite(os.path.join(self.tmp.name, "prodev.sqlite3"))
+        with contextlib.redirect_stdout(io.StringIO()):
+            seed.create_table(self.connection)
+
+    def tearDown(self):
+        self.connection.close()
+        self.tmp.cleanup()
+
+    def bulk_insert(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return seed.bulk_insert_data(self.connection, self.csv_file, chunk_size=10)
+
+    def count(self):
+        return self.connection.execute("SELECT COUNT(*) FROM user_data").fetchone()[0]
+
+    def test_duplicate_emails_are_skipped(self):
+        stats = self.bulk_insert()
+        self.assertEqual((stats["rows_read"], stats["rows_inserted"]), (26, 25))
+        self.assertEqual(self.count(), 25)
+        age = self.connection.execute(
+            "SELECT age FROM user_data WHERE email = 'user3@example.com'").fetchone()[0]
+        self.assertEqual(age, 23)
+
+    def test_rerun_is_idempotent(self):
+        self.bulk_insert()
+        stats = self.bulk_insert()
+        self.assertEqual((stats["rows_read"], stats["rows_inserted"]), (26, 0))
+        self.assertEqual(self.count(), 25)
+
+
+class RecordingConnection:
+    """sqlite3 connection that keeps the cursors it hands out"""
+
+    def __init__(self, connection):
+        self.raw_connection = connection
+        self.cursors = []
+
+    def cursor(self):
+        cursor = self.raw_connection.cursor()
+        self.cursors.append(cursor)
+        return cursor
+
+
+class TestStreamRows(unittest.TestCase):
+    """stream_rows holds at most chunk_size rows and cleans up on early close"""
+
+    rows = 10
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmp.name, "prodev.sqlite3")
+        self.connection = seed.connect_sqlite(path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            seed.create_table(self.connection)
+        self.connection.executemany(
+            "INSERT INTO user_data VALUES (?, ?, ?, ?)",
+            [(f"id-{i:02d}", f"User {i}", f"user{i}@example.com", 20 + i)
+             for i in range(self.rows)])
+        self.connection.commit()
+        seed.use_sqlite(path, min_size=0, max_size=2)
+
+    def tearDown(self):
+        self.connection.close()
+        seed.use_sqlite(seed.SQLITE_DB)  # drops the pools on the temp file
+        self.tmp.cleanup()
+
+    def test_chunks_are_capped_at_chunk_size(self):
+        chunks = list(seed.stream_rows(self.connection, "SELECT * FROM user_data",
+                                       chunk_size=4))
+        self.assertEqual([len(chunk) for chunk in chunks], [4, 4, 2])
+        self.assertEqual(chunks[0][0]["user_id"], "id-00")
+
+    def test_early_close_closes_the_cursor(self):
+        connection = RecordingConnection(self.connection)
+        chunks = seed.stream_rows(connection, "SELECT * FROM user_data", chunk_size=3)
+        self.assertEqual(len(next(chunks)), 3)
+        chunks.close()
+        with self.assertRaises(sqlite3.ProgrammingError):
+            connection.cursors[0].fetchone()  # closed, not drained
+
+    def test_early_close_returns_the_pooled_connection(self):
+        users = stream_users.stream_users(chunk_size=3)
+        self.assertEqual(next(users)["user_id"], "id-00")
+        self.assertEqual(seed.prodev_pool().stats()["in_use"], 1)
+        users.close()
+        stats = seed.prodev_pool().stats()
+        self.assertEqual((stats["in_use"], stats["idle"]), (0, 1))
+        self.assertEqual(len(list(stream_users.stream_users(chunk_size=3))), self.rows)
+
+
+if __name__ == "__main__":
+    unittest.main()